@@ -0,0 +1,591 @@
+'''Benchmarks each stage of the statepoint -> samples -> model pipeline.
+
+   Date: 10/19/2026
+
+   Usage: python benchmark.py [--assemblies 1] [--lattice 17 17] [--groups 2]
+                              [--seeds 10] [--batches 10 100 1000]
+                              [--output benchmark.json]
+                              [--baseline old-benchmark.json]
+
+   This script generates synthetic OpenMC statepoints (see
+   process/synthetic.py) for one or more assemblies of a core with a 3x3 mesh
+   per pin for each random number seed and batch, and a pinwise mesh for the
+   converged targets, in the same directory layout as openmc-input. It then
+   times each stage of the pipeline on the synthetic data:
+
+       generate - writing the synthetic statepoints
+       parse - reading the metadata and results with StatePoint
+       extract - extracting the mean of each score with extract_results
+       features - computing and storing the features (as features.py)
+       targets - computing and storing the targets (as targets.py)
+       samples - assembling the samples file (as samples.py)
+       cluster - scaling and k-means clustering of the feature vectors
+       svr-train, svr-predict - fitting and predicting with an RBF SVR (the
+                                number of support vectors is also reported)
+       tree-train, tree-predict - fitting and predicting with a CART tree
+
+   The statepoints are processed one assembly at a time, and the time for
+   each of the first six stages is summed over the assemblies. The models are
+   fit to the total cross-section samples for the final batch of all of the
+   assemblies.
+
+   The wall and CPU time, the throughput (ie, statepoints or samples per
+   second) and the peak resident set size (RSS) of the process after each
+   stage are reported to a JSON file. Since the peak RSS can only increase,
+   the growth in the peak RSS during each stage is also reported. If a
+   baseline JSON file from an earlier run is given, the stages which are
+   slower than the baseline by more than the tolerance are reported and the
+   script exits with a non-zero status. Stages which take less than 0.05 sec
+   in both runs are not compared since their timings are mostly noise.
+'''
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import h5py as h5
+from sklearn import tree
+from sklearn.svm import SVR
+from sklearn.cross_validation import train_test_split
+
+# The statepoint reader and writer are in the process directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'process'))
+from statepoint import StatePoint
+import synthetic
+
+from cluster import cluster
+
+
+################################################################################
+####################################  OPTIONS  #################################
+################################################################################
+
+parser = argparse.ArgumentParser(description='Benchmark the statepoint ' + \
+                                 'to samples to model pipeline.')
+parser.add_argument('--assemblies', type=int, default=1,
+                    help='The number of assemblies in the core')
+parser.add_argument('--lattice', type=int, nargs=2, default=[17, 17],
+                    help='The number of pins in x and y in each assembly')
+parser.add_argument('--refinement', type=int, default=3,
+                    help='The number of feature mesh cells per pin in x and y')
+parser.add_argument('--groups', type=int, default=2,
+                    help='The number of energy groups')
+parser.add_argument('--scores', nargs='+', default=synthetic.SCORES,
+                    help='The scores in each tally')
+parser.add_argument('--seeds', type=int, default=10,
+                    help='The number of random number seeds')
+parser.add_argument('--batches', type=int, nargs='+', default=[10, 100, 1000],
+                    help='The active batches with a statepoint for each seed')
+parser.add_argument('--inactive', type=int, default=250,
+                    help='The number of inactive batches')
+parser.add_argument('--particles', type=int, default=40000,
+                    help='The number of particles per batch (source bank size)')
+parser.add_argument('--noise', type=float, default=0.1,
+                    help='The relative standard deviation of each batch tally')
+parser.add_argument('--clusters', type=int, default=5,
+                    help='The number of k-means clusters')
+parser.add_argument('--split', type=float, default=0.33,
+                    help='The fraction of samples used for testing')
+parser.add_argument('--directory', default=None,
+                    help='The directory for the synthetic data ' + \
+                         '(a temporary directory by default)')
+parser.add_argument('--keep', action='store_true',
+                    help='Keep the temporary directory after the benchmark')
+parser.add_argument('--output', default='benchmark.json',
+                    help='The JSON file to report the timings to')
+parser.add_argument('--baseline', default=None,
+                    help='A JSON file from an earlier benchmark to compare to')
+parser.add_argument('--tolerance', type=float, default=0.25,
+                    help='The relative slowdown reported as a regression')
+args = parser.parse_args()
+
+if 'flux' not in args.scores:
+    raise Exception('Unable to benchmark the pipeline without the flux ' + \
+                    'score, which is needed for the cross-sections')
+
+core = synthetic.SyntheticCore(args.assemblies, args.lattice, args.refinement,
+                               args.groups, args.scores)
+assemblies = core.get_assembly_names()
+num_pins = args.lattice[0] * args.lattice[1]
+energies = synthetic.get_energy_names(args.groups)
+seeds = ['seed-' + str(i+1) for i in range(args.seeds)]
+batches = sorted(args.batches)
+final_batch = batches[-1] + args.inactive
+
+if args.directory is None:
+    directory = tempfile.mkdtemp(prefix='inferxs-benchmark-')
+else:
+    directory = args.directory
+
+
+################################################################################
+#################################  MEASUREMENT  ################################
+################################################################################
+
+stages = []
+
+# Stages faster than this (sec) are too noisy to compare to the baseline
+MIN_COMPARE_TIME = 0.05
+
+
+def get_peak_rss():
+    '''Returns the peak resident set size of the process in MB.'''
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # The peak RSS is reported in bytes on Mac OS X and in KB on Linux
+    if sys.platform == 'darwin':
+        return rss / 2.**20
+    else:
+        return rss / 2.**10
+
+
+def get_cpu_time():
+    '''Returns the user and system CPU time of the process in seconds.'''
+
+    times = os.times()
+    return times[0] + times[1]
+
+
+def run_stage(name, units, function, *function_args):
+    '''Runs and measures one stage of the pipeline.
+
+       The function is called with the given arguments and must return a
+       tuple of its result, the number of items (in the given units)
+       processed and the number of bytes read or written (or None). The
+       measurements are added to those from earlier runs of a stage with the
+       same name (ie, for each assembly). Returns the function's result.
+    '''
+
+    peak_rss = get_peak_rss()
+    cpu_time = get_cpu_time()
+    wall_time = time.time()
+
+    result, num_items, num_bytes = function(*function_args)
+
+    wall_time = time.time() - wall_time
+    cpu_time = get_cpu_time() - cpu_time
+
+    if name not in [stage['name'] for stage in stages]:
+        stages.append({'name': name, 'units': units, 'items': 0,
+                       'wall_time': 0., 'cpu_time': 0.,
+                       'peak_rss_growth_mb': 0.})
+
+    stage = [stage for stage in stages if stage['name'] == name][0]
+    stage['items'] += num_items
+    stage['wall_time'] += wall_time
+    stage['cpu_time'] += cpu_time
+    stage['throughput'] = stage['items'] / max(stage['wall_time'], 1e-9)
+    stage['peak_rss_mb'] = get_peak_rss()
+    stage['peak_rss_growth_mb'] += get_peak_rss() - peak_rss
+
+    if num_bytes is not None:
+        stage['megabytes'] = stage.get('megabytes', 0.) + num_bytes / 2.**20
+        stage['bandwidth_mb'] = stage['megabytes'] / \
+                                max(stage['wall_time'], 1e-9)
+
+    return result
+
+
+def get_size(filenames):
+    '''Returns the total size in bytes of a list of files.'''
+
+    return sum([os.path.getsize(filename) for filename in filenames])
+
+
+################################################################################
+####################################  STAGES  ##################################
+################################################################################
+
+def get_statepoint_filename(assembly, seed, batch):
+    '''Returns the filename of a seed's 3x3 mesh statepoint for a batch, or of
+       the pinwise statepoint if seed is None.'''
+
+    if seed is None:
+        path = os.path.join(directory, assembly, 'pinwise')
+    else:
+        path = os.path.join(directory, assembly, 'three-by-three', seed)
+
+    return os.path.join(path, 'statepoint.' + str(batch) + '.h5')
+
+
+def generate(index):
+    '''Writes the synthetic statepoints for each seed and batch.'''
+
+    assembly = assemblies[index]
+    means = core.get_means(index)
+    filenames = []
+
+    for i, seed in enumerate(seeds):
+        for batch in batches:
+            filename = get_statepoint_filename(assembly, seed,
+                                               batch+args.inactive)
+            filenames.append(filename)
+
+            if not os.path.exists(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+
+            synthetic.write_statepoint(filename, means, batch+args.inactive,
+                                       args.inactive, final_batch,
+                                       args.scores, args.noise,
+                                       args.particles, i+1, args.lattice)
+
+    filename = get_statepoint_filename(assembly, None, final_batch)
+    filenames.append(filename)
+
+    if not os.path.exists(os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+
+    synthetic.write_statepoint(filename, core.get_pin_means(index, means),
+                               final_batch, args.inactive, final_batch,
+                               args.scores, args.noise, args.particles, 1,
+                               args.lattice)
+
+    return filenames, len(filenames), get_size(filenames)
+
+
+def parse(filenames):
+    '''Reads the metadata and tally results of each statepoint.'''
+
+    statepoints = {}
+
+    for filename in filenames:
+        sp = StatePoint(filename)
+        sp.read_results()
+        statepoints[filename] = sp
+
+    return statepoints, len(filenames), get_size(filenames)
+
+
+def extract(statepoints):
+    '''Extracts the mean of each score from each statepoint.'''
+
+    means = {}
+
+    for filename, sp in statepoints.items():
+        means[filename] = {}
+
+        for score in args.scores:
+            means[filename][score] = sp.extract_results(1, score)['mean']
+
+    return means, len(statepoints) * len(args.scores), None
+
+
+def export_tallies(group, means, mesh_shape):
+    '''Stores the reaction rates and cross-sections for each energy group in
+       an HDF5 group (as features.py and targets.py).'''
+
+    groups = [group.create_group(energy) for energy in energies]
+    shape = tuple(mesh_shape) + (args.groups,)
+
+    # Reshape to grid with energy group as third index
+    flux = np.reshape(means['flux'], shape)
+
+    for score in args.scores:
+        rxn_rate = np.reshape(means[score], shape)
+
+        for g in range(args.groups):
+            groups[g].create_dataset(synthetic.RATE_NAMES[score],
+                                     data=rxn_rate[:,:,g])
+
+        # Compute group cross-sections for each reaction rate
+        if score in synthetic.XS_NAMES:
+            xs = np.nan_to_num(rxn_rate / flux)
+
+            for g in range(args.groups):
+                groups[g].create_dataset(synthetic.XS_NAMES[score],
+                                         data=xs[:,:,g])
+
+
+def features(assembly, means):
+    '''Writes an assembly's features file for each seed and batch.'''
+
+    filename = os.path.join(directory, assembly + '-features.h5')
+    feature_file = h5.File(filename, 'w')
+    assembly_group = feature_file.create_group(assembly)
+
+    for seed in seeds:
+        seed_group = assembly_group.create_group(seed)
+
+        for batch in batches:
+            batch += args.inactive
+            batch_group = seed_group.create_group('Batch-' + str(batch))
+            sp_means = means[get_statepoint_filename(assembly, seed, batch)]
+            export_tallies(batch_group, sp_means, core.get_mesh_shape())
+
+    feature_file.close()
+
+    return filename, len(seeds) * len(batches), get_size([filename])
+
+
+def targets(assembly, means):
+    '''Adds an assembly's targets from its pinwise statepoint to the targets
+       file.'''
+
+    filename = os.path.join(directory, 'sample-targets.h5')
+    target_file = h5.File(filename, 'a')
+    assembly_group = target_file.create_group(assembly)
+
+    sp_means = means[get_statepoint_filename(assembly, None, final_batch)]
+    export_tallies(assembly_group, sp_means, args.lattice)
+
+    target_file.close()
+
+    return filename, 1, None
+
+
+def export_samples(samples, mc_features, geom_features, targets):
+    '''Appends the samples for one seed, batch, energy and dataset to an HDF5
+       group (as exportSamples in samples.py).'''
+
+    r = args.refinement
+    num_features = r*r + geom_features.shape[1]
+
+    new_features = np.zeros((num_pins, num_features))
+    new_targets = np.zeros((num_pins, 1))
+
+    sample_cnt = 0
+
+    for x in range(args.lattice[0]):
+        for y in range(args.lattice[1]):
+
+            mask = [(x*r+i, y*r+j) for j in range(r) for i in range(r)]
+
+            # Populate the feature vector for this sample
+            for i in enumerate(mask):
+                new_features[sample_cnt, i[0]] = mc_features[i[1][0], i[1][1]]
+
+            # Append geometry/materials features to the feature vector
+            new_features[sample_cnt, r*r:] = geom_features[sample_cnt,:]
+
+            # Extract the target for this sample
+            new_targets[sample_cnt] = targets[x][y]
+
+            sample_cnt += 1
+
+    # Concatenate new features and targets to the existing datasets
+    if 'Features' in samples:
+        feature_dataset = samples['Features']
+        target_dataset = samples['Targets']
+
+        num_samples = feature_dataset.shape[0]
+        feature_dataset.resize((num_samples+num_pins, num_features))
+        target_dataset.resize((num_samples+num_pins, 1))
+
+        feature_dataset[num_samples:,:] = new_features
+        target_dataset[num_samples:] = new_targets
+
+    else:
+        samples.create_dataset('Features', (num_pins, num_features),
+                               maxshape=(None, num_features))
+        samples.create_dataset('Targets', (num_pins, 1), maxshape=(None, 1))
+
+        samples['Features'][:,:] = new_features
+        samples['Targets'][:,:] = new_targets
+
+
+def assemble_samples(index, feature_filename, target_filename):
+    '''Writes an assembly's samples file from its features and targets.'''
+
+    assembly = assemblies[index]
+    filename = os.path.join(directory, assembly + '-samples.h5')
+    sample_file = h5.File(filename, 'w')
+    sample_file.attrs['# Energy Groups'] = args.groups
+    sample_file.attrs['# Batches'] = batches[-1]
+    sample_file.attrs['# Particles / Batch'] = args.particles
+    sample_file.attrs['# Inactive Batches'] = args.inactive
+
+    mc_feature_file = h5.File(feature_filename, 'r')
+    target_file = h5.File(target_filename, 'r')
+
+    geom_features = core.get_geometry_features(index)
+    targets = target_file[assembly]
+    datasets = targets[energies[0]].keys()
+
+    num_samples = 0
+
+    for seed in seeds:
+        for batch in batches:
+            batch_group = sample_file.require_group('Batch-' + str(batch))
+            mc_features = mc_feature_file[assembly][seed]
+            mc_features = mc_features['Batch-' + str(batch+args.inactive)]
+
+            for energy in energies:
+                energy_group = batch_group.require_group(energy)
+
+                for dataset in datasets:
+                    export_samples(energy_group.require_group(dataset),
+                                   mc_features[energy][dataset][...],
+                                   geom_features,
+                                   targets[energy][dataset][...])
+                    num_samples += num_pins
+
+    sample_file.close()
+    mc_feature_file.close()
+    target_file.close()
+
+    return filename, num_samples, get_size([filename])
+
+
+def build_clusters(X):
+    '''Scales and clusters the feature vectors with k-means.'''
+
+    model = cluster.Cluster(X)
+    model.build_clusters('kmeans', args.clusters)
+
+    return model, X.shape[0], None
+
+
+def fit(model, X, y):
+    '''Fits a regression model.'''
+
+    return model.fit(X, y), X.shape[0], None
+
+
+def predict(model, X):
+    '''Predicts the target values with a regression model.'''
+
+    return model.predict(X), X.shape[0], None
+
+
+################################################################################
+#################################  BENCHMARKS  #################################
+################################################################################
+
+print 'Benchmarking ' + str(len(assemblies)) + ' ' + str(args.lattice[0]) + \
+      'x' + str(args.lattice[1]) + ' assemblies with ' + str(args.groups) + \
+      ' groups, ' + str(args.seeds) + ' seeds and ' + str(len(batches)) + \
+      ' batches in ' + directory
+
+start = time.time()
+
+try:
+    sample_filenames = []
+
+    for i, assembly in enumerate(assemblies):
+
+        print 'Exporting ' + assembly
+
+        filenames = run_stage('generate', 'statepoints', generate, i)
+        statepoints = run_stage('parse', 'statepoints', parse, filenames)
+        means = run_stage('extract', 'tallies', extract, statepoints)
+        del statepoints
+
+        feature_filename = run_stage('features', 'statepoints', features,
+                                     assembly, means)
+        target_filename = run_stage('targets', 'statepoints', targets,
+                                    assembly, means)
+        sample_filenames.append(run_stage('samples', 'samples',
+                                          assemble_samples, i,
+                                          feature_filename, target_filename))
+
+    # Load the samples for the total cross-section of the final batch
+    X = []
+    y = []
+
+    for filename in sample_filenames:
+        sample_file = h5.File(filename, 'r')
+        samples = sample_file['Batch-' + str(batches[-1])][energies[0]]
+        X.append(samples['Tot. XS']['Features'][...])
+        y.append(samples['Tot. XS']['Targets'][:,0])
+        sample_file.close()
+
+    X = np.vstack(X)
+    y = np.hstack(y)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, \
+                                                        test_size=args.split, \
+                                                        random_state=10)
+
+    run_stage('cluster', 'samples', build_clusters, X)
+
+    # Scale the width of the epsilon-insensitive tube to the spread of the
+    # targets, since the default (0.1) exceeds the spread of the cross-section
+    # targets and the SVR would fit a constant with no support vectors
+    svr = SVR(kernel='rbf', C=1e3, gamma=0.1, epsilon=0.1*np.std(y_train))
+    run_stage('svr-train', 'samples', fit, svr, X_train, y_train)
+
+    # Record the number of support vectors such that a degenerate fit is
+    # visible in the report
+    stages[-1]['support_vectors'] = len(svr.support_)
+
+    run_stage('svr-predict', 'samples', predict, svr, X_test)
+
+    cart = tree.DecisionTreeRegressor()
+    run_stage('tree-train', 'samples', fit, cart, X_train, y_train)
+    run_stage('tree-predict', 'samples', predict, cart, X_test)
+
+finally:
+    if args.directory is None and not args.keep:
+        shutil.rmtree(directory)
+
+
+################################################################################
+###################################  REPORT  ###################################
+################################################################################
+
+for stage in stages:
+    print '%-14s %9.3f sec %12.1f %s/sec %9.1f MB peak RSS' % \
+        (stage['name'], stage['wall_time'], stage['throughput'],
+         stage['units'], stage['peak_rss_mb'])
+
+report = {'config': {'assemblies': args.assemblies, 'lattice': args.lattice,
+                     'refinement': args.refinement, 'groups': args.groups,
+                     'scores': args.scores, 'seeds': args.seeds,
+                     'batches': batches, 'inactive': args.inactive,
+                     'particles': args.particles, 'noise': args.noise,
+                     'clusters': args.clusters, 'split': args.split},
+          'platform': {'python': platform.python_version(),
+                       'numpy': np.__version__, 'h5py': h5.__version__,
+                       'machine': platform.machine(),
+                       'node': platform.node()},
+          'total_time': time.time() - start,
+          'stages': stages}
+
+with open(args.output, 'w') as output:
+    json.dump(report, output, indent=2, sort_keys=True)
+
+print 'Total time %0.2f sec, reported to %s' % (report['total_time'],
+                                                 args.output)
+
+# Report the stages which are slower than the baseline
+if args.baseline is not None:
+
+    with open(args.baseline, 'r') as baseline_file:
+        baseline = json.load(baseline_file)
+
+    if baseline['config'] != report['config']:
+        print 'WARNING: The baseline ' + args.baseline + ' was run with a ' + \
+              'different configuration'
+
+    baseline_times = dict((stage['name'], stage['wall_time']) \
+                          for stage in baseline['stages'])
+    regressions = []
+
+    for stage in stages:
+        if stage['name'] not in baseline_times:
+            continue
+        if max(stage['wall_time'], baseline_times[stage['name']]) < \
+           MIN_COMPARE_TIME:
+            continue
+
+        ratio = stage['wall_time'] / max(baseline_times[stage['name']], 1e-9)
+
+        if ratio > 1. + args.tolerance:
+            regressions.append(stage['name'])
+            print 'REGRESSION: %s is %0.2fx slower than the baseline' % \
+                (stage['name'], ratio)
+
+    if len(regressions) > 0:
+        sys.exit(1)
+    else:
+        print 'No stages are slower than the baseline by more than ' + \
+              '%d%%' % (100 * args.tolerance)
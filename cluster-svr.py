@@ -21,12 +21,17 @@
    data in each cluster. Finally, the model is used to predict the target 
    values for the test samples and the Root Mean Square (RMS) error with 
    respect to the true target values is computed and reported to the bash.
+   An approximate RBF kernel model (a rank 200 Nystroem feature map with ridge
+   regression) is fit per cluster alongside the SVR models for comparison.
 '''
 
-import math
 import h5py as h5
 import numpy as np
+from cluster import approximate
 from cluster import cluster
+from cluster import error_metrics
+from cluster import profiling
+from cluster import regression
 
 from sklearn.svm import SVR
 from sklearn.cross_validation import train_test_split
@@ -58,11 +63,14 @@ energy = 'Low Energy'
 tally = 'Fiss. XS'
 
 # Get target regression values for each sample
-targets = sample_file[batch][energy][tally]['Targets'][...]
-targets = np.reshape(targets, 2890)
+with profiling.timer('Read samples'):
+    targets = sample_file[batch][energy][tally]['Targets'][...]
+    profiling.count('bytes read', targets.nbytes)
+    targets = np.reshape(targets, 2890)
 
-# Get the feature vectors for each sample
-features = sample_file[batch][energy][tally]['Features'][...]
+    # Get the feature vectors for each sample
+    features = sample_file[batch][energy][tally]['Features'][...]
+    profiling.count('bytes read', features.nbytes)
 
 
 
@@ -71,8 +79,6 @@ features = sample_file[batch][energy][tally]['Features'][...]
 ################################################################################
 
 split = .33
-training = int((1-split)*len(features))
-testing = int(split*len(features))
 
 #### Split the data
 X_train, X_test, y_train, y_test = train_test_split(features, targets, 
@@ -85,14 +91,22 @@ X_train, X_test, y_train, y_test = train_test_split(features, targets,
 ################################################################################
 
 num_clusters = 10
-cluster_model = cluster.Cluster(X_train)
-cluster_model.build_clusters(method='kmeans', num_clusters=num_clusters)
 
-inertia = cluster_model.get_inertia()
-silhouette = cluster_model.get_silhouette()
-print 'inertia = %f \t silhouette = %f' % (inertia, silhouette)
+# Reuse the saved cluster model if it was built from the same training data
+cluster_file = 'data/cluster-svr-' + str(num_clusters) + '-clusters.h5'
+with profiling.timer('Build clusters'):
+    cluster_model = cluster.load_cluster(cluster_file, X_train)
+
+    if cluster_model is None:
+        cluster_model = cluster.Cluster(X_train)
+        cluster_model.build_clusters(method='kmeans',
+                                     num_clusters=num_clusters)
+        cluster_model.save(cluster_file, include_samples=True)
 
-indices = cluster_model.clusterize(X_train)
+    inertia = cluster_model.get_inertia()
+    silhouette = cluster_model.get_silhouette()
+
+print 'inertia = %f \t silhouette = %f' % (inertia, silhouette)
 
 
 
@@ -100,96 +114,66 @@ indices = cluster_model.clusterize(X_train)
 ###############################    SVR REGRESSION   ############################
 ################################################################################
 
+# Fit a clustered SVR model for each kernel type. The models share the cluster
+# model built above and fit an SVR model on the samples within each cluster.
 models = {}
-
-for c in range(num_clusters):
-
-    models[c] = {}
-
-    cluster_features = X_train[indices[c],:]
-    cluster_targets = y_train[indices[c]]
-
-    models[c]['rbf'] = SVR(kernel='rbf', C=1e3, gamma=0.1)
-    models[c]['linear'] = SVR(kernel='linear', C=1e3)
-    models[c]['poly'] = SVR(kernel='poly', C=1e3, degree=2)
-
-    models[c]['rbf'].fit(cluster_features, cluster_targets)
-    models[c]['linear'].fit(cluster_features, cluster_targets)
-    models[c]['poly'].fit(cluster_features, cluster_targets)
+models['rbf'] = SVR(kernel='rbf', C=1e3, gamma=0.1)
+models['linear'] = SVR(kernel='linear', C=1e3)
+models['poly'] = SVR(kernel='poly', C=1e3, degree=2)
+models['nystroem'] = approximate.ApproximateKernelRidge(method='nystroem', \
+                                                        n_components=200, \
+                                                        gamma=0.1)
+
+with profiling.timer('Fit models'):
+    for kernel in models:
+        models[kernel] = \
+            regression.ClusteredRegressor(models[kernel],
+                                          cluster_model=cluster_model,
+                                          transform=False, n_jobs=-1)
+        models[kernel].fit(X_train, y_train)
 
 
 ################################################################################
 ###########################    CLUSTER/SVR PREDICTION   ########################
 ################################################################################
 
-y_train_rbf = np.zeros(len(y_train))
-y_train_lin = np.zeros(len(y_train))
-y_train_poly = np.zeros(len(y_train))
+with profiling.timer('Predict'):
+    y_train_rbf = models['rbf'].predict(X_train)
+    y_train_lin = models['linear'].predict(X_train)
+    y_train_poly = models['poly'].predict(X_train)
+    y_train_nys = models['nystroem'].predict(X_train)
 
-for c in range(num_clusters):
-
-    cluster_features = X_train[indices[c],:]
-
-    y_train_rbf[indices[c]] = models[c]['rbf'].predict(cluster_features)
-    y_train_lin[indices[c]] = models[c]['linear'].predict(cluster_features)
-    y_train_poly[indices[c]] = models[c]['poly'].predict(cluster_features)
-
-indices = cluster_model.clusterize(X_test)
-
-y_test_rbf = np.zeros(len(y_test))
-y_test_lin = np.zeros(len(y_test))
-y_test_poly = np.zeros(len(y_test))
-
-for c in range(num_clusters):
-
-    cluster_features = X_test[indices[c]]
-
-    y_test_rbf[indices[c]] = models[c]['rbf'].predict(cluster_features)
-    y_test_rbf[indices[c]] = models[c]['linear'].predict(cluster_features)
-    y_test_rbf[indices[c]] = models[c]['poly'].predict(cluster_features)
+    y_test_rbf = models['rbf'].predict(X_test)
+    y_test_lin = models['linear'].predict(X_test)
+    y_test_poly = models['poly'].predict(X_test)
+    y_test_nys = models['nystroem'].predict(X_test)
 
 
 ################################################################################
 ##########################    TRAINING/TESTING ERROR   #########################
 ################################################################################
 
-error_train_rbf=0
-error_train_lin=0
-error_train_poly=0
-
-# loop over clusters
-for i in range(training):
-    diff_train_rbf = y_train_rbf[i] - y_train[i]
-    diff_train_lin = y_train_lin[i] - y_train[i]
-    diff_train_poly = y_train_poly[i] - y_train[i]
-    error_train_rbf = error_train_rbf + diff_train_rbf*diff_train_rbf
-    error_train_lin = error_train_lin + diff_train_lin*diff_train_lin
-    error_train_poly = error_train_poly + diff_train_poly*diff_train_poly
-
-error_train_rbf = math.sqrt(error_train_rbf / training)
-error_train_lin = math.sqrt(error_train_lin / training)
-error_train_poly = math.sqrt(error_train_poly / training)
-
-error_test_rbf=0
-error_test_lin=0
-error_test_poly=0
-
-for i in range(testing):
-    diff_test_rbf = y_test_rbf[i] - y_test[i]
-    diff_test_lin = y_test_lin[i] - y_test[i]
-    diff_test_poly = y_test_poly[i] - y_test[i]
-    error_test_rbf = error_test_rbf + diff_test_rbf*diff_test_rbf
-    error_test_lin = error_test_lin + diff_test_lin*diff_test_lin
-    error_test_poly = error_test_poly + diff_test_poly*diff_test_poly
-
-error_test_rbf = math.sqrt(error_test_rbf / testing)
-error_test_lin = math.sqrt(error_test_lin / testing)
-error_test_poly = math.sqrt(error_test_poly / testing)
+#### Calculate training and testing error for all of the models at once
+with profiling.timer('Compute errors'):
+    train_predictions = np.vstack((y_train_rbf, y_train_lin, y_train_poly, \
+                                   y_train_nys))
+    test_predictions = np.vstack((y_test_rbf, y_test_lin, y_test_poly, \
+                                  y_test_nys))
+
+    train_errors = error_metrics.compute_errors(train_predictions, y_train)
+    test_errors = error_metrics.compute_errors(test_predictions, y_test)
+
+    error_train_rbf, error_train_lin, error_train_poly, error_train_nys = \
+        train_errors['rms']
+    error_test_rbf, error_test_lin, error_test_poly, error_test_nys = \
+        test_errors['rms']
 
 print 'RBF kernel training error is %0.10f' % (error_train_rbf)
 print 'Linear kernel training error is %0.10f' % (error_train_lin)
 print 'Polynomial, 2nd degree, training error is %0.10f' % (error_train_poly)
+print 'Nystroem RBF kernel training error is %0.10f' % (error_train_nys)
 
 print 'RBF kernel testing error is %0.10f' % (error_test_rbf)
 print 'Linear kernel testing error is %0.10f' % (error_test_lin)
 print 'Polynomial, 2nd degree, testing error is %0.10f' % (error_test_poly)
+print 'Nystroem RBF kernel testing error is %0.10f' % (error_test_nys)
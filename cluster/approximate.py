@@ -0,0 +1,294 @@
+'''Kernel approximation regressors for large or related sets of samples.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import approximate"
+
+   The ApproximateKernelRidge class approximates an RBF kernel with a rank
+   n_components feature map, either the Nystroem method on a random subset of
+   the samples or random Fourier features, and solves for the weights of a
+   ridge regression model on the mapped features. The training samples are
+   read in chunks (from a NumPy array or a samples.SampleStream) and only the
+   n_components x n_components normal equations are accumulated, such that
+   the cost is linear in the number of samples and the model may be trained
+   on pooled samples from many assemblies, batches and seeds. The targets may
+   be a matrix with one column per output (ie, per energy and tally), in which
+   case the outputs share the feature map and normal equations and are solved
+   for together.
+
+   The ApproximateSVR class approximates sklearn's SVR with an RBF kernel by
+   mapping the feature vectors onto random Fourier features (sklearn's
+   RBFSampler) and fitting a linear model with the same epsilon-insensitive
+   loss and L2 penalty by stochastic gradient descent (sklearn's
+   SGDRegressor). The SVR penalty C on N samples is equivalent to an SGD
+   regularization strength alpha = 1 / (C N).
+
+   Unlike SVR, the model can be warm-started: with warm_start=True, each call
+   to fit keeps the random feature map and starts SGD from the previous
+   weights. This is useful when fitting a sequence of closely related
+   datasets, such as the samples for consecutive batch counts, since each fit
+   then converges in a fraction of the iterations of a cold start.
+
+   Both classes follow sklearn's estimator conventions (with their parameters
+   as public attributes) such that they may be cloned and used with the
+   search and regression modules.
+'''
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import SGDRegressor
+
+
+# The default number of samples mapped onto the kernel features at a time
+CHUNK_SIZE = 4096
+
+
+def _iter_chunks(X, chunk_size):
+    '''Yields chunks of rows from an array or an iterable of chunks.'''
+
+    if hasattr(X, 'shape'):
+        for start in range(0, X.shape[0], chunk_size):
+            yield X[start:start+chunk_size]
+    else:
+        for chunk in X:
+            yield chunk
+
+
+class ApproximateSVR(BaseEstimator, RegressorMixin):
+    '''The ApproximateSVR class.
+
+       This class fits an epsilon-insensitive linear model on random Fourier
+       features approximating an RBF kernel.
+    '''
+
+    def __init__(self, C=1.0, epsilon=0.1, gamma=0.1, n_components=500,
+                 max_iter=1000, tol=1e-4, warm_start=False, random_state=1):
+        '''Initialize the ApproximateSVR class.
+
+           C, epsilon and gamma are as for sklearn's SVR with an RBF kernel.
+           The kernel is approximated with n_components random Fourier
+           features. SGD runs for at most max_iter epochs, stopping when an
+           epoch improves the loss by less than tol. If warm_start is True,
+           each call to fit starts from the previous fit's feature map and
+           weights.
+        '''
+
+        self.C = C
+        self.epsilon = epsilon
+        self.gamma = gamma
+        self.n_components = n_components
+        self.max_iter = max_iter
+        self.tol = tol
+        self.warm_start = warm_start
+        self.random_state = random_state
+
+
+    def fit(self, X, y):
+        '''Fits the model to the feature vectors X and targets y.
+
+           Returns this ApproximateSVR for convenience.
+        '''
+
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).ravel()
+
+        alpha = 1. / (self.C * X.shape[0])
+
+        # Build a new feature map and SGD model unless warm-starting
+        if not self.warm_start or not hasattr(self, 'sgd_model_'):
+            self.feature_map_ = RBFSampler(gamma=self.gamma,
+                                           n_components=self.n_components,
+                                           random_state=self.random_state)
+            self.feature_map_.fit(X)
+            self.sgd_model_ = SGDRegressor(loss='epsilon_insensitive',
+                                           epsilon=self.epsilon, alpha=alpha,
+                                           max_iter=self.max_iter,
+                                           tol=self.tol, warm_start=True,
+                                           random_state=self.random_state)
+        else:
+            self.sgd_model_.set_params(epsilon=self.epsilon, alpha=alpha)
+
+        self.sgd_model_.fit(self.feature_map_.transform(X), y)
+
+        return self
+
+
+    def predict(self, X):
+        '''Returns the predicted target value for each sample in X.'''
+
+        if not hasattr(self, 'sgd_model_'):
+            raise Exception('Cannot make predictions until the fit ' + \
+                            'method is called')
+
+        X = np.asarray(X, dtype=np.float64)
+
+        return self.sgd_model_.predict(self.feature_map_.transform(X))
+
+
+    def get_num_iterations(self):
+        '''Returns the number of SGD epochs run by the last call to fit.'''
+
+        return self.sgd_model_.n_iter_
+
+
+
+class ApproximateKernelRidge(BaseEstimator, RegressorMixin):
+    '''The ApproximateKernelRidge class.
+
+       This class fits a ridge regression model on a low rank feature map
+       approximating an RBF kernel.
+    '''
+
+    def __init__(self, method='nystroem', n_components=500, gamma=0.1,
+                 alpha=1e-3, chunk_size=CHUNK_SIZE, random_state=1):
+        '''Initialize the ApproximateKernelRidge class.
+
+           The RBF kernel with width gamma is approximated with a rank
+           n_components feature map built by the 'nystroem' or 'fourier'
+           method. The ridge penalty on the weights is alpha. The samples are
+           mapped onto the features chunk_size rows at a time.
+        '''
+
+        self.method = method
+        self.n_components = n_components
+        self.gamma = gamma
+        self.alpha = alpha
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+
+    def _get_landmarks(self, X):
+        '''Returns a uniform random subset of n_components samples.
+
+           Each sample is given a random key and the samples with the
+           smallest keys are kept, such that the subset is drawn in one pass
+           over the chunks of samples.
+        '''
+
+        random = np.random.RandomState(self.random_state)
+        landmarks = None
+        keys = None
+
+        for chunk in _iter_chunks(X, self.chunk_size):
+            chunk = np.asarray(chunk, dtype=np.float64)
+            chunk_keys = random.rand(chunk.shape[0])
+
+            if landmarks is None:
+                landmarks, keys = chunk, chunk_keys
+            else:
+                landmarks = np.concatenate((landmarks, chunk))
+                keys = np.concatenate((keys, chunk_keys))
+
+            keep = np.argsort(keys)[:self.n_components]
+            landmarks, keys = landmarks[keep], keys[keep]
+
+        if landmarks is None:
+            raise Exception('Unable to fit the model since no samples ' + \
+                            'were read')
+
+        return landmarks
+
+
+    def fit(self, X, y):
+        '''Fits the model to the feature vectors X and targets y.
+
+           X and y may be NumPy arrays or SampleStreams (over the 'Features'
+           and 'Targets' datasets with the same chunk_size) or any other
+           iterables over matching chunks of rows. The Nystroem method reads
+           X twice (once to draw the landmark samples), so it must be
+           re-iterable. Returns this ApproximateKernelRidge for convenience.
+        '''
+
+        if hasattr(X, 'shape'):
+            X = np.asarray(X, dtype=np.float64)
+            y = np.asarray(y, dtype=np.float64)
+
+        # Build the feature map
+        if self.method == 'nystroem':
+            landmarks = self._get_landmarks(X)
+            self.feature_map_ = Nystroem(kernel='rbf', gamma=self.gamma,
+                                         n_components=landmarks.shape[0],
+                                         random_state=self.random_state)
+            self.feature_map_.fit(landmarks)
+
+        elif self.method == 'fourier':
+            self.feature_map_ = None
+
+        else:
+            raise Exception('Unable to fit the model with method ' + \
+                            str(self.method) + ' which is not supported')
+
+        # Accumulate the normal equations for the mapped features
+        ZtZ = 0.
+        Zty = 0.
+        z_sum = 0.
+        y_sum = 0.
+        num_samples = 0
+
+        for X_chunk, y_chunk in zip(_iter_chunks(X, self.chunk_size),
+                                    _iter_chunks(y, self.chunk_size)):
+
+            X_chunk = np.asarray(X_chunk, dtype=np.float64)
+            y_chunk = np.asarray(y_chunk, dtype=np.float64)
+
+            # Targets with one column are treated as a single output
+            if y_chunk.ndim == 2 and y_chunk.shape[1] == 1:
+                y_chunk = y_chunk[:,0]
+
+            # The random Fourier features only need the number of features
+            if self.feature_map_ is None:
+                self.feature_map_ = RBFSampler(gamma=self.gamma,
+                                               n_components=self.n_components,
+                                               random_state=self.random_state)
+                self.feature_map_.fit(X_chunk)
+
+            Z = self.feature_map_.transform(X_chunk)
+
+            ZtZ = ZtZ + np.dot(Z.T, Z)
+            Zty = Zty + np.dot(Z.T, y_chunk)
+            z_sum = z_sum + np.sum(Z, axis=0)
+            y_sum = y_sum + np.sum(y_chunk, axis=0)
+            num_samples += Z.shape[0]
+
+        if num_samples == 0:
+            raise Exception('Unable to fit the model since no samples ' + \
+                            'were read')
+
+        # Solve the centered ridge regression problem for the weights
+        z_mean = z_sum / num_samples
+        y_mean = y_sum / num_samples
+
+        A = ZtZ - num_samples * np.outer(z_mean, z_mean)
+        A[np.diag_indices_from(A)] += self.alpha
+        b = Zty - num_samples * np.outer(z_mean, y_mean).reshape(Zty.shape)
+
+        self.coef_ = np.linalg.solve(A, b)
+        self.intercept_ = y_mean - np.dot(z_mean, self.coef_)
+        self.num_samples_ = num_samples
+
+        return self
+
+
+    def predict(self, X):
+        '''Returns the predicted target value for each sample in X.
+
+           X may be a NumPy array or an iterable over chunks of samples (such
+           as a SampleStream).
+        '''
+
+        if not hasattr(self, 'coef_'):
+            raise Exception('Cannot make predictions until the fit ' + \
+                            'method is called')
+
+        predictions = []
+
+        for chunk in _iter_chunks(X, self.chunk_size):
+            Z = self.feature_map_.transform(np.asarray(chunk,
+                                                       dtype=np.float64))
+            predictions.append(np.dot(Z, self.coef_) + self.intercept_)
+
+        if len(predictions) == 0:
+            return np.zeros(0)
+
+        return np.concatenate(predictions)
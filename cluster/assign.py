@@ -0,0 +1,118 @@
+'''A nearest-centroid assignment kernel for high-volume cluster prediction.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import assign"
+
+   The CentroidAssigner class assigns a cluster ID to each sample in a batch
+   of feature vectors without going through sklearn's input validation. The
+   feature scaling, PCA projection and squared distance to each centroid are
+   folded into a single affine map, since for feature vectors x, projection W,
+   offset b and centroids c:
+
+       argmin_c ||xW + b - c||^2 = argmin_c ( x (-2 W c^T) + ||c||^2 - 2 b c^T )
+
+   Each chunk of samples is therefore assigned with one matrix product and an
+   argmin over clusters.
+'''
+
+import numpy as np
+
+
+# The default number of samples assigned per matrix product
+CHUNK_SIZE = 8192
+
+
+class CentroidAssigner:
+    '''The CentroidAssigner class.
+
+       This class stores the fused scaling, projection and centroid arrays
+       for a clustering model and assigns cluster IDs to batches of samples.
+    '''
+
+    def __init__(self, centroids, mean=None, std=None, pca_mean=None,
+                 pca_components=None, chunk_size=CHUNK_SIZE):
+        '''Initialize the CentroidAssigner class.
+
+           Takes in the cluster centroids and, optionally, the scaler mean and
+           standard deviation and the PCA mean and components that map input
+           feature vectors into the space of the centroids. If these are not
+           given, the inputs are assumed to already be in that space. The
+           mean and standard deviation must be given together, and the PCA
+           mean is zero if only the components are given.
+        '''
+
+        if (mean is None) != (std is None):
+            raise Exception('Unable to create a CentroidAssigner with ' + \
+                            'only one of the scaler mean and standard ' + \
+                            'deviation')
+
+        centroids = np.asarray(centroids, dtype=np.float64)
+        num_features = centroids.shape[1]
+
+        if pca_components is not None:
+            num_features = np.asarray(pca_components).shape[1]
+
+        # Build the affine map z = x W + b into the space of the centroids
+        W = np.eye(num_features)
+        b = np.zeros(num_features)
+
+        if mean is not None:
+            std = np.asarray(std, dtype=np.float64)
+            W = W / std[:,np.newaxis]
+            b = -np.asarray(mean, dtype=np.float64) / std
+
+        if pca_components is not None:
+            components = np.asarray(pca_components, dtype=np.float64)
+
+            if pca_mean is None:
+                pca_mean = np.zeros(num_features)
+
+            b = np.dot(b - pca_mean, components.T)
+            W = np.dot(W, components.T)
+
+        # Fold the map into the distances to each centroid
+        self._weights = np.ascontiguousarray(-2. * np.dot(W, centroids.T))
+        self._offsets = np.sum(centroids**2, axis=1) - \
+                        2. * np.dot(b, centroids.T)
+
+        self._num_features = num_features
+        self._num_clusters = centroids.shape[0]
+        self._chunk_size = chunk_size
+
+
+    def assign(self, X, out=None):
+        '''Returns the cluster ID for each sample (row) in X.
+
+           The samples are assigned chunk_size rows at a time so that the
+           scratch array for the distances is bounded. An integer array may be
+           passed in as out to avoid allocating the result.
+        '''
+
+        X = np.asarray(X, dtype=np.float64)
+
+        if X.ndim == 1:
+            X = X[np.newaxis,:]
+
+        if X.shape[1] != self._num_features:
+            raise Exception('Unable to assign clusters since the samples ' + \
+                            'have ' + str(X.shape[1]) + ' features rather ' + \
+                            'than ' + str(self._num_features))
+
+        num_samples = X.shape[0]
+
+        if out is None:
+            out = np.empty(num_samples, dtype=np.intp)
+
+        scratch = np.empty((min(self._chunk_size, num_samples),
+                            self._num_clusters))
+
+        for start in range(0, num_samples, self._chunk_size):
+            stop = min(start + self._chunk_size, num_samples)
+            scores = scratch[:stop-start]
+
+            np.dot(X[start:stop], self._weights, out=scores)
+            scores += self._offsets
+            out[start:stop] = np.argmin(scores, axis=1)
+
+        return out
@@ -0,0 +1,211 @@
+'''A persistent on-disk cache for model fitting results.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import cache"
+
+   The ResultCache class stores the results of fitting a model to a dataset
+   in an SQLite file so that a re-run of a study only fits the models whose
+   inputs have changed. Each entry is keyed by a hash of the training data
+   (features and targets), the random seed used to split it, and the full
+   set of model parameters (see get_key), and may hold:
+
+       1) The cross-validation scores for each fold
+       2) The fitted model (pickled)
+       3) The RMS errors (or any other JSON-serializable summary)
+
+   The total size of the stored entries is bounded by max_size bytes. When a
+   new entry would exceed it, the least recently used entries are evicted.
+'''
+
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+
+import numpy as np
+
+from cluster import get_data_hash
+
+
+# The default bound on the total size of the cached entries (512 MB)
+MAX_SIZE = 2**29
+
+# The number of seconds to wait for another process to release the file
+TIMEOUT = 60.
+
+
+def get_params(estimator):
+    '''Returns a dictionary of an sklearn model's class name and parameters.'''
+
+    params = estimator.get_params(deep=False)
+    params['model'] = estimator.__class__.__name__
+
+    return params
+
+
+def get_data_hashes(X, y):
+    '''Returns the SHA-1 hex digests of the feature vectors and targets.'''
+
+    return get_data_hash(X), get_data_hash(np.reshape(y, (len(y), -1)))
+
+
+def get_key(X, y, params, seed=None, data_hashes=None, **kwargs):
+    '''Returns a SHA-1 hex digest identifying a model fit.
+
+       The key covers the feature vectors X and targets y, the seed used to
+       split or subsample them, the model parameters (a dictionary, or an
+       sklearn model) and any additional keyword settings (such as the
+       number of cross-validation folds). The digests of X and y may be
+       passed in as data_hashes (see get_data_hashes) when computing the
+       keys of many fits to the same samples.
+    '''
+
+    if hasattr(params, 'get_params'):
+        params = get_params(params)
+
+    if data_hashes is None:
+        data_hashes = get_data_hashes(X, y)
+
+    settings = {'params': params, 'seed': seed}
+    settings.update(kwargs)
+
+    hasher = hashlib.sha1()
+    for data_hash in data_hashes:
+        hasher.update(data_hash.encode('ascii'))
+    hasher.update(json.dumps(settings, sort_keys=True,
+                             default=repr).encode('ascii'))
+
+    return hasher.hexdigest()
+
+
+
+class ResultCache:
+    '''The ResultCache class.
+
+       This class stores and retrieves model fitting results keyed by
+       get_key in an SQLite database file.
+    '''
+
+    def __init__(self, filename='data/results-cache.db', max_size=MAX_SIZE):
+        '''Initialize the ResultCache class.
+
+           Opens (or creates) the SQLite database at filename. The total size
+           of the cached entries is bounded by max_size bytes.
+        '''
+
+        self._filename = filename
+        self._max_size = max_size
+
+        # Wait for other processes writing to the same file (e.g., the
+        # workers of a scheduler.TaskGraph) rather than failing
+        self._db = sqlite3.connect(filename, timeout=TIMEOUT)
+        self._db.execute('CREATE TABLE IF NOT EXISTS results (' + \
+                         'key TEXT PRIMARY KEY, scores TEXT, model BLOB, ' + \
+                         'rms TEXT, size INTEGER, accessed REAL)')
+        self._db.commit()
+
+
+    def get(self, key):
+        '''Returns the cached results for a key or None if it is not cached.
+
+           The results are returned as a dictionary with 'scores' (a NumPy
+           array or None), 'model' (the unpickled model or None) and 'rms'
+           entries.
+        '''
+
+        row = self._db.execute('SELECT scores, model, rms FROM results ' + \
+                               'WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        # Commit the access time right away so that other processes sharing
+        # the file are not locked out while this one fits its models
+        self._db.execute('UPDATE results SET accessed = ? WHERE key = ?',
+                         (time.time(), key))
+        self._db.commit()
+
+        scores, model, rms = row
+        results = {'scores': None, 'model': None, 'rms': None}
+
+        if scores is not None:
+            results['scores'] = np.array(json.loads(scores))
+        if model is not None:
+            results['model'] = pickle.loads(bytes(model))
+        if rms is not None:
+            results['rms'] = json.loads(rms)
+
+        return results
+
+
+    def put(self, key, scores=None, model=None, rms=None):
+        '''Stores the results for a key, replacing any existing entry.
+
+           The scores are the cross-validation scores for each fold, the model
+           is any picklable (fitted) model and the rms is any JSON-serializable
+           value. The least recently used entries are evicted if the cache
+           exceeds its maximum size.
+        '''
+
+        size = 0
+
+        if scores is not None:
+            scores = json.dumps([float(score) for score in np.ravel(scores)])
+            size += len(scores)
+        if model is not None:
+            model = sqlite3.Binary(pickle.dumps(model,
+                                                pickle.HIGHEST_PROTOCOL))
+            size += len(model)
+        if rms is not None:
+            rms = json.dumps(rms, sort_keys=True)
+            size += len(rms)
+
+        self._db.execute('INSERT OR REPLACE INTO results VALUES ' + \
+                         '(?, ?, ?, ?, ?, ?)',
+                         (key, scores, model, rms, size, time.time()))
+        self._evict()
+        self._db.commit()
+
+
+    def _evict(self):
+        '''Deletes the least recently used entries until under max_size.'''
+
+        total = self.get_size()
+
+        if total <= self._max_size:
+            return
+
+        rows = self._db.execute('SELECT key, size FROM results ' + \
+                                'ORDER BY accessed ASC').fetchall()
+
+        for key, size in rows:
+            if total <= self._max_size:
+                break
+
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+            total -= size
+
+
+    def get_size(self):
+        '''Returns the total size in bytes of the cached entries.'''
+
+        total = self._db.execute('SELECT SUM(size) FROM results').fetchone()[0]
+
+        if total is None:
+            return 0
+        else:
+            return total
+
+
+    def get_num_entries(self):
+        '''Returns the number of cached entries.'''
+
+        return self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+
+    def close(self):
+        '''Closes the database file.'''
+
+        self._db.close()
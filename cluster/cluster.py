@@ -11,15 +11,45 @@
 
 '''
 
+import hashlib
+
 import numpy as np
 import h5py as h5
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
-from sklearn import metrics
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import scale
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
+
+import assign
+import profiling
+import quality
+import samples
+
+
+# The version of the HDF5 layout written by Cluster.save. Files written with
+# a different version are ignored by load_cluster and load_averaging_model.
+FILE_VERSION = 1
+
+# The lattice of pins in each (17x17) fuel assembly
+LATTICE_SHAPE = (17, 17)
+
+
+def get_data_hash(X):
+    '''Returns a SHA-1 hex digest for a matrix of feature vectors.
+
+       The digest covers the float64 values and shape of X, so that a saved
+       model can be matched against the data it was built from.
+    '''
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+
+    hasher = hashlib.sha1()
+    hasher.update(str(X.shape).encode('ascii'))
+    hasher.update(X.data)
+
+    return hasher.hexdigest()
 
 
 
@@ -29,20 +59,45 @@ class Cluster:
        This class encapsulates data that is to be clustered using sklearn.
     '''
     
+    @profiling.timed('Cluster.__init__')
     def __init__(self, X):
         '''Initialize the Cluster class.
         
            Takes in a matrix of feature vectors X, scales them and stores
            them as a class attribute. All other class attributes are 
            initialized to default values.
+
+           X may also be a samples.SampleStream over feature vectors stored
+           in the HDF5 samples files. In this case the scaling statistics are
+           accumulated chunk by chunk and the feature vectors are not loaded
+           into memory until they are projected by an incremental PCA model
+           (see build_pca_model).
         '''
 
-        self._X = scale(X)
+        if isinstance(X, samples.SampleStream):
+            self._stream = X
+            hasher = hashlib.sha1()
+            self._mean, self._std = samples.compute_scaling(X, hasher)
+            self._data_hash = hasher.hexdigest()
+            self._X = None
+        else:
+            self._stream = None
+            self._data_hash = get_data_hash(X)
+            self._mean = np.mean(X, axis=0)
+            self._std = np.std(X, axis=0)
+            self._std[self._std == 0.] = 1.
+            self._X = scale(X)
+
         self._model = None
+        self._assigner = None
         self._num_clusters = 0
 
         self._num_pca_components = 0
         self._pca_model = None
+        self._pca_mean = None
+        self._pca_components = None
+        self._pca_variance_ratios = None
+        self._pca_cumulative_ratios = None
 
 
 
@@ -50,6 +105,7 @@ class Cluster:
     ##################################  Clustering  ############################
     ############################################################################
 
+    @profiling.timed('Cluster.build_clusters')
     def build_clusters(self, method='kmeans', num_clusters=5):
         '''Builds a clustering model.
 
@@ -61,13 +117,19 @@ class Cluster:
                  implemented here.
         '''
 
+        if self._X is None:
+            raise Exception('Cannot build clusters for streamed samples ' + \
+                            'until the build_pca_model method is called')
+
         self._num_clusters = num_clusters
+        self._assigner = None
 
         
         if method.lower() == 'kmeans':
             self._model = KMeans(init='k-means++', \
                                      n_clusters=self._num_clusters, n_init=25)
             self._model.fit(self._X)
+            profiling.count('samples', self._X.shape[0])
 
         # TODO: Implement other clustering algorithms HERE
 
@@ -86,9 +148,46 @@ class Cluster:
             raise Exception('Cannot make clustering predictions until' + \
                             'the buildClusters method is called')
         else:
-            return self._model.predict(x)
+            return self._predict_labels(np.atleast_2d(x))
+
+
+    def get_assigner(self, raw=False, chunk_size=assign.CHUNK_SIZE):
+        '''Returns a CentroidAssigner for this clustering model.
+
+           By default the assigner takes samples in the same space as
+           clusterize (the PCA space if a PCA model was built). If raw is
+           True, the assigner applies the scaling and PCA projection fit to
+           the training data, so that it can assign unscaled feature vectors
+           for a whole batch of samples at once.
+        '''
+
+        if self._model is None:
+            raise Exception('Cannot make clustering predictions until' + \
+                            'the buildClusters method is called')
+
+        if not raw:
+            return assign.CentroidAssigner(self._model.cluster_centers_,
+                                           chunk_size=chunk_size)
+
+        return assign.CentroidAssigner(self._model.cluster_centers_,
+                                       self._mean, self._std, self._pca_mean,
+                                       self._pca_components, chunk_size)
+
 
+    def _predict_labels(self, X):
+        '''Returns the index of the nearest cluster centroid for each sample.
 
+           This is equivalent to KMeans.predict but only uses the centroids,
+           so it also works for models restored by load_cluster.
+        '''
+
+        if self._assigner is None:
+            self._assigner = self.get_assigner()
+
+        return self._assigner.assign(X)
+
+
+    @profiling.timed('Cluster.clusterize')
     def clusterize(self, X):
         '''Returns an array of cluster IDs corresponding to each sample.
 
@@ -108,7 +207,7 @@ class Cluster:
 
         # If we are using a PCA model, transform the input data into
         # the space spanned by the singular vectors
-        if self._pca_model is not None:
+        if self._pca_components is not None:
 
             # If the input data does not have the same dimensionality as the
             # PCA components, then we cannot cluster within it
@@ -117,10 +216,14 @@ class Cluster:
                                  'it is not in either the space defined by ' + \
                                  'the original or PCA feature vectors')
 
+        # Find the cluster ID for each sample
+        labels = self._predict_labels(X)
+        profiling.count('samples', labels.shape[0])
+
         # Fill the array with a "mask" index array - an array with the
         # indices for each sample corresponding to cluster i
         for i in range(self._num_clusters):
-            clusters[i] = self._model.predict(X) == i
+            clusters[i] = labels == i
 
         return clusters
 
@@ -130,7 +233,9 @@ class Cluster:
     #####################################  PCA  ################################
     ############################################################################
 
-    def build_pca_model(self, num_components=3):
+    @profiling.timed('Cluster.build_pca_model')
+    def build_pca_model(self, num_components=3, method='full',
+                        batch_size=None, seed=1):
         '''Transforms the feature vectors into singular vector space.
 
            This method uses's sklearn's Principal Component Analysis
@@ -139,13 +244,125 @@ class Cluster:
            vectors into the space defined by first num_components principal
            vectors (those vectors that describe most of the variance of the
            features).
+
+           The method parameter selects the SVD algorithm:
+
+               'full' - exact SVD of the feature vector matrix (default)
+               'randomized' - randomized truncated SVD (seeded by seed)
+               'incremental' - IncrementalPCA fit over minibatches of
+                               batch_size samples, or over the chunks of the
+                               SampleStream this object was built from
+
+           If num_components is a float between 0 and 1, the number of
+           components is chosen as the smallest number that explains at
+           least that fraction of the variance. This is not supported for
+           the randomized SVD which only computes the leading components.
         '''
 
-        self._num_pca_components = num_components
-        self._pca_model = PCA(n_components=self._num_pca_components)
-        self._X = self._pca_model.fit_transform(self._X)
+        num_features = self._mean.shape[0]
+
+        # Determine how many components to fit before truncation
+        if isinstance(num_components, float) and 0. < num_components < 1.:
+            if method.lower() == 'randomized':
+                raise Exception('Unable to choose the number of PCA ' + \
+                                'components by variance for randomized PCA')
+            num_fitted = num_features
+        else:
+            num_fitted = int(num_components)
+
+        if self._stream is not None and \
+           method.lower() in ['full', 'randomized']:
+            raise Exception('Unable to build a ' + method + ' PCA model ' + \
+                            'for streamed samples; use method=\'incremental\'')
+
+        if method.lower() == 'full':
+            self._pca_model = PCA(n_components=min(num_features,
+                                                   self._X.shape[0]))
+            self._pca_model.fit(self._X)
+
+        elif method.lower() == 'randomized':
+            self._pca_model = PCA(n_components=num_fitted,
+                                  svd_solver='randomized', random_state=seed)
+            self._pca_model.fit(self._X)
+
+        elif method.lower() == 'incremental':
+            self._pca_model = IncrementalPCA(n_components=num_fitted)
+
+            # Fit the model one minibatch of scaled feature vectors at a time
+            for chunk in self._get_scaled_chunks(batch_size, num_fitted):
+                self._pca_model.partial_fit(chunk)
+
+        else:
+            raise Exception('PCA method ' + method + ' is not supported')
+
+        # Cache the variance ratios for all fitted components
+        self._pca_variance_ratios = \
+            np.array(self._pca_model.explained_variance_ratio_)
+        self._pca_cumulative_ratios = np.cumsum(self._pca_variance_ratios)
+
+        if num_fitted != int(num_components):
+            num_components = self.get_num_pca_components(num_components)
+
+        # Store the truncated projection as plain arrays
+        self._num_pca_components = int(num_components)
+        self._pca_mean = np.array(self._pca_model.mean_)
+        self._pca_components = \
+            np.array(self._pca_model.components_[:self._num_pca_components])
+
+        # Project the feature vectors into the PCA space
+        if self._stream is None:
+            self._X = self._project(self._X)
+        else:
+            self._X = np.concatenate([self._project(chunk) for chunk in
+                                      self._get_scaled_chunks(batch_size)])
+
+        profiling.count('samples', self._X.shape[0])
+
+
+    def _get_scaled_chunks(self, batch_size=None, min_size=1):
+        '''Yields chunks of scaled feature vectors for PCA.
+
+           For streamed samples, the chunks are read from the SampleStream
+           and scaled with the accumulated statistics. Otherwise the in-memory
+           feature vectors are split into chunks of batch_size samples. Any
+           chunk with fewer than min_size samples is merged into the previous
+           chunk, since IncrementalPCA cannot fit a minibatch with fewer
+           samples than components.
+        '''
+
+        if self._stream is not None:
+            chunks = ((chunk - self._mean) / self._std
+                      for chunk in self._stream)
+
+        else:
+            if batch_size is None:
+                batch_size = max(5 * self._mean.shape[0], 1000)
+
+            chunks = (self._X[start:start+batch_size]
+                      for start in range(0, self._X.shape[0], batch_size))
+
+        # Hold back each chunk until the next one is read
+        previous = None
+
+        for chunk in chunks:
+            if previous is not None:
+                if chunk.shape[0] < min_size:
+                    chunk = np.concatenate([previous, chunk])
+                else:
+                    yield previous
+            previous = chunk
+
+        if previous is not None:
+            yield previous
+
+
+    def _project(self, X):
+        '''Returns scaled feature vectors projected onto the PCA components.'''
+
+        return np.dot(X - self._pca_mean, self._pca_components.T)
 
     
+    @profiling.timed('Cluster.apply_pca_model')
     def apply_pca_model(self, X):
         '''Returns the feature vector projections into PCA space.
 
@@ -154,11 +371,29 @@ class Cluster:
         '''
         
         
-        if self._pca_model is None:
+        if self._pca_components is None:
             raise Exception('Unable to apply a PCA model to inputs since ' + \
                                 'a PCA model has not yet been built')
 
-        return self._pca_model.transform(scale(X))
+        return self._project(scale(X))
+
+
+    @profiling.timed('Cluster.transform')
+    def transform(self, X):
+        '''Returns feature vectors in the space used for clustering.
+
+           Unlike apply_pca_model, which scales X by its own statistics, this
+           method applies the scaling fit to the training feature vectors,
+           followed by the PCA projection if a PCA model was built. It can
+           therefore be used for any number of new samples, including one.
+        '''
+
+        X = (np.asarray(X, dtype=np.float64) - self._mean) / self._std
+
+        if self._pca_components is None:
+            return X
+        else:
+            return self._project(X)
 
 
     def get_pca_variance_ratios(self):
@@ -166,14 +401,33 @@ class Cluster:
 
            The variance ratio is the percentage of the total variance
            in the feature vector matrix that can be explained (spanned) by
-           the corresponding singular vector.
+           the corresponding singular vector. The ratios are cached when the
+           PCA model is built and are returned for all fitted components,
+           which may be more than the number used for the projection.
         '''
         
-        if self._pca_model is None:
+        if self._pca_components is None:
             raise Exception('Unable to get PCA variance ratios since ' + \
                                 'a PCA model has not yet been built')
 
-        return self._pca_model.explained_variance_ratios
+        return self._pca_variance_ratios
+
+
+    def get_num_pca_components(self, variance=0.95):
+        '''Returns the number of PCA components needed to explain variance.
+
+           Finds the smallest number of components whose cumulative variance
+           ratio is at least the given fraction of the total variance. If
+           none of the fitted components reach it, all are returned.
+        '''
+
+        if self._pca_cumulative_ratios is None:
+            raise Exception('Unable to get number of PCA components since ' + \
+                                'a PCA model has not yet been built')
+
+        index = np.searchsorted(self._pca_cumulative_ratios, variance)
+
+        return int(min(index + 1, len(self._pca_cumulative_ratios)))
 
 
 
@@ -199,7 +453,9 @@ class Cluster:
         return self._model.inertia_
 
 
-    def get_silhouette(self):
+    @profiling.timed('Cluster.get_silhouette')
+    def get_silhouette(self, method='sampled', sample_size=2000, seed=1,
+                       chunk_size=quality.CHUNK_SIZE):
         '''Returns the silhouette coefficient for the clustering model.
 
            The silhouette coefficient is a metric for evaluating how well
@@ -207,6 +463,17 @@ class Cluster:
            is bounded between -1 and 1. Scores near zero indicate overlapping
            clusters while higher scores indicated well separated clusters.
 
+           The method parameter selects the estimator:
+
+               'sampled' - mean silhouette of sample_size samples drawn with
+                           a fixed seed (all samples if sample_size is None
+                           or exceeds the number of samples)
+               'exact' - mean silhouette of all samples
+               'simplified' - silhouette from distances to the centroids
+
+           All estimators are computed in blocks of chunk_size samples so
+           that the full pairwise distance matrix is never formed.
+
            NOTE: The concept of silhouette in the context of clustering is
                  discussed briefly in sklearn's online documentation here:
                  http://tinyurl.com/l3en5mc
@@ -216,9 +483,205 @@ class Cluster:
             raise Exception('Cannot compute silhouette score until' + \
                             'the buildClusters method is called')
 
-        return metrics.silhouette_score(self._X, self._model.labels_,
-                                        metric='euclidean',
-                                        sample_size=self._X.shape[0])
+        if method.lower() == 'sampled':
+            return self.get_silhouette_interval(sample_size=sample_size,
+                                                seed=seed,
+                                                chunk_size=chunk_size)[0]
+
+        elif method.lower() == 'exact':
+            return self.get_silhouette_interval(sample_size=None,
+                                                chunk_size=chunk_size)[0]
+
+        elif method.lower() == 'simplified':
+            return quality.simplified_silhouette(self._X, self._model.labels_,
+                                                 self._model.cluster_centers_,
+                                                 chunk_size)
+
+        else:
+            raise Exception('Silhouette method ' + method + ' is not supported')
+
+
+    def get_silhouette_interval(self, confidence=0.95, sample_size=2000,
+                                seed=1, chunk_size=quality.CHUNK_SIZE):
+        '''Returns a sampled silhouette coefficient with confidence bounds.
+
+           The silhouette coefficient is estimated from sample_size samples
+           drawn with a fixed seed and returned as a tuple (mean, lower, upper)
+           where lower and upper bound the true mean silhouette at the given
+           confidence level.
+        '''
+
+        if self._model is None:
+            raise Exception('Cannot compute silhouette score until' + \
+                            'the buildClusters method is called')
+
+        return quality.sampled_silhouette(self._X, self._model.labels_,
+                                          sample_size, seed, confidence,
+                                          chunk_size)
+
+
+    def get_davies_bouldin(self, chunk_size=quality.CHUNK_SIZE):
+        '''Returns the Davies-Bouldin index for the clustering model.
+
+           The Davies-Bouldin index compares the scatter within each cluster
+           to the separation between cluster centroids. The index is bounded
+           below by zero and lower is "better."
+        '''
+
+        if self._model is None:
+            raise Exception('Cannot compute Davies-Bouldin index until' + \
+                            'the buildClusters method is called')
+
+        return quality.davies_bouldin(self._X, self._model.labels_, chunk_size)
+
+
+    def get_calinski_harabasz(self, chunk_size=quality.CHUNK_SIZE):
+        '''Returns the Calinski-Harabasz index for the clustering model.
+
+           The Calinski-Harabasz index is the ratio of the between-cluster
+           variance to the within-cluster variance. Higher is "better."
+        '''
+
+        if self._model is None:
+            raise Exception('Cannot compute Calinski-Harabasz index until' + \
+                            'the buildClusters method is called')
+
+        return quality.calinski_harabasz(self._X, self._model.labels_,
+                                         chunk_size)
+
+
+
+    ############################################################################
+    ###############################  Serialization  ###########################
+    ############################################################################
+
+    def save(self, filename, include_samples=False):
+        '''Saves the scaling, PCA and clustering models to an HDF5 file.
+
+           The file stores plain arrays for the scaler statistics, the PCA
+           components and the cluster centroids, along with the layout version
+           and the hash of the feature vectors the model was built from. If
+           include_samples is True, the scaled (or PCA-projected) feature
+           vectors are stored as well so that the clustering metrics and plots
+           are available after the model is reloaded.
+        '''
+
+        if self._model is None:
+            raise Exception('Cannot save cluster model until' + \
+                            'the buildClusters method is called')
+
+        f = h5.File(filename, 'w')
+        f.attrs['Version'] = FILE_VERSION
+        f.attrs['Model'] = 'Cluster'
+        f.attrs['Data Hash'] = self._data_hash
+        self._write(f.create_group('Cluster'), include_samples)
+        f.close()
+
+
+    def _write(self, group, include_samples=False):
+        '''Writes the model arrays to an HDF5 group.'''
+
+        group.attrs['# Clusters'] = self._num_clusters
+        group.attrs['# PCA Components'] = self._num_pca_components
+        group.attrs['Inertia'] = self._model.inertia_
+
+        group.create_dataset('Scaler Mean', data=self._mean)
+        group.create_dataset('Scaler Std. Dev.', data=self._std)
+        group.create_dataset('Centroids', data=self._model.cluster_centers_)
+        group.create_dataset('Labels', data=self._model.labels_)
+
+        if self._pca_components is not None:
+            group.create_dataset('PCA Mean', data=self._pca_mean)
+            group.create_dataset('PCA Components', data=self._pca_components)
+            group.create_dataset('PCA Variance Ratios',
+                                 data=self._pca_variance_ratios)
+
+        if include_samples:
+            group.create_dataset('Samples', data=self._X)
+
+
+    def _read(self, group):
+        '''Restores the model arrays from an HDF5 group.
+
+           The KMeans model is reconstructed from the stored centroids rather
+           than being refit.
+        '''
+
+        self._num_clusters = int(group.attrs['# Clusters'])
+        self._num_pca_components = int(group.attrs['# PCA Components'])
+
+        self._mean = group['Scaler Mean'][...]
+        self._std = group['Scaler Std. Dev.'][...]
+
+        self._model = KMeans(init='k-means++', n_clusters=self._num_clusters,
+                             n_init=25)
+        self._model.cluster_centers_ = group['Centroids'][...]
+        self._model.labels_ = group['Labels'][...]
+        self._model.inertia_ = float(group.attrs['Inertia'])
+        self._assigner = None
+
+        if 'PCA Components' in group:
+            self._pca_mean = group['PCA Mean'][...]
+            self._pca_components = group['PCA Components'][...]
+            self._pca_variance_ratios = group['PCA Variance Ratios'][...]
+            self._pca_cumulative_ratios = np.cumsum(self._pca_variance_ratios)
+
+        if 'Samples' in group:
+            self._X = group['Samples'][...]
+
+
+
+    ############################################################################
+    #################################  Overlays  ###############################
+    ############################################################################
+
+    def get_overlays(self, X, lattice=LATTICE_SHAPE):
+        '''Returns the cluster ID for each pin of one or more assemblies.
+
+           Takes in the (unscaled) feature vectors for the pins of one or more
+           assemblies, ordered by assembly (ie, random number seed) and then
+           by pin as in the samples files. The feature vectors are scaled and
+           projected as for the training data and assigned to clusters all at
+           once. Returns an array of cluster IDs with shape
+           (num_assemblies,) + lattice.
+        '''
+
+        if self._model is None:
+            raise Exception('Cannot make clustering predictions until' + \
+                            'the buildClusters method is called')
+
+        X = np.asarray(X, dtype=np.float64)
+        num_pins = lattice[0] * lattice[1]
+
+        # A vector of samples with a single feature (ie, target values)
+        if X.ndim == 1:
+            X = X[:,np.newaxis]
+
+        if X.shape[0] % num_pins != 0:
+            raise Exception('Unable to build overlays for ' + \
+                            str(X.shape[0]) + ' samples which are not a ' + \
+                            'multiple of the ' + str(num_pins) + ' pins ' + \
+                            'in each assembly')
+
+        labels = self.get_assigner(raw=True).assign(X)
+
+        return np.reshape(labels, (-1,) + tuple(lattice))
+
+
+    def plot_overlays(self, X, titles=None, title=None, num_columns=5,
+                      lattice=LATTICE_SHAPE):
+        '''Plots the cluster ID for each pin of one or more assemblies.
+
+           The cluster IDs for the feature vectors X (see get_overlays) are
+           plotted as a grid of maps with one map per assembly, with the same
+           color for each cluster in every map. Returns the Matplotlib figure,
+           which is not displayed.
+        '''
+
+        overlays = self.get_overlays(X, lattice)
+
+        return plot_overlays(overlays, titles, title, num_columns,
+                             num_clusters=self._num_clusters)
 
 
 
@@ -362,6 +825,7 @@ class AveragingModel:
         self._cluster_targets = np.zeros(self._cluster._num_clusters)
 
         
+    @profiling.timed('AveragingModel.build_model')
     def build_model(self, targets):
         '''
         '''
@@ -389,3 +853,133 @@ class AveragingModel:
             targets[cluster_indices[c]] = self._cluster_targets[c]
 
         return targets
+
+
+    def save(self, filename, include_samples=False):
+        '''Saves the cluster model and cluster targets to an HDF5 file.
+
+           The file layout is the same as for Cluster.save with an additional
+           dataset for the target value of each cluster.
+        '''
+
+        self._cluster.save(filename, include_samples)
+
+        f = h5.File(filename, 'a')
+        f.attrs['Model'] = 'AveragingModel'
+        f.create_dataset('Cluster Targets', data=self._cluster_targets)
+        f.close()
+
+
+
+def _open_model_file(filename, models, X=None):
+    '''Returns an HDF5 file handle for a saved model if it can be reused.
+
+       Returns None if the file does not exist, was written by a different
+       layout version or for another type of model, or if X is given and its
+       hash does not match the hash of the data the model was built from.
+    '''
+
+    try:
+        f = h5.File(filename, 'r')
+    except IOError:
+        return None
+
+    if f.attrs.get('Version', None) != FILE_VERSION or \
+            f.attrs.get('Model', None) not in models or \
+            (X is not None and f.attrs['Data Hash'] != get_data_hash(X)):
+        f.close()
+        return None
+
+    return f
+
+
+def _read_cluster(f):
+    '''Returns a Cluster object restored from an open model file.'''
+
+    # Initialize an empty placeholder and overwrite it with the stored arrays
+    cluster = Cluster(np.zeros((1, 1)))
+    cluster._data_hash = f.attrs['Data Hash']
+    cluster._X = None
+    cluster._read(f['Cluster'])
+
+    return cluster
+
+
+def load_cluster(filename, X=None):
+    '''Returns a Cluster object restored from an HDF5 file.
+
+       The file may have been written by either Cluster.save or
+       AveragingModel.save.
+
+       If X is given, the saved model is only returned if it was built from
+       the same feature vectors. None is returned if the saved model cannot
+       be reused, in which case the caller should build a new one.
+    '''
+
+    f = _open_model_file(filename, ('Cluster', 'AveragingModel'), X)
+
+    if f is None:
+        return None
+
+    cluster = _read_cluster(f)
+    f.close()
+
+    return cluster
+
+
+def load_averaging_model(filename, X=None):
+    '''Returns an AveragingModel object restored from an HDF5 file.
+
+       If X is given, the saved model is only returned if its cluster model
+       was built from the same feature vectors. None is returned if the saved
+       model cannot be reused.
+    '''
+
+    f = _open_model_file(filename, ('AveragingModel',), X)
+
+    if f is None:
+        return None
+
+    model = AveragingModel(_read_cluster(f))
+    model._cluster_targets = f['Cluster Targets'][...]
+    f.close()
+
+    return model
+
+
+
+def plot_overlays(overlays, titles=None, title=None, num_columns=5,
+                  num_clusters=None):
+    '''Plots a grid of maps of the cluster ID for each pin of an assembly.
+
+       Takes in a sequence of 2D arrays of cluster IDs (ie, from
+       Cluster.get_overlays for the seeds of one assembly, or one overlay for
+       each of several assemblies) with an optional title for each map and
+       for the figure. The maps are drawn num_columns to a row on the same
+       color scale. Returns the Matplotlib figure, which is not displayed.
+    '''
+
+    overlays = [np.asarray(overlay) for overlay in overlays]
+
+    if num_clusters is None:
+        num_clusters = max([np.max(overlay) for overlay in overlays]) + 1
+
+    num_columns = min(num_columns, len(overlays))
+    num_rows = (len(overlays) + num_columns - 1) // num_columns
+
+    fig = plt.figure(figsize=(3*num_columns, 3*num_rows))
+
+    for i, overlay in enumerate(overlays):
+        ax = fig.add_subplot(num_rows, num_columns, i+1)
+        ax.imshow(overlay, interpolation='nearest', vmin=0,
+                  vmax=max(num_clusters-1, 1))
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+        if titles is not None:
+            ax.set_title(titles[i])
+
+    if title is not None:
+        fig.suptitle(title)
+
+    return fig
@@ -0,0 +1,183 @@
+'''Vectorized error metrics for the predictions of one or more models.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import error_metrics"
+
+   The compute_errors function compares the predictions of any number of
+   models (stored as the rows of a models x samples matrix) with the true
+   target values in a single pass and returns a dictionary of:
+
+       'rms' - the Root Mean Square (RMS) error for each model
+       'mae' - the mean absolute error for each model
+       'max' - the maximum absolute error for each model
+       'relative' - the mean absolute error relative to each target value
+                    (over the samples with non-zero targets) for each model
+       'pin rms' - the RMS error for each model and pin (if the pin index of
+                   each sample is given), as a models x pins matrix
+
+   The targets are either a vector with the true target value for each
+   sample, or a matrix of the same shape as the predictions (ie, for the
+   outputs of a multi-output model, stored as rows).
+
+   The ErrorAccumulator class computes the same metrics for predictions
+   which are made in chunks, such that the predictions for all of the samples
+   never need to be stored at once.
+
+   The samples in the samples files are ordered by random number seed and
+   then by pin (see process/samples.py), so the pin index of each sample is
+   its index modulo the number of pins (see get_pins).
+'''
+
+import numpy as np
+
+
+# The number of fuel pins in each (17x17) assembly
+NUM_PINS = 17*17
+
+
+def get_pins(indices, num_pins=NUM_PINS):
+    '''Returns the pin index for each sample index in a samples file.'''
+
+    return np.asarray(indices) % num_pins
+
+
+
+class ErrorAccumulator:
+    '''The ErrorAccumulator class.
+
+       This class accumulates the sums needed for each error metric over
+       chunks of predictions for one or more models.
+    '''
+
+    def __init__(self, num_models=1, num_pins=NUM_PINS):
+        '''Initialize the ErrorAccumulator class for num_models models.'''
+
+        self._num_models = num_models
+        self._num_pins = num_pins
+
+        self._num_samples = 0
+        self._num_nonzero = np.zeros(num_models)
+        self._squared = np.zeros(num_models)
+        self._absolute = np.zeros(num_models)
+        self._relative = np.zeros(num_models)
+        self._max = np.zeros(num_models)
+
+        self._pin_counts = np.zeros(num_pins)
+        self._pin_squared = np.zeros((num_models, num_pins))
+        self._has_pins = False
+
+
+    def update(self, predictions, targets, pins=None):
+        '''Adds a chunk of predictions to the error metrics.
+
+           The predictions are a models x samples matrix (or a vector of
+           samples for a single model) and the targets are a vector of the
+           true target values for each sample (or a models x samples matrix).
+           If pins is given, it is the pin index of each sample and the error
+           is accumulated per pin.
+        '''
+
+        predictions = np.atleast_2d(np.asarray(predictions, dtype=np.float64))
+        targets = np.asarray(targets, dtype=np.float64)
+
+        # Targets may be given as a column vector (ie, from a samples file)
+        if targets.ndim == 2 and targets.shape[1] == 1:
+            targets = targets[:,0]
+
+        targets = np.atleast_2d(targets)
+
+        num_samples = targets.shape[1]
+
+        if predictions.shape != (self._num_models, num_samples) or \
+           targets.shape[0] not in (1, self._num_models):
+            raise Exception('Unable to update the error metrics since the ' + \
+                            'predictions have shape ' + \
+                            str(predictions.shape) + ' rather than ' + \
+                            str((self._num_models, num_samples)))
+
+        errors = predictions - targets
+        absolute = np.abs(errors)
+        squared = errors**2
+
+        self._num_samples += num_samples
+        self._squared += np.sum(squared, axis=1)
+        self._absolute += np.sum(absolute, axis=1)
+
+        if num_samples > 0:
+            self._max = np.maximum(self._max, np.max(absolute, axis=1))
+
+        # Relative errors are only defined for non-zero targets
+        nonzero = targets != 0.
+        scale = np.where(nonzero, np.abs(targets), 1.)
+        self._num_nonzero += np.sum(nonzero, axis=1)
+        self._relative += np.sum(np.where(nonzero, absolute / scale, 0.),
+                                 axis=1)
+
+        if pins is not None:
+            pins = np.ravel(pins)
+            self._has_pins = True
+            self._pin_counts += np.bincount(pins, minlength=self._num_pins)
+
+            for m in range(self._num_models):
+                self._pin_squared[m] += np.bincount(pins, weights=squared[m],
+                                                    minlength=self._num_pins)
+
+
+    def get_errors(self):
+        '''Returns a dictionary of the error metrics for each model.
+
+           See the module documentation for the metrics. Each metric is an
+           array with one entry per model (or a models x pins matrix for the
+           'pin rms' metric, with NaN for pins without any samples).
+        '''
+
+        if self._num_samples == 0:
+            raise Exception('Unable to compute the error metrics since no ' + \
+                            'predictions were given')
+
+        errors = {}
+        errors['rms'] = np.sqrt(self._squared / self._num_samples)
+        errors['mae'] = self._absolute / self._num_samples
+        errors['max'] = self._max.copy()
+
+        # The relative error is NaN for models without non-zero targets
+        num_nonzero = np.where(self._num_nonzero > 0, self._num_nonzero, np.nan)
+        errors['relative'] = self._relative / num_nonzero
+
+        if self._has_pins:
+            counts = np.where(self._pin_counts > 0, self._pin_counts, np.nan)
+            errors['pin rms'] = np.sqrt(self._pin_squared / counts)
+
+        return errors
+
+
+
+def compute_errors(predictions, targets, pins=None, num_pins=NUM_PINS):
+    '''Returns a dictionary of error metrics for one or more models.
+
+       The predictions are a models x samples matrix (or a vector of samples
+       for a single model) and the targets are a vector of the true target
+       value for each sample (or a models x samples matrix). If pins is given,
+       it is the pin index of each sample and the RMS error for each pin is
+       also computed.
+    '''
+
+    predictions = np.atleast_2d(np.asarray(predictions, dtype=np.float64))
+
+    accumulator = ErrorAccumulator(predictions.shape[0], num_pins)
+    accumulator.update(predictions, targets, pins)
+
+    return accumulator.get_errors()
+
+
+def get_rms(predictions, targets):
+    '''Returns the RMS error for one model's predictions (a float) or for
+       each of several models' predictions (an array).'''
+
+    errors = compute_errors(predictions, targets)['rms']
+
+    if np.ndim(predictions) == 1:
+        return errors[0]
+    else:
+        return errors
@@ -0,0 +1,551 @@
+'''Runs experiments over the samples files from a declarative configuration.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import experiment"
+
+   An experiment is described by a configuration file (YAML if PyYAML is
+   installed, or JSON) which lists the slices of the samples files to learn,
+   the models to fit to each slice and the outputs to write, ie:
+
+       data:
+         directory: data
+         assemblies: [Fuel-1.6wo-CRD, Fuel-2.4wo-16BA-grid-56]
+         batches: [100, 1000]
+         energies: [Low Energy, High Energy]
+         tallies: [Tot. XS, Fiss. XS]
+         features: all
+       split: 0.33
+       seed: 10
+       models:
+         - name: rbf-svr
+           estimator: svr
+           params: {kernel: rbf, C: 1000., gamma: 0.1}
+         - name: pca-cluster-svr
+           estimator: svr
+           params: {kernel: rbf, C: 1000., gamma: 0.1}
+           clusters: {num_clusters: 6, num_components: 3}
+         - name: tree
+           estimator: tree
+           grid: {max_depth: [3, 5, 10], min_samples_leaf: [1, 5]}
+       output:
+         results: data/experiment-results.json
+         models: data/models
+         cache: data/results-cache.db
+
+   The estimators are 'svr', 'tree' (CART), 'random-forest', 'nystroem'
+   (approximate.ApproximateKernelRidge) and 'approximate-svr', each created
+   with the given params. If 'clusters' is given, a ClusteredRegressor fits
+   one estimator per KMeans cluster (after PCA onto num_components
+   components, if any). If 'grid' is given, the parameters are chosen by
+   cross-validating the grid on the training samples (see search.py); for
+   clustered models, the grid is searched for the estimator fit to all of
+   the training samples. The features are either 'all' 18 features or the 9
+   'mc' features from the 3x3 tally mesh for each pin. Note that YAML 1.1
+   reads exponents without a decimal point (ie, 1e3) as strings.
+
+   Each slice (assembly, batch, energy, tally) is read once by load and split
+   into training and test samples. Each (model, slice) case is then run by a
+   scheduler.TaskGraph. The loaded samples are given to each worker process
+   once, when it is started, such that the workers share them rather than
+   re-opening the samples files for each case. The RMS errors for each case
+   are written to the results file, and each fitted model (with the metadata
+   needed to predict with it, see save_model) to the models directory.
+'''
+
+import json
+import os
+import pickle
+
+import numpy as np
+import h5py as h5
+from sklearn import tree
+from sklearn.svm import SVR
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.cross_validation import train_test_split
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+import approximate
+import cache
+import error_metrics
+import profiling
+import regression
+import samples
+import scheduler
+import search
+
+
+# The estimators which may be named by each model in a configuration
+ESTIMATORS = {'svr': SVR,
+              'tree': tree.DecisionTreeRegressor,
+              'random-forest': RandomForestRegressor,
+              'nystroem': approximate.ApproximateKernelRidge,
+              'approximate-svr': approximate.ApproximateSVR}
+
+# The feature columns for each choice of features
+FEATURES = {'all': slice(0, 18), 'mc': samples.MC_COLUMNS}
+
+# The default slices of the samples files and settings
+DATA_DEFAULTS = {'directory': 'data',
+                 'assemblies': ['Fuel-1.6wo-CRD',
+                                'Fuel-2.4wo-16BA-grid-56',
+                                'Fuel-3.1wo-instr-16BA-grid-17'],
+                 'batches': [1000],
+                 'energies': ['Low Energy', 'High Energy'],
+                 'tallies': ['Tot. XS', 'Abs. XS', 'Fiss. XS', 'NuFiss. XS'],
+                 'features': 'all'}
+
+DEFAULTS = {'split': 0.33, 'seed': 10, 'folds': 3, 'jobs': -1}
+
+MODEL_KEYS = ['name', 'estimator', 'params', 'clusters', 'grid']
+OUTPUT_KEYS = ['results', 'models', 'cache']
+
+# The experiment shared by the worker processes
+_worker_experiment = None
+
+# The results cache opened by this process, if any
+_results_caches = {}
+
+
+
+def load_config(filename):
+    '''Returns the configuration dictionary read from a YAML or JSON file.
+
+       Files ending in '.yaml' or '.yml' are read with PyYAML, and any other
+       file is read as JSON.
+    '''
+
+    if os.path.splitext(filename)[1].lower() in ['.yaml', '.yml']:
+        if yaml is None:
+            raise Exception('Unable to read config ' + filename + ' since ' + \
+                            'PyYAML is not installed; use a JSON config ' + \
+                            'instead')
+
+        with open(filename) as config_file:
+            config = yaml.safe_load(config_file)
+
+    else:
+        with open(filename) as config_file:
+            config = json.load(config_file)
+
+    if not isinstance(config, dict):
+        raise Exception('Unable to read config ' + filename + ' which ' + \
+                        'is not a mapping of settings')
+
+    return config
+
+
+def get_estimator(model_config, params=None):
+    '''Returns an unfitted model for a model in a configuration.
+
+       The params, if given, replace the params from the configuration (ie,
+       with the best grid point). Clustered models are returned as a
+       ClusteredRegressor which fits its clusters in this process.
+    '''
+
+    if params is None:
+        params = model_config.get('params', {})
+
+    estimator = ESTIMATORS[model_config['estimator']](**params)
+
+    if model_config.get('clusters') is None:
+        return estimator
+
+    kwargs = dict(model_config['clusters'])
+    kwargs['n_jobs'] = 1
+
+    return regression.ClusteredRegressor(estimator, **kwargs)
+
+
+def get_model_filename(name, case):
+    '''Returns the filename of the fitted model for a (model, slice) case.'''
+
+    assembly, batch, energy, tally = case
+    filename = '-'.join([name, assembly, 'batch', str(batch), energy, tally])
+
+    return filename.replace('.', '').replace(' ', '-').lower() + '.pkl'
+
+
+def save_model(filename, model, metadata):
+    '''Pickles a fitted model with its metadata.
+
+       The metadata is a dictionary with the model name, the slice (assembly,
+       batch, energy and tally) it was fit to, the feature columns it uses
+       and the geometry/materials features for each pin (if used), such that
+       the model may be used for predictions outside of an experiment (see
+       load_model).
+    '''
+
+    directory = os.path.dirname(filename)
+
+    if directory != '' and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    record = dict(metadata)
+    record['model'] = model
+
+    with open(filename, 'wb') as model_file:
+        pickle.dump(record, model_file, pickle.HIGHEST_PROTOCOL)
+
+
+def load_model(filename):
+    '''Returns the model and its metadata dictionary saved by save_model.'''
+
+    with open(filename, 'rb') as model_file:
+        record = pickle.load(model_file)
+
+    model = record.pop('model')
+
+    return model, record
+
+
+def _get_results_cache(filename):
+    '''Returns this process' handle to a results cache file.'''
+
+    if filename not in _results_caches:
+        directory = os.path.dirname(filename)
+
+        if directory != '' and not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Another worker process may have created it first
+                if not os.path.isdir(directory):
+                    raise
+
+        _results_caches[filename] = cache.ResultCache(filename)
+
+    return _results_caches[filename]
+
+
+def _init_worker(experiment):
+    '''Stores the experiment for the tasks run by this worker process.'''
+
+    global _worker_experiment
+    _worker_experiment = experiment
+
+
+def _run_case(name, case):
+    '''Fits, predicts and scores one model for one slice (called by the
+       worker processes).
+
+       Returns a record with the chosen parameters and the training and test
+       RMS errors for the case.
+    '''
+
+    experiment = _worker_experiment
+    model_config = experiment.get_model_config(name)
+    data = experiment.get_samples(case)
+
+    X, y = data['X'], data['y']
+    X_train, y_train = X[data['train']], y[data['train']]
+    X_test, y_test = X[data['test']], y[data['test']]
+
+    record = {'model': name, 'assembly': case[0], 'batch': case[1],
+              'energy': case[2], 'tally': case[3], 'cached': False}
+
+    # Look up the results for this case from a previous run
+    results_cache = None
+    cached = None
+
+    if experiment.get_output('cache') is not None:
+        results_cache = _get_results_cache(experiment.get_output('cache'))
+        params = dict((key, model_config.get(key))
+                      for key in ['estimator', 'params', 'clusters', 'grid'])
+        params['features'] = experiment.get_data('features')
+
+        # The parameters chosen by a grid search depend on the folds
+        if model_config.get('grid') is not None:
+            params['folds'] = experiment.get_setting('folds')
+
+        key = cache.get_key(X, y, params, seed=experiment.get_setting('seed'),
+                            split=experiment.get_setting('split'))
+        cached = results_cache.get(key)
+
+    if cached is not None and cached['model'] is not None:
+        model = cached['model']
+        record.update(cached['rms'])
+        record['cached'] = True
+
+    else:
+        params = None
+
+        # Choose the parameters with the best cross-validation score
+        if model_config.get('grid') is not None:
+            estimator = ESTIMATORS[model_config['estimator']](
+                **model_config.get('params', {}))
+            results = search.grid_search(estimator, model_config['grid'],
+                                         X_train, y_train,
+                                         experiment.get_setting('folds'),
+                                         n_jobs=1)
+            params = dict(model_config.get('params', {}))
+            params.update(search.get_best_params(results))
+
+        with profiling.timer('Fit'):
+            model = get_estimator(model_config, params)
+            model.fit(X_train, y_train)
+
+        with profiling.timer('Predict'):
+            train_error = error_metrics.get_rms(model.predict(X_train),
+                                                y_train)
+            test_error = error_metrics.get_rms(model.predict(X_test), y_test)
+
+        record['params'] = params or model_config.get('params', {})
+        record['train_rms'] = float(train_error)
+        record['test_rms'] = float(test_error)
+
+        if results_cache is not None:
+            rms = dict((key, record[key])
+                       for key in ['params', 'train_rms', 'test_rms'])
+            results_cache.put(key, model=model, rms=rms)
+
+    # Store the model for predictions outside of the experiment
+    if experiment.get_output('models') is not None:
+        filename = os.path.join(experiment.get_output('models'),
+                                get_model_filename(name, case))
+        metadata = {'name': name, 'assembly': case[0], 'batch': case[1],
+                    'energy': case[2], 'tally': case[3],
+                    'features': experiment.get_data('features'),
+                    'geometry': data['geometry']}
+        save_model(filename, model, metadata)
+        record['model_file'] = filename
+
+    return record
+
+
+
+class Experiment:
+    '''The Experiment class.
+
+       This class loads the slices of the samples files named by a
+       configuration once and runs each of its models on each slice.
+    '''
+
+    def __init__(self, config):
+        '''Initialize the Experiment class.
+
+           Takes in a configuration dictionary (see load_config). Any missing
+           data settings, ie, the assemblies, are taken from DATA_DEFAULTS.
+        '''
+
+        for key in config:
+            if key not in ['data', 'models', 'output'] + list(DEFAULTS):
+                raise Exception('Unable to create an experiment with ' + \
+                                'unknown setting ' + str(key))
+
+        self._data = dict(DATA_DEFAULTS)
+        self._data.update(config.get('data', {}))
+
+        self._settings = dict(DEFAULTS)
+        self._settings.update((key, config[key]) for key in DEFAULTS
+                              if key in config)
+
+        self._output = dict((key, None) for key in OUTPUT_KEYS)
+        self._output.update(config.get('output', {}))
+
+        if self._data['features'] not in FEATURES:
+            raise Exception('Unable to create an experiment with ' + \
+                            'features ' + str(self._data['features']) + \
+                            ' which are not one of ' + str(sorted(FEATURES)))
+
+        for key in self._output:
+            if key not in OUTPUT_KEYS:
+                raise Exception('Unable to create an experiment with ' + \
+                                'unknown output ' + str(key))
+
+        # Check the models and index them by name
+        if len(config.get('models', [])) == 0:
+            raise Exception('Unable to create an experiment without models')
+
+        self._models = {}
+        self._model_names = []
+
+        for model_config in config['models']:
+
+            name = model_config.get('name')
+
+            if name is None or name in self._models:
+                raise Exception('Unable to create an experiment with a ' + \
+                                'missing or duplicate model name ' + str(name))
+
+            for key in model_config:
+                if key not in MODEL_KEYS:
+                    raise Exception('Unable to create model ' + name + \
+                                    ' with unknown setting ' + str(key))
+
+            if model_config.get('estimator') not in ESTIMATORS:
+                raise Exception('Unable to create model ' + name + ' with ' + \
+                                'estimator ' + \
+                                str(model_config.get('estimator')) + \
+                                ' which is not one of ' + \
+                                str(sorted(ESTIMATORS)))
+
+            self._models[name] = model_config
+            self._model_names.append(name)
+
+        self._samples = None
+
+
+    def get_data(self, key):
+        '''Returns a value from the data section of the configuration.'''
+
+        return self._data[key]
+
+
+    def get_setting(self, key):
+        '''Returns a setting (ie, split, seed, folds or jobs).'''
+
+        return self._settings[key]
+
+
+    def get_output(self, key):
+        '''Returns the filename or directory of an output (or None).'''
+
+        return self._output[key]
+
+
+    def get_model_names(self):
+        '''Returns a list of the model names in configuration order.'''
+
+        return list(self._model_names)
+
+
+    def get_model_config(self, name):
+        '''Returns the configuration dictionary for a model.'''
+
+        return self._models[name]
+
+
+    def get_slices(self):
+        '''Returns a list of (assembly, batch, energy, tally) slices.'''
+
+        return [(assembly, batch, energy, tally)
+                for assembly in self._data['assemblies']
+                for batch in self._data['batches']
+                for energy in self._data['energies']
+                for tally in self._data['tallies']]
+
+
+    def get_cases(self):
+        '''Returns a list of (model name, slice) cases in run order.'''
+
+        return [(name, case) for case in self.get_slices()
+                for name in self._model_names]
+
+
+    def get_samples(self, case):
+        '''Returns the loaded samples for a slice as a dictionary with the
+           features 'X', targets 'y', the 'train' and 'test' sample indices
+           and the 'geometry' features for each pin (None if not used).'''
+
+        if self._samples is None:
+            raise Exception('Unable to get the samples for ' + str(case) + \
+                            ' until the load method is called')
+
+        return self._samples[case]
+
+
+    @profiling.timed('Load samples')
+    def load(self):
+        '''Reads and splits the samples for each slice.
+
+           Each samples file is opened once, and the samples for every slice
+           are kept in memory to be shared by all of the models.
+        '''
+
+        columns = FEATURES[self._data['features']]
+        split = self._settings['split']
+        seed = self._settings['seed']
+
+        self._samples = {}
+
+        for assembly in self._data['assemblies']:
+
+            filename = os.path.join(self._data['directory'],
+                                    assembly + '-samples.h5')
+            sample_file = h5.File(filename, 'r')
+
+            try:
+                for case in self.get_slices():
+
+                    if case[0] != assembly:
+                        continue
+
+                    group = sample_file['Batch-' + str(case[1])]
+                    group = group[case[2]][case[3]]
+
+                    X = group['Features'][...]
+                    y = np.ravel(group['Targets'][...])
+                    profiling.count('bytes read', X.nbytes + y.nbytes)
+
+                    # The geometry/materials features are the same for each
+                    # seed (see process/samples.py)
+                    geometry = None
+                    if columns.stop > samples.GEOMETRY_COLUMNS.start:
+                        geometry = X[:error_metrics.NUM_PINS,
+                                     samples.GEOMETRY_COLUMNS]
+
+                    # Split the sample indices as the scripts split the data
+                    indices = np.arange(len(y))
+                    train, test = train_test_split(indices, test_size=split,
+                                                   random_state=seed)
+
+                    self._samples[case] = {'X': X[:,columns], 'y': y,
+                                           'train': train, 'test': test,
+                                           'geometry': geometry}
+            finally:
+                sample_file.close()
+
+
+    def run(self, n_jobs=None, verbose=False):
+        '''Runs each model on each slice and returns a list of records.
+
+           The cases are run by n_jobs worker processes (the jobs setting by
+           default). Each record holds the model name, slice, parameters and
+           training/test RMS errors for one case (see _run_case). The records
+           are also written to the results file, if any, as JSON.
+        '''
+
+        if self._samples is None:
+            self.load()
+
+        if n_jobs is None:
+            n_jobs = self._settings['jobs']
+
+        graph = scheduler.TaskGraph()
+
+        for name, case in self.get_cases():
+            graph.add_task((name,) + case, _run_case, (name, case), keep=True)
+
+        with profiling.timer('Run cases'):
+            results = graph.run(n_jobs=n_jobs, verbose=verbose,
+                                initializer=_init_worker, initargs=(self,))
+
+        # Close this process' results cache (if it ran any cases)
+        for filename in list(_results_caches):
+            _results_caches.pop(filename).close()
+
+        records = [results[(name,) + case] for name, case in self.get_cases()]
+
+        if self._output['results'] is not None:
+            self.write_results(records)
+
+        return records
+
+
+    def write_results(self, records):
+        '''Writes a list of records to the results file as JSON.'''
+
+        filename = self._output['results']
+        directory = os.path.dirname(filename)
+
+        if directory != '' and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(filename, 'w') as results_file:
+            json.dump(records, results_file, indent=2, sort_keys=True,
+                      default=repr)
@@ -0,0 +1,287 @@
+'''Stores the data for figures and renders them in a separate plotting stage.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import figures"
+
+   The scripts which fit and score models add the data for each figure (ie,
+   the RMS errors for each batch, the target values in each cluster or the
+   cluster ID for each pin) to an intermediate HDF5 results file with the
+   FigureResults class, rather than drawing and saving each figure inline.
+   Each figure is stored in a group named by the figure's output filename
+   (ie, 'process/rms-plots/Fuel-1.6wo-CRD/tot-xs.png'), with the plot type
+   and labels as attributes of the group. The following plot types are
+   supported:
+
+       'lines' - one or more (semilog) curves, ie, RMS error vs. batch
+       'histogram' - a histogram of values with an annotation
+       'overlays' - a grid of 2D maps of the cluster ID for each pin
+
+   The render function then draws the figures from a results file in a pool
+   of worker processes with Matplotlib's non-interactive Agg backend, and
+   closes each figure once it is saved. Figures may be re-rendered from the
+   results file at any time without recomputing the results (see
+   plot-results.py).
+'''
+
+import multiprocessing
+import os
+
+import numpy as np
+import h5py as h5
+import matplotlib.pyplot as plt
+
+import cluster
+import profiling
+
+
+# The default intermediate results file for figures
+RESULTS_FILE = 'data/figure-results.h5'
+
+
+def _to_str(value):
+    '''Returns a string attribute read from HDF5 as a native string.'''
+
+    if isinstance(value, bytes) and not isinstance(value, str):
+        return value.decode('utf-8')
+    else:
+        return value
+
+
+
+class FigureResults:
+    '''The FigureResults class.
+
+       This class adds the data for figures to an intermediate HDF5 results
+       file, replacing any earlier data for the same figure.
+    '''
+
+    def __init__(self, filename=RESULTS_FILE):
+        '''Initialize the FigureResults class with the results filename.'''
+
+        self._filename = filename
+        self._file = h5.File(filename, 'a')
+        self._names = []
+
+
+    def _create_figure(self, name, kind, title):
+        '''Returns a new HDF5 group for a figure's data.'''
+
+        if name in self._file:
+            del self._file[name]
+
+        group = self._file.create_group(name)
+        group.attrs['kind'] = kind
+        group.attrs['title'] = title if title is not None else ''
+
+        self._names.append(name)
+
+        return group
+
+
+    def add_lines(self, name, lines, title=None, xlabel=None, ylabel=None,
+                  log=True):
+        '''Adds a figure of one or more curves.
+
+           Takes in the output filename for the figure and a list of
+           (label, x, y) tuples for each curve. The curves are plotted on a
+           semilog axes if log is True.
+        '''
+
+        group = self._create_figure(name, 'lines', title)
+        group.attrs['xlabel'] = xlabel if xlabel is not None else ''
+        group.attrs['ylabel'] = ylabel if ylabel is not None else ''
+        group.attrs['log'] = int(log)
+        group.attrs['labels'] = np.array([label for label, x, y in lines],
+                                          dtype='S')
+
+        for i, (label, x, y) in enumerate(lines):
+            group.create_dataset('x' + str(i), data=np.asarray(x))
+            group.create_dataset('y' + str(i), data=np.asarray(y))
+
+
+    def add_histogram(self, name, values, bins=8, title=None, xlabel=None,
+                      ylabel=None, text=None):
+        '''Adds a histogram of values with an optional text annotation.'''
+
+        group = self._create_figure(name, 'histogram', title)
+        group.attrs['bins'] = bins
+        group.attrs['xlabel'] = xlabel if xlabel is not None else ''
+        group.attrs['ylabel'] = ylabel if ylabel is not None else ''
+        group.attrs['text'] = text if text is not None else ''
+        group.create_dataset('values', data=np.ravel(values))
+
+
+    def add_overlays(self, name, overlays, titles=None, title=None,
+                     num_columns=5, num_clusters=None):
+        '''Adds a grid of maps of the cluster ID for each pin.
+
+           Takes in an array of 2D maps (ie, from Cluster.get_overlays) and
+           an optional title for each map (see cluster.plot_overlays).
+        '''
+
+        overlays = np.asarray(overlays)
+
+        if num_clusters is None:
+            num_clusters = int(np.max(overlays)) + 1
+
+        group = self._create_figure(name, 'overlays', title)
+        group.attrs['num_columns'] = num_columns
+        group.attrs['num_clusters'] = num_clusters
+        group.create_dataset('overlays', data=overlays)
+
+        if titles is not None:
+            group.attrs['titles'] = np.array(titles, dtype='S')
+
+
+    def get_names(self):
+        '''Returns the names of the figures added by this FigureResults.'''
+
+        return list(self._names)
+
+
+    def close(self):
+        '''Closes the results file.'''
+
+        self._file.close()
+
+
+
+def get_figure_names(filename=RESULTS_FILE):
+    '''Returns the names (output filenames) of all figures in a results file.'''
+
+    names = []
+
+    def visit(name, item):
+        if isinstance(item, h5.Group) and 'kind' in item.attrs:
+            names.append(name)
+
+    results_file = h5.File(filename, 'r')
+
+    try:
+        results_file.visititems(visit)
+    finally:
+        results_file.close()
+
+    return names
+
+
+def _draw_lines(group, fig):
+    '''Draws a figure of curves from its HDF5 group.'''
+
+    ax = fig.add_subplot(111)
+    labels = [_to_str(label) for label in group.attrs['labels']]
+
+    for i in range(len(labels)):
+        x = group['x' + str(i)][...]
+        y = group['y' + str(i)][...]
+
+        if group.attrs['log']:
+            ax.semilogy(x, y, linewidth=2)
+        else:
+            ax.plot(x, y, linewidth=2)
+
+    ax.set_xlabel(_to_str(group.attrs['xlabel']))
+    ax.set_ylabel(_to_str(group.attrs['ylabel']))
+    ax.grid(True, which='major', color='b', linestyle='-')
+    ax.grid(True, which='minor', color='r', linestyle='--')
+    ax.legend(labels)
+
+
+def _draw_histogram(group, fig):
+    '''Draws a histogram from its HDF5 group.'''
+
+    ax = fig.add_subplot(111)
+    ax.hist(group['values'][...], int(group.attrs['bins']), color='green',
+            histtype='bar', hatch='//', edgecolor='black')
+    ax.set_xlabel(_to_str(group.attrs['xlabel']))
+    ax.set_ylabel(_to_str(group.attrs['ylabel']))
+
+    text = _to_str(group.attrs['text'])
+
+    if text != '':
+        fig.text(0.55, 0.8, text, {'weight':'bold', 'size':14})
+
+
+def _render_figure(args):
+    '''Renders and saves one figure (called by the worker processes).'''
+
+    filename, name = args
+
+    # Use a non-interactive backend in each worker
+    plt.switch_backend('Agg')
+
+    results_file = h5.File(filename, 'r')
+
+    try:
+        group = results_file[name]
+        kind = _to_str(group.attrs['kind'])
+        title = _to_str(group.attrs['title'])
+
+        if kind == 'overlays':
+            titles = None
+            if 'titles' in group.attrs:
+                titles = [_to_str(t) for t in group.attrs['titles']]
+
+            fig = cluster.plot_overlays(group['overlays'][...], titles, title,
+                                        int(group.attrs['num_columns']),
+                                        int(group.attrs['num_clusters']))
+
+        else:
+            fig = plt.figure()
+
+            if kind == 'lines':
+                _draw_lines(group, fig)
+            elif kind == 'histogram':
+                _draw_histogram(group, fig)
+            else:
+                raise Exception('Unable to render figure ' + name + \
+                                ' with unsupported plot type ' + kind)
+
+            fig.gca().set_title(title)
+    finally:
+        results_file.close()
+
+    directory = os.path.dirname(name)
+
+    if directory != '' and not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            pass
+
+    fig.savefig(name, bbox_inches='tight')
+    plt.close(fig)
+
+    return name
+
+
+@profiling.timed('figures.render')
+def render(filename=RESULTS_FILE, names=None, n_jobs=-1):
+    '''Renders figures from a results file with a pool of processes.
+
+       Renders the figures with the given names (output filenames), or all of
+       the figures in the results file by default, with n_jobs worker
+       processes (one per core if n_jobs is -1). The results file must not
+       be open for writing (ie, close the FigureResults first). Returns the
+       list of files saved.
+    '''
+
+    if names is None:
+        names = get_figure_names(filename)
+
+    if n_jobs == -1:
+        n_jobs = multiprocessing.cpu_count()
+
+    tasks = [(filename, name) for name in names]
+
+    if n_jobs == 1 or len(tasks) <= 1:
+        return [_render_figure(task) for task in tasks]
+
+    pool = multiprocessing.Pool(min(n_jobs, len(tasks)))
+
+    try:
+        return pool.map(_render_figure, tasks)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,201 @@
+'''A batched prediction layer for the trained regression models.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import prediction"
+
+   The BatchPredictor class makes predictions with any model which has a
+   predict method taking a 2D array of samples (sklearn's SVR, decision trees
+   and random forests, ClusteredRegressor, AveragingModel and the approximate
+   kernel models). The samples are split into fixed-size chunks which are
+   predicted concurrently by a pool of threads, and the predictions are
+   written into a single preallocated output array (with one column per output
+   for multi-output models). The samples may be given as one large array or as
+   an iterable over chunks of samples (such as a samples.SampleStream or a
+   generator), in which case only a bounded number of chunks are held in
+   memory at once.
+
+   Most of the time in each chunk's prediction is spent in compiled code
+   (BLAS, libsvm and sklearn's tree routines), much of which releases the
+   GIL, so the threads share the work without copying the model or samples
+   to other processes. The number of samples predicted per second is
+   recorded for each call.
+'''
+
+import itertools
+import multiprocessing
+import time
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+import profiling
+
+
+# The default number of samples predicted by each thread at a time
+CHUNK_SIZE = 4096
+
+
+def _predict_chunk(args):
+    '''Returns a model's predictions for one chunk (called by the threads).'''
+
+    model, start, chunk = args
+
+    predictions = np.asarray(model.predict(chunk))
+
+    # Single output models may return a column vector
+    if predictions.ndim == 2 and predictions.shape[1] == 1:
+        predictions = predictions[:,0]
+
+    return start, predictions
+
+
+
+class BatchPredictor:
+    '''The BatchPredictor class.
+
+       This class predicts target values for large numbers of samples in
+       chunks with a pool of threads and records the throughput.
+    '''
+
+    def __init__(self, chunk_size=CHUNK_SIZE, num_threads=-1):
+        '''Initialize the BatchPredictor class.
+
+           Samples are predicted chunk_size at a time by num_threads threads
+           (one per core if num_threads is -1).
+        '''
+
+        if num_threads == -1:
+            num_threads = multiprocessing.cpu_count()
+
+        self._chunk_size = chunk_size
+        self._num_threads = num_threads
+        self._pool = None
+
+        self._num_samples = 0
+        self._time = 0.
+        self._total_samples = 0
+        self._total_time = 0.
+
+
+    def _get_chunks(self, X):
+        '''Yields (start, chunk) tuples for an array or iterable of chunks.'''
+
+        start = 0
+
+        if hasattr(X, 'shape'):
+            for start in range(0, X.shape[0], self._chunk_size):
+                yield start, X[start:start+self._chunk_size]
+        else:
+            for chunk in X:
+                chunk = np.asarray(chunk)
+                yield start, chunk
+                start += chunk.shape[0]
+
+
+    @profiling.timed('BatchPredictor.predict')
+    def predict(self, model, X, out=None, num_samples=None):
+        '''Returns the model's predicted target value for each sample in X.
+
+           X may be a 2D array of samples or an iterable over chunks of
+           samples. The predictions are written into out if given, or into a
+           new array with num_samples entries (the number of samples in X by
+           default, if it is an array). If the number of samples is unknown,
+           the predictions for each chunk are concatenated at the end. For
+           multi-output models, the output has one column per output.
+        '''
+
+        if out is None and num_samples is None and hasattr(X, 'shape'):
+            num_samples = X.shape[0]
+
+        if self._pool is None and self._num_threads > 1:
+            self._pool = ThreadPool(self._num_threads)
+
+        start_time = time.time()
+
+        chunks = self._get_chunks(X)
+        results = []
+        count = 0
+
+        # Predict a bounded window of chunks at a time
+        window = 2 * self._num_threads
+
+        while True:
+            tasks = [(model, start, chunk) for start, chunk in
+                     itertools.islice(chunks, window)]
+
+            if len(tasks) == 0:
+                break
+
+            if self._pool is None:
+                predictions = [_predict_chunk(task) for task in tasks]
+            else:
+                predictions = self._pool.map(_predict_chunk, tasks)
+
+            for start, chunk_predictions in predictions:
+
+                # Allocate the output once the number of outputs is known
+                if out is None and num_samples is not None:
+                    out = np.empty((num_samples,) + \
+                                   chunk_predictions.shape[1:])
+
+                if out is None:
+                    results.append(chunk_predictions)
+                else:
+                    out[start:start+len(chunk_predictions)] = \
+                        chunk_predictions
+                count += len(chunk_predictions)
+
+        if out is None:
+            if len(results) > 0:
+                out = np.concatenate(results)
+            else:
+                out = np.zeros(num_samples if num_samples is not None else 0)
+        elif count != out.shape[0]:
+            raise Exception('Unable to predict ' + str(out.shape[0]) + \
+                            ' samples since ' + str(count) + ' samples ' + \
+                            'were given')
+
+        # Record the throughput for this call and for all calls
+        self._num_samples = count
+        self._time = time.time() - start_time
+        self._total_samples += count
+        self._total_time += self._time
+
+        profiling.count('samples', count)
+
+        return out
+
+
+    def get_throughput(self, total=False):
+        '''Returns the samples predicted per second by the last call to
+           predict (or by all calls if total is True).'''
+
+        if total:
+            num_samples, seconds = self._total_samples, self._total_time
+        else:
+            num_samples, seconds = self._num_samples, self._time
+
+        if seconds == 0.:
+            return 0.
+        else:
+            return num_samples / seconds
+
+
+    def get_num_samples(self, total=False):
+        '''Returns the samples predicted by the last call to predict (or by
+           all calls if total is True).'''
+
+        if total:
+            return self._total_samples
+        else:
+            return self._num_samples
+
+
+    def close(self):
+        '''Stops the pool of threads.'''
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
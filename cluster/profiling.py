@@ -0,0 +1,621 @@
+'''Lightweight timers and counters for profiling the pipeline scripts.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import profiling"
+
+   This module times the stages of the data processing and machine learning
+   scripts with a timer context manager or a timed decorator:
+
+       with profiling.timer('Fit SVR'):
+           svr.fit(X_train, y_train)
+
+       @profiling.timed('Cluster.build_clusters')
+       def build_clusters(self, ...):
+
+   Timers may be nested, and build a tree of stages with the number of calls,
+   the wall and CPU time, the time not spent in nested stages ('self_time')
+   and the peak resident set size of each stage. Counters such as the bytes
+   read from HDF5 or the number of samples processed are added to the
+   innermost running stage with the count function. The methods of a class
+   which cannot be edited (ie, StatePoint) are timed with instrument.
+
+   The timers are always recorded, since each costs only a few microseconds.
+   The timing tree is written to a JSON file when the script exits if
+   profiling is enabled, either with the enable function or by setting the
+   INFERXS_PROFILE environment variable to the JSON filename for any script:
+
+       INFERXS_PROFILE=svr-profile.json python svr.py
+
+   The INFERXS_PROFILE_MODE environment variable (or the arguments to enable)
+   may also request a comma separated list of the following captures for
+   each top-level stage:
+
+       'cprofile' - the stage is run under cProfile. The stats are dumped to
+                    '<JSON filename base>.<stage>.prof' for pstats or
+                    snakeviz, and the functions with the most cumulative time
+                    are listed in the timing tree.
+       'tracemalloc' - the peak memory allocated by Python objects (including
+                       NumPy arrays) in the stage is recorded. This requires
+                       the tracemalloc module from Python 3.4+.
+
+   A MemoryBudget sizes the chunks processed by the exporters (ie,
+   samples.py and target-batch-rms.py) from a maximum resident set size, and
+   reports the peak usage per stage when the budget would be exceeded.
+'''
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+# The environment variables which enable profiling for any script
+PROFILE_VARIABLE = 'INFERXS_PROFILE'
+MODE_VARIABLE = 'INFERXS_PROFILE_MODE'
+
+# The number of functions with the most cumulative time listed for each
+# stage run under cProfile
+NUM_FUNCTIONS = 20
+
+
+def get_peak_rss():
+    '''Returns the peak resident set size of this process in MB.'''
+
+    if resource is None:
+        return 0.
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on OS X and in KB on Linux
+    if sys.platform == 'darwin':
+        return peak / 1024.**2
+    else:
+        return peak / 1024.
+
+
+def get_rss():
+    '''Returns the current resident set size of this process in MB.
+
+       The current size is read from /proc on Linux. On other platforms the
+       peak resident set size is returned instead.
+    '''
+
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024.**2
+    except (IOError, OSError, ValueError, IndexError):
+        return get_peak_rss()
+
+
+def get_cpu_time():
+    '''Returns the user and system CPU time used by this process in sec.'''
+
+    times = os.times()
+    return times[0] + times[1]
+
+
+
+class _Stage:
+    '''A node in the timing tree for each uniquely named (nested) stage.'''
+
+    def __init__(self, name):
+
+        self.name = name
+        self.calls = 0
+        self.wall_time = 0.
+        self.cpu_time = 0.
+        self.peak_rss = 0.
+        self.peak_rss_growth = 0.
+        self.peak_traced = None
+        self.counters = OrderedDict()
+        self.children = OrderedDict()
+        self.stats = None
+
+
+    def get_child(self, name):
+        '''Returns the nested stage with this name, creating it if needed.'''
+
+        with _lock:
+            if name not in self.children:
+                self.children[name] = _Stage(name)
+
+            return self.children[name]
+
+
+    def merge(self, stage):
+        '''Adds the calls, times and counters of a stage dictionary.'''
+
+        with _lock:
+            self.calls += stage['calls']
+            self.wall_time += stage['wall_time']
+            self.cpu_time += stage['cpu_time']
+            self.peak_rss = max(self.peak_rss, stage['peak_rss_mb'])
+            self.peak_rss_growth = max(self.peak_rss_growth,
+                                       stage['peak_rss_growth_mb'])
+
+            if 'peak_traced_mb' in stage:
+                self.peak_traced = max(self.peak_traced or 0.,
+                                       stage['peak_traced_mb'])
+
+            for name, value in stage['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+        for child in stage['children']:
+            self.get_child(child['name']).merge(child)
+
+
+    def to_dict(self):
+        '''Returns this stage and its nested stages as a dictionary.'''
+
+        children = [child.to_dict() for child in self.children.values()]
+        child_time = sum([child['wall_time'] for child in children])
+
+        stage = OrderedDict()
+        stage['name'] = self.name
+        stage['calls'] = self.calls
+        stage['wall_time'] = self.wall_time
+        stage['cpu_time'] = self.cpu_time
+        stage['self_time'] = max(self.wall_time - child_time, 0.)
+        stage['peak_rss_mb'] = self.peak_rss
+        stage['peak_rss_growth_mb'] = self.peak_rss_growth
+
+        if self.peak_traced is not None:
+            stage['peak_traced_mb'] = self.peak_traced
+
+        stage['counters'] = OrderedDict(self.counters)
+
+        if self.stats is not None:
+            stage['functions'] = _get_top_functions(self.stats)
+
+        stage['children'] = children
+
+        return stage
+
+
+
+_lock = threading.Lock()
+_local = threading.local()
+_main_thread = threading.current_thread()
+
+_root = _Stage('total')
+_start_wall_time = time.time()
+_start_cpu_time = get_cpu_time()
+_start_peak_rss = get_peak_rss()
+
+_settings = {'filename': None, 'cprofile': False, 'tracemalloc': False,
+             'registered': False}
+
+
+def _get_stack():
+    '''Returns the stack of running stages for the calling thread.
+
+       Each thread starts at the root of the timing tree, such that stages
+       run by worker threads are nested under the top level.
+    '''
+
+    if not hasattr(_local, 'stack'):
+        _local.stack = [_root]
+
+    return _local.stack
+
+
+def _get_top_functions(stats):
+    '''Returns the functions with the most cumulative time in pstats.Stats.'''
+
+    functions = []
+
+    for function, values in stats.stats.items():
+        filename, line, name = function
+        calls, total_time, cumulative_time = values[1], values[2], values[3]
+        functions.append((cumulative_time, total_time, calls,
+                          '%s:%d(%s)' % (filename, line, name)))
+
+    functions.sort(reverse=True)
+
+    return [OrderedDict([('function', function), ('calls', calls),
+                         ('total_time', total_time),
+                         ('cumulative_time', cumulative_time)])
+            for cumulative_time, total_time, calls, function
+            in functions[:NUM_FUNCTIONS]]
+
+
+
+class Timer:
+    '''A context manager which times a (nested) stage.
+
+       Each timer is added to the timing tree under the innermost running
+       stage of the calling thread. Exceptions raised in the stage are not
+       caught, but the time spent is still recorded.
+    '''
+
+    def __init__(self, name):
+        '''Initialize the timer with the name of the stage.'''
+
+        self._name = name
+        self._stage = None
+        self._profile = None
+        self._tracing = False
+
+
+    def __enter__(self):
+
+        stack = _get_stack()
+        self._stage = stack[-1].get_child(self._name)
+        top_level = len(stack) == 1
+        stack.append(self._stage)
+
+        # Only capture top-level stages in the main thread since cProfile
+        # does not nest
+        main_thread = threading.current_thread() is _main_thread
+
+        if top_level and main_thread and _settings['cprofile']:
+            self._profile = cProfile.Profile()
+
+        if top_level and _settings['tracemalloc']:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self._tracing = True
+
+        self._wall_time = time.time()
+        self._cpu_time = get_cpu_time()
+        self._peak_rss = get_peak_rss()
+
+        if self._profile is not None:
+            self._profile.enable()
+
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        if self._profile is not None:
+            self._profile.disable()
+
+        wall_time = time.time() - self._wall_time
+        cpu_time = get_cpu_time() - self._cpu_time
+        peak_rss = get_peak_rss()
+
+        stack = _get_stack()
+        stack.pop()
+
+        stage = self._stage
+
+        with _lock:
+            stage.calls += 1
+            stage.wall_time += wall_time
+            stage.cpu_time += cpu_time
+            stage.peak_rss = max(stage.peak_rss, peak_rss)
+            stage.peak_rss_growth = max(stage.peak_rss_growth,
+                                        peak_rss - self._peak_rss)
+
+            if self._tracing:
+                peak = tracemalloc.get_traced_memory()[1] / 1024.**2
+                stage.peak_traced = max(stage.peak_traced or 0., peak)
+
+            if self._profile is not None:
+                if stage.stats is None:
+                    stage.stats = pstats.Stats(self._profile)
+                else:
+                    stage.stats.add(self._profile)
+
+        self._profile = None
+        self._tracing = False
+
+        return False
+
+
+
+def timer(name):
+    '''Returns a Timer context manager for the named stage.'''
+
+    return Timer(name)
+
+
+def timed(name=None):
+    '''Returns a decorator which times each call to a function as a stage.
+
+       The stage is named by the function's name unless a name is given.
+    '''
+
+    def decorator(function):
+
+        stage = name if name is not None else function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return function(*args, **kwargs)
+
+        wrapper._profiled = True
+
+        return wrapper
+
+    return decorator
+
+
+def instrument(obj, names, prefix=None):
+    '''Times calls to the named methods (or functions) of a class (or module).
+
+       Each method is replaced by a timed wrapper, with the stage named
+       '<prefix>.<method>' (the prefix defaults to the class or module name).
+       Methods which have already been instrumented are left unchanged.
+    '''
+
+    if prefix is None:
+        prefix = obj.__name__
+
+    for name in names:
+        method = getattr(obj, name)
+
+        if getattr(method, '_profiled', False):
+            continue
+
+        # Wrap the underlying function of an unbound method
+        function = getattr(method, '__func__', method)
+        setattr(obj, name, timed(prefix + '.' + name)(function))
+
+
+def count(name, value=1):
+    '''Adds a value to a counter (ie, 'bytes read') of the running stage.'''
+
+    stage = _get_stack()[-1]
+
+    with _lock:
+        stage.counters[name] = stage.counters.get(name, 0) + value
+
+
+def reset():
+    '''Clears the timing tree, ie, in a worker process before each task.'''
+
+    with _lock:
+        _root.children.clear()
+        _root.counters.clear()
+
+    _local.stack = [_root]
+
+
+def get_stages():
+    '''Returns the top-level stages recorded since the tree was reset.'''
+
+    return [stage.to_dict() for stage in _root.children.values()]
+
+
+def merge(stages):
+    '''Adds stages recorded by another process under the running stage.
+
+       The stages (see get_stages) are merged with any stages of the same
+       name, such that the times of each stage are summed over all of the
+       worker processes which ran it.
+    '''
+
+    parent = _get_stack()[-1]
+
+    for stage in stages:
+        parent.get_child(stage['name']).merge(stage)
+
+
+def enable(filename='profile.json', cprofile=False, memory=False):
+    '''Writes the timing tree to a JSON file when the script exits.
+
+       If cprofile is True, each top-level stage is run under cProfile. If
+       memory is True, the peak memory allocated by Python in each top-level
+       stage is traced with tracemalloc, if it is available.
+    '''
+
+    if memory and tracemalloc is None:
+        print 'Unable to trace memory allocations since the tracemalloc ' + \
+            'module requires Python 3.4+'
+        memory = False
+
+    _settings['filename'] = filename
+    _settings['cprofile'] = cprofile
+    _settings['tracemalloc'] = memory
+
+    if not _settings['registered']:
+        atexit.register(_write_at_exit)
+        _settings['registered'] = True
+
+
+def get_tree():
+    '''Returns the timing tree as nested dictionaries.
+
+       The root stage ('total') covers the time since this module was
+       imported, and each stage lists its nested stages as 'children'.
+    '''
+
+    _root.calls = 1
+    _root.wall_time = time.time() - _start_wall_time
+    _root.cpu_time = get_cpu_time() - _start_cpu_time
+    _root.peak_rss = get_peak_rss()
+    _root.peak_rss_growth = _root.peak_rss - _start_peak_rss
+
+    return _root.to_dict()
+
+
+def _get_stats_filename(filename, name):
+    '''Returns the cProfile stats filename for a top-level stage.'''
+
+    name = re.sub(r'[^A-Za-z0-9.\-]+', '-', name).strip('-')
+    return os.path.splitext(filename)[0] + '.' + name + '.prof'
+
+
+def write(filename=None):
+    '''Writes the timing tree to a JSON file and returns the filename.
+
+       The cProfile stats for each top-level stage, if any, are also dumped
+       alongside the JSON file.
+    '''
+
+    if filename is None:
+        filename = _settings['filename']
+
+    tree = get_tree()
+
+    directory = os.path.dirname(filename)
+
+    if directory != '' and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(filename, 'w') as fh:
+        json.dump(tree, fh, indent=2)
+
+    for stage in _root.children.values():
+        if stage.stats is not None:
+            stage.stats.dump_stats(_get_stats_filename(filename, stage.name))
+
+    return filename
+
+
+def report(max_depth=None):
+    '''Prints the wall time, calls and counters for each stage.'''
+
+    def print_stage(stage, depth):
+
+        line = '%s%-*s %10.3f sec %8d calls' % ('  ' * depth,
+                                                 max(40 - 2 * depth, 1),
+                                                 stage['name'],
+                                                 stage['wall_time'],
+                                                 stage['calls'])
+
+        for name, value in stage['counters'].items():
+            line += '  %s: %s' % (name, value)
+
+        print line
+
+        if max_depth is None or depth < max_depth:
+            for child in stage['children']:
+                print_stage(child, depth + 1)
+
+    print_stage(get_tree(), 0)
+
+
+
+class MemoryBudget:
+    '''A maximum resident set size for the data processing scripts.
+
+       The exporters size their chunks (ie, of seeds or mesh rows) and scratch
+       buffers from the memory available within the budget, and check the
+       budget after each stage. If the budget would be exceeded, the peak
+       resident set size and its growth within each stage of the timing tree
+       are printed once for the stage, such that the offending stage may be
+       found before the job is killed on a shared node.
+    '''
+
+    def __init__(self, max_rss=None):
+        '''Initialize the budget with the maximum resident set size in MB
+           (None for no budget).'''
+
+        if max_rss is not None and max_rss <= 0:
+            raise Exception('Unable to create a memory budget with a ' + \
+                            'maximum RSS of ' + str(max_rss) + ' MB')
+
+        self._max_rss = max_rss
+        self._exceeded = set()
+
+
+    def get_max_rss(self):
+        '''Returns the maximum resident set size in MB (or None).'''
+
+        return self._max_rss
+
+
+    def get_available(self):
+        '''Returns the memory available within the budget in MB.'''
+
+        if self._max_rss is None:
+            return float('inf')
+        else:
+            return max(self._max_rss - get_rss(), 0.)
+
+
+    def get_chunk_size(self, item_size, num_items, fraction=0.5):
+        '''Returns the number of items to process at once.
+
+           Takes in the memory needed by each item in bytes, the total number
+           of items and the fraction of the available memory to use for the
+           chunk. Returns the number of items which fit, between 1 and
+           num_items (or num_items if there is no budget).
+        '''
+
+        if self._max_rss is None:
+            return num_items
+
+        available = self.get_available() * fraction * 1024.**2
+        return int(min(max(available // max(item_size, 1), 1), num_items))
+
+
+    def check(self, stage, required=0.):
+        '''Checks whether a stage fits within the budget.
+
+           Takes in the name of the stage (ie, its timer name) and the memory
+           in MB which the stage will still allocate. Returns True if the
+           resident set size plus the required memory is within the budget.
+           Otherwise, the memory used by each stage is reported (once per
+           stage) and False is returned.
+        '''
+
+        rss = get_rss()
+
+        if self._max_rss is None or rss + required <= self._max_rss:
+            return True
+
+        if stage not in self._exceeded:
+            self._exceeded.add(stage)
+            print 'Memory budget of %0.1f MB would be exceeded by %s ' \
+                '(%0.1f MB resident, %0.1f MB required)' % \
+                (self._max_rss, stage, rss, required)
+            self.report()
+
+        return False
+
+
+    def report(self):
+        '''Prints the peak RSS and its growth in MB for each stage.'''
+
+        def print_stage(stage, depth):
+
+            print '%s%-*s %10.1f MB peak %10.1f MB growth' % \
+                ('  ' * depth, max(40 - 2 * depth, 1), stage['name'],
+                 stage['peak_rss_mb'], stage['peak_rss_growth_mb'])
+
+            for child in stage['children']:
+                print_stage(child, depth + 1)
+
+        print_stage(get_tree(), 0)
+
+
+
+def _write_at_exit():
+    '''Writes the timing tree when the script exits (see enable).'''
+
+    filename = write()
+    report(max_depth=2)
+    print 'Wrote timing tree to ' + filename
+
+
+# Enable profiling for any script from the environment
+if os.environ.get(PROFILE_VARIABLE):
+    _modes = os.environ.get(MODE_VARIABLE, '').lower().split(',')
+    enable(os.environ[PROFILE_VARIABLE], 'cprofile' in _modes,
+           'tracemalloc' in _modes)
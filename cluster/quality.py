@@ -0,0 +1,294 @@
+'''Chunked estimators of clustering quality for large sample sets.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import quality"
+
+   The routines in this module evaluate the quality of a clustering of the
+   feature vectors X given the cluster ID for each sample (and, where needed,
+   the cluster centroids). Each routine works through the samples in blocks of
+   at most chunk_size rows (and chunk_size columns for pairwise distances) so
+   that the memory footprint is bounded by O(chunk_size^2) rather than the
+   O(n^2) pairwise distance matrix used by sklearn's silhouette_score.
+
+   The following estimators are available:
+
+       1) Sampled silhouette - the mean silhouette of a random subset of the
+          samples (measured against all samples) with confidence bounds
+       2) Simplified silhouette - silhouette computed from distances to the
+          cluster centroids rather than to every other sample
+       3) Davies-Bouldin index - lower is "better", bounded below by zero
+       4) Calinski-Harabasz index - higher is "better"
+'''
+
+import numpy as np
+import scipy.stats
+
+
+# The default number of samples per block for chunked distance computations
+CHUNK_SIZE = 1024
+
+
+
+################################################################################
+##################################  Utilities  #################################
+################################################################################
+
+def _squared_norms(X):
+    '''Returns the squared Euclidean norm of each row of X.'''
+
+    return np.einsum('ij,ij->i', X, X)
+
+
+def _distances(X, Y, X_sq, Y_sq):
+    '''Returns the Euclidean distances between rows of X and rows of Y.
+
+       The squared norms for the rows of X and Y are passed in so that they
+       are only computed once per chunk rather than once per block.
+    '''
+
+    D = np.dot(X, Y.T)
+    D *= -2.
+    D += X_sq[:,np.newaxis]
+    D += Y_sq[np.newaxis,:]
+
+    # Guard against round-off producing small negative squared distances
+    np.maximum(D, 0., out=D)
+
+    return np.sqrt(D, out=D)
+
+
+def _centroids(X, labels, num_clusters, chunk_size=CHUNK_SIZE):
+    '''Returns the centroid and number of samples for each cluster.'''
+
+    sums = np.zeros((num_clusters, X.shape[1]))
+    counts = np.bincount(labels, minlength=num_clusters)
+
+    for start in range(0, X.shape[0], chunk_size):
+        stop = min(start + chunk_size, X.shape[0])
+        np.add.at(sums, labels[start:stop], X[start:stop])
+
+    # Empty clusters keep a centroid at the origin
+    centroids = sums / np.maximum(counts, 1)[:,np.newaxis]
+
+    return centroids, counts
+
+
+
+################################################################################
+##################################  Silhouette  ################################
+################################################################################
+
+def silhouette_samples(X, labels, indices=None, chunk_size=CHUNK_SIZE):
+    '''Returns the silhouette coefficient for a subset of the samples.
+
+       The silhouette for each sample in indices (all samples by default) is
+       computed from its mean distance to all samples in its own cluster (a)
+       and to all samples in the nearest other cluster (b). The distances are
+       computed block by block and accumulated into per-cluster sums with a
+       matrix product against a one-hot cluster membership matrix.
+
+       Samples in singleton clusters are assigned a silhouette of zero, the
+       same convention used by sklearn.
+    '''
+
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.intp)
+    num_clusters = labels.max() + 1
+
+    if indices is None:
+        indices = np.arange(X.shape[0])
+
+    counts = np.bincount(labels, minlength=num_clusters).astype(np.float64)
+    X_sq = _squared_norms(X)
+
+    silhouettes = np.zeros(len(indices))
+
+    # Iterate over blocks of the requested samples
+    for start in range(0, len(indices), chunk_size):
+        rows = indices[start:start+chunk_size]
+
+        # Accumulate the sum of distances from each row to each cluster
+        sums = np.zeros((len(rows), num_clusters))
+
+        for col in range(0, X.shape[0], chunk_size):
+            stop = min(col + chunk_size, X.shape[0])
+            D = _distances(X[rows], X[col:stop], X_sq[rows], X_sq[col:stop])
+
+            # One-hot membership matrix for this block of columns
+            members = np.zeros((stop - col, num_clusters))
+            members[np.arange(stop - col), labels[col:stop]] = 1.
+            sums += np.dot(D, members)
+
+        own = labels[rows]
+        own_counts = counts[own]
+
+        # Mean intra-cluster distance (excluding the sample itself)
+        a = sums[np.arange(len(rows)), own] / np.maximum(own_counts - 1., 1.)
+
+        # Mean distance to the nearest other (non-empty) cluster
+        means = sums / np.maximum(counts, 1.)[np.newaxis,:]
+        means[:,counts == 0] = np.inf
+        means[np.arange(len(rows)), own] = np.inf
+        b = np.min(means, axis=1)
+
+        s = (b - a) / np.maximum(np.maximum(a, b), np.finfo(np.float64).tiny)
+        s[own_counts <= 1] = 0.
+        silhouettes[start:start+len(rows)] = s
+
+    return silhouettes
+
+
+def sampled_silhouette(X, labels, sample_size=2000, seed=1, confidence=0.95,
+                       chunk_size=CHUNK_SIZE):
+    '''Returns an estimate of the mean silhouette with confidence bounds.
+
+       A random subset of sample_size samples is drawn with a fixed seed and
+       the silhouette of each is measured against the complete dataset. The
+       estimate is returned as a tuple (mean, lower, upper) where the bounds
+       are the two-sided Student's t confidence interval at the requested
+       confidence level. If sample_size is None or exceeds the number of
+       samples, all samples are used and the bounds collapse to the mean.
+    '''
+
+    num_samples = np.asarray(X).shape[0]
+
+    if sample_size is None or sample_size >= num_samples:
+        indices = np.arange(num_samples)
+    else:
+        random_state = np.random.RandomState(seed)
+        indices = np.sort(random_state.choice(num_samples, sample_size,
+                                              replace=False))
+
+    silhouettes = silhouette_samples(X, labels, indices, chunk_size)
+    mean = np.mean(silhouettes)
+
+    # The exact mean has no sampling uncertainty
+    if len(indices) == num_samples or len(indices) < 2:
+        return mean, mean, mean
+
+    # Two-sided confidence interval for the mean of the sampled silhouettes
+    t_value = scipy.stats.t.ppf(1. - (1. - confidence) / 2., len(indices) - 1)
+    half_width = t_value * np.std(silhouettes, ddof=1) / np.sqrt(len(indices))
+
+    return mean, mean - half_width, mean + half_width
+
+
+def simplified_silhouette(X, labels, centroids, chunk_size=CHUNK_SIZE):
+    '''Returns the simplified (centroid-based) silhouette coefficient.
+
+       The simplified silhouette replaces the mean distance from each sample
+       to all samples in a cluster with the distance to that cluster's
+       centroid. This reduces the cost from O(n^2) to O(nk) for k clusters.
+    '''
+
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.intp)
+    centroids = np.asarray(centroids, dtype=np.float64)
+
+    # Silhouettes are undefined for a single cluster
+    if centroids.shape[0] < 2:
+        return 0.
+
+    C_sq = _squared_norms(centroids)
+    total = 0.
+
+    for start in range(0, X.shape[0], chunk_size):
+        stop = min(start + chunk_size, X.shape[0])
+        block = X[start:stop]
+        D = _distances(block, centroids, _squared_norms(block), C_sq)
+
+        own = labels[start:stop]
+        rows = np.arange(stop - start)
+        a = D[rows, own].copy()
+        D[rows, own] = np.inf
+        b = np.min(D, axis=1)
+
+        s = (b - a) / np.maximum(np.maximum(a, b), np.finfo(np.float64).tiny)
+        total += np.sum(s)
+
+    return total / X.shape[0]
+
+
+
+################################################################################
+##############################  Dispersion Indices  ############################
+################################################################################
+
+def davies_bouldin(X, labels, chunk_size=CHUNK_SIZE):
+    '''Returns the Davies-Bouldin index for the clustering.
+
+       The index is the mean over clusters of the worst-case ratio of the
+       summed intra-cluster scatter to the distance between cluster centroids.
+       The index is bounded below by zero and lower is "better."
+    '''
+
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.intp)
+    num_clusters = labels.max() + 1
+
+    centroids, counts = _centroids(X, labels, num_clusters, chunk_size)
+
+    # Compute the mean distance from each sample to its cluster centroid
+    scatter = np.zeros(num_clusters)
+
+    for start in range(0, X.shape[0], chunk_size):
+        stop = min(start + chunk_size, X.shape[0])
+        own = labels[start:stop]
+        dist = np.sqrt(np.sum((X[start:stop] - centroids[own])**2, axis=1))
+        scatter += np.bincount(own, weights=dist, minlength=num_clusters)
+
+    scatter /= np.maximum(counts, 1)
+
+    # Only non-empty clusters contribute to the index
+    present = counts > 0
+    if np.sum(present) < 2:
+        return 0.
+
+    scatter = scatter[present]
+    centroids = centroids[present]
+    C_sq = _squared_norms(centroids)
+    separation = _distances(centroids, centroids, C_sq, C_sq)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = (scatter[:,np.newaxis] + scatter[np.newaxis,:]) / separation
+
+    np.fill_diagonal(ratios, -np.inf)
+    ratios[np.isnan(ratios)] = 0.
+
+    return np.mean(np.max(ratios, axis=1))
+
+
+def calinski_harabasz(X, labels, chunk_size=CHUNK_SIZE):
+    '''Returns the Calinski-Harabasz (variance ratio) index for the clustering.
+
+       The index is the ratio of the between-cluster dispersion to the
+       within-cluster dispersion, each normalized by its degrees of freedom.
+       Higher scores indicate denser and better separated clusters.
+    '''
+
+    X = np.asarray(X, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.intp)
+    num_samples = X.shape[0]
+
+    centroids, counts = _centroids(X, labels, labels.max() + 1, chunk_size)
+    num_clusters = np.sum(counts > 0)
+
+    if num_clusters < 2 or num_clusters == num_samples:
+        return 0.
+
+    # The weighted mean of the centroids is the mean of all samples
+    mean = np.dot(counts, centroids) / num_samples
+    between = np.sum(counts * np.sum((centroids - mean)**2, axis=1))
+
+    within = 0.
+    for start in range(0, num_samples, chunk_size):
+        stop = min(start + chunk_size, num_samples)
+        own = labels[start:stop]
+        within += np.sum((X[start:stop] - centroids[own])**2)
+
+    if within == 0.:
+        return 1.
+
+    return (between * (num_samples - num_clusters)) / \
+           (within * (num_clusters - 1.))
@@ -0,0 +1,222 @@
+'''A clustered regression ensemble built on the Cluster class.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import regression"
+
+   The ClusteredRegressor class encapsulates the three steps used by the
+   clustered SVR scripts:
+
+       1) (Optional) PCA transformation and KMeans clustering of the features
+       2) Fitting a separate regression model to the samples in each cluster
+       3) Predicting the target value for each sample with its cluster's model
+
+   The per-cluster models are fit in parallel across clusters with a process
+   pool. Predictions assign every sample to a cluster in a single pass and
+   then call each cluster's model once on the contiguous block of its samples.
+   Clusters with too few training samples fall back to a model fit on all of
+   the training samples. The targets may be a matrix with one column per
+   output (ie, per energy and tally) if the estimator supports multiple
+   outputs, in which case each cluster's model predicts every output at once.
+'''
+
+import multiprocessing
+
+import numpy as np
+from sklearn.base import clone
+
+import cluster
+import profiling
+
+
+def _fit_model(args):
+    '''Fits a model to a set of samples (called by the worker processes).'''
+
+    model, X, y = args
+    model.fit(X, y)
+
+    return model
+
+
+
+class ClusteredRegressor:
+    '''The ClusteredRegressor class.
+
+       This class fits one regression model per cluster of samples and
+       dispatches predictions to the model for each sample's cluster.
+    '''
+
+    def __init__(self, estimator, num_clusters=5, num_components=0,
+                 cluster_model=None, transform=True, min_samples=10,
+                 n_jobs=1):
+        '''Initialize the ClusteredRegressor class.
+
+           The estimator is an (unfitted) sklearn regression model which is
+           cloned for each cluster, or a list with one estimator per cluster.
+           If a fitted Cluster object is given as cluster_model it is used
+           as-is; otherwise a new one is built in fit with num_clusters KMeans
+           clusters after projecting onto num_components PCA components (no
+           PCA if num_components is zero).
+
+           If transform is True, the per-cluster models are fit in the same
+           (scaled and PCA-projected) space as the clusters; otherwise they
+           are fit on the original feature vectors. Clusters with fewer than
+           min_samples training samples use a model fit to all samples. The
+           models are fit with n_jobs processes (all cores if n_jobs is -1).
+        '''
+
+        self._estimator = estimator
+        self._num_clusters = num_clusters
+        self._num_components = num_components
+        self._cluster_model = cluster_model
+        self._transform = transform
+        self._min_samples = min_samples
+        self._n_jobs = n_jobs
+
+        self._assigner = None
+        self._models = None
+        self._fallback_model = None
+        self._output_shape = ()
+
+
+    def _get_estimator(self, c):
+        '''Returns an unfitted clone of the estimator for cluster c.'''
+
+        if isinstance(self._estimator, (list, tuple)):
+            return clone(self._estimator[c])
+        else:
+            return clone(self._estimator)
+
+
+    def _get_features(self, X):
+        '''Returns the feature vectors used by the per-cluster models.'''
+
+        if self._transform:
+            return self._cluster_model.transform(X)
+        else:
+            return np.asarray(X)
+
+
+    @profiling.timed('ClusteredRegressor.fit')
+    def fit(self, X, y):
+        '''Fits the cluster model and one regression model per cluster.
+
+           Returns this ClusteredRegressor for convenience.
+        '''
+
+        y = np.asarray(y)
+
+        # Targets with one column are treated as a single output
+        if y.ndim == 2 and y.shape[1] == 1:
+            y = y.ravel()
+
+        self._output_shape = y.shape[1:]
+
+        # Build the clustering model if one was not provided
+        if self._cluster_model is None:
+            self._cluster_model = cluster.Cluster(X)
+
+            if self._num_components > 0:
+                self._cluster_model.build_pca_model(self._num_components)
+
+            self._cluster_model.build_clusters(method='kmeans',
+                                               num_clusters=self._num_clusters)
+
+        self._num_clusters = self._cluster_model._num_clusters
+        self._assigner = self._cluster_model.get_assigner(raw=True)
+
+        features = self._get_features(X)
+        labels = self._assigner.assign(X)
+        counts = np.bincount(labels, minlength=self._num_clusters)
+
+        # Collect the samples for each cluster with enough samples to fit
+        jobs = []
+        clusters = []
+
+        for c in range(self._num_clusters):
+            if counts[c] >= max(self._min_samples, 1):
+                indices = labels == c
+                jobs.append((self._get_estimator(c), features[indices],
+                             y[indices]))
+                clusters.append(c)
+
+        # Fit a model to all samples for the empty or tiny clusters
+        self._fallback_model = None
+        if len(clusters) < self._num_clusters:
+            jobs.append((self._get_estimator(0), features, y))
+
+        # Fit the models, in parallel across clusters if requested
+        n_jobs = self._n_jobs
+        if n_jobs == -1:
+            n_jobs = multiprocessing.cpu_count()
+
+        if n_jobs > 1 and len(jobs) > 1:
+            pool = multiprocessing.Pool(min(n_jobs, len(jobs)))
+            fitted = pool.map(_fit_model, jobs)
+            pool.close()
+            pool.join()
+        else:
+            fitted = [_fit_model(job) for job in jobs]
+
+        profiling.count('samples', len(labels))
+
+        if len(clusters) < self._num_clusters:
+            self._fallback_model = fitted.pop()
+
+        self._models = [self._fallback_model] * self._num_clusters
+        for c, model in zip(clusters, fitted):
+            self._models[c] = model
+
+        return self
+
+
+    @profiling.timed('ClusteredRegressor.predict')
+    def predict(self, X):
+        '''Returns the predicted target value for each sample in X.
+
+           Each sample is assigned to a cluster in a single pass, and the
+           samples are then grouped by cluster so that each cluster's model
+           is called once on a contiguous block of feature vectors. For
+           multi-output models, a matrix with one column per output is
+           returned.
+        '''
+
+        if self._models is None:
+            raise Exception('Cannot make predictions until the fit ' + \
+                            'method is called')
+
+        labels = self._assigner.assign(X)
+        features = self._get_features(X)
+
+        # Sort the samples by cluster and find the bounds of each group
+        order = np.argsort(labels, kind='mergesort')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(labels,
+                                            minlength=self._num_clusters))))
+
+        predictions = np.zeros((len(labels),) + self._output_shape)
+
+        for c in range(self._num_clusters):
+            if bounds[c+1] > bounds[c]:
+                indices = order[bounds[c]:bounds[c+1]]
+                predictions[indices] = self._models[c].predict(
+                    features[indices])
+
+        profiling.count('samples', len(labels))
+
+        return predictions
+
+
+    def get_cluster_model(self):
+        '''Returns the Cluster object used to group the samples.'''
+
+        return self._cluster_model
+
+
+    def get_models(self):
+        '''Returns the list of fitted regression models indexed by cluster.
+
+           Clusters with too few samples share the fallback model fit to all
+           of the training samples.
+        '''
+
+        return self._models
@@ -0,0 +1,220 @@
+'''Streams feature vectors from the HDF5 samples files in fixed-size chunks.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import samples"
+
+   The samples files generated by process/samples.py store the feature vectors
+   and target values for each assembly in 'data/<assembly>-samples.h5' indexed
+   by batch, energy and tally. This module provides a SampleStream class to
+   iterate over the feature vectors (or targets) for any combination of
+   assemblies, batches, energies and tallies in chunks of rows read directly
+   from the HDF5 datasets, such that the samples never need to be loaded into
+   memory all at once.
+
+   The load_stacked_samples function instead loads the samples for several
+   energies and tallies side by side, such that a single multi-output model
+   can be fit to predict all of the tallies for each pin at once.
+'''
+
+import numpy as np
+import h5py as h5
+
+
+# The feature columns from the 3x3 Monte Carlo tally mesh for each pin. The
+# remaining feature columns are the geometry/materials features, which are
+# the same for every energy and tally (see process/samples.py).
+MC_COLUMNS = slice(0, 9)
+GEOMETRY_COLUMNS = slice(9, 18)
+
+
+class SampleStream:
+    '''The SampleStream class.
+
+       This class is an iterable over chunks of feature vectors (stored as
+       rows) from one or more samples files. Each iteration re-opens the
+       files, so a SampleStream may be iterated over any number of times.
+    '''
+
+    def __init__(self, filenames, batches, energies, tallies,
+                 dataset='Features', columns=None, chunk_size=4096):
+        '''Initialize the SampleStream class.
+
+           Takes in the samples filenames and the batch(es), energy(ies) and
+           tally(ies) to read samples for. Each of these may be given as a
+           single string or a list of strings. The dataset is either
+           'Features' or 'Targets', and columns is an optional list or slice
+           of the feature columns to keep (ie, slice(0,9) for the 3x3 tally
+           mesh features only).
+        '''
+
+        if isinstance(filenames, str):
+            filenames = [filenames]
+        if isinstance(batches, str):
+            batches = [batches]
+        if isinstance(energies, str):
+            energies = [energies]
+        if isinstance(tallies, str):
+            tallies = [tallies]
+
+        self._filenames = list(filenames)
+        self._batches = list(batches)
+        self._energies = list(energies)
+        self._tallies = list(tallies)
+        self._dataset = dataset
+        self._columns = columns
+        self._chunk_size = chunk_size
+
+
+    def __iter__(self):
+        '''Yields chunks of at most chunk_size samples as 2D numpy arrays.'''
+
+        for filename in self._filenames:
+
+            sample_file = h5.File(filename, 'r')
+
+            try:
+                for batch in self._batches:
+                    for energy in self._energies:
+                        for tally in self._tallies:
+
+                            data = sample_file[batch][energy][tally]
+                            data = data[self._dataset]
+
+                            for start in range(0, data.shape[0],
+                                               self._chunk_size):
+                                stop = min(start+self._chunk_size,
+                                           data.shape[0])
+                                chunk = data[start:stop]
+
+                                if self._columns is not None:
+                                    chunk = chunk[:,self._columns]
+
+                                yield chunk
+            finally:
+                sample_file.close()
+
+
+    def get_num_samples(self):
+        '''Returns the total number of samples in the stream.
+
+           Only the dataset shapes are read from each file.
+        '''
+
+        num_samples = 0
+
+        for filename in self._filenames:
+
+            sample_file = h5.File(filename, 'r')
+
+            for batch in self._batches:
+                for energy in self._energies:
+                    for tally in self._tallies:
+                        data = sample_file[batch][energy][tally]
+                        num_samples += data[self._dataset].shape[0]
+
+            sample_file.close()
+
+        return num_samples
+
+
+
+def compute_scaling(chunks, hasher=None):
+    '''Returns the mean and standard deviation of each feature.
+
+       The moments are accumulated chunk by chunk using the pairwise update
+       of Chan et al. so that the data is only read once. Features with zero
+       variance are given a unit standard deviation, as in sklearn's scale.
+       If a hashlib hasher is given, it is updated with each chunk's bytes.
+    '''
+
+    count = 0
+    mean = None
+    m2 = None
+
+    for chunk in chunks:
+
+        chunk = np.asarray(chunk, dtype=np.float64)
+        chunk_count = chunk.shape[0]
+
+        if chunk_count == 0:
+            continue
+
+        if hasher is not None:
+            hasher.update(np.ascontiguousarray(chunk).data)
+
+        chunk_mean = np.mean(chunk, axis=0)
+        chunk_m2 = np.sum((chunk - chunk_mean)**2, axis=0)
+
+        if mean is None:
+            count = chunk_count
+            mean = chunk_mean
+            m2 = chunk_m2
+            continue
+
+        # Merge the moments of this chunk with the running moments
+        total = count + chunk_count
+        delta = chunk_mean - mean
+        mean = mean + delta * chunk_count / float(total)
+        m2 = m2 + chunk_m2 + delta**2 * count * chunk_count / float(total)
+        count = total
+
+    if mean is None:
+        raise Exception('Unable to compute scaling since no samples were read')
+
+    std = np.sqrt(m2 / count)
+    std[std == 0.] = 1.
+
+    return mean, std
+
+
+
+def load_stacked_samples(filename, batch, energies, tallies):
+    '''Returns the samples for several energies and tallies side by side.
+
+       The samples for each (energy, tally) in a samples file share the same
+       pins and geometry/materials features and only differ in the Monte
+       Carlo tally features. This function stacks the Monte Carlo features
+       for each (energy, tally) in order followed by a single copy of the
+       geometry/materials features into a matrix of feature vectors, and the
+       targets for each (energy, tally) into a matrix of target vectors.
+
+       Returns the feature matrix, the target matrix (one column per
+       (energy, tally)) and the list of (energy, tally) tuples for each
+       target column.
+    '''
+
+    if isinstance(energies, str):
+        energies = [energies]
+    if isinstance(tallies, str):
+        tallies = [tallies]
+
+    sample_file = h5.File(filename, 'r')
+
+    features = []
+    targets = []
+    outputs = []
+    geometry = None
+
+    try:
+        for energy in energies:
+            for tally in tallies:
+                data = sample_file[batch][energy][tally]
+                X = data['Features'][...]
+
+                if geometry is None:
+                    geometry = X[:,GEOMETRY_COLUMNS]
+                elif not np.array_equal(geometry, X[:,GEOMETRY_COLUMNS]):
+                    raise Exception('Unable to stack the samples for ' + \
+                                    energy + ' ' + tally + ' since the ' + \
+                                    'geometry features do not match')
+
+                features.append(X[:,MC_COLUMNS])
+                targets.append(np.ravel(data['Targets'][...]))
+                outputs.append((energy, tally))
+    finally:
+        sample_file.close()
+
+    features.append(geometry)
+
+    return np.hstack(features), np.column_stack(targets), outputs
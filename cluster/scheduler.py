@@ -0,0 +1,298 @@
+'''A task graph scheduler for running a study's jobs on a process pool.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import scheduler"
+
+   The TaskGraph class holds a set of named tasks, each of which is a function
+   to call with some fixed arguments followed by the results of the tasks it
+   depends on. Calling run executes each task once all of its dependencies
+   have finished, on a pool of worker processes with a bounded number of
+   tasks in flight. The result of each task is passed to its dependents and
+   then released, unless the task was added with keep=True, in which case it
+   is returned by run.
+
+   Each task is timed as a stage named by its function (see profiling.py).
+   The stages recorded by the tasks run in worker processes are returned with
+   their results and merged into the timing tree of the calling process.
+
+   Data needed by many tasks (ie, the samples loaded for an experiment) may
+   be given to run as the arguments of an initializer, which is called once
+   in each worker process when it is started (as for search.py) rather than
+   passing the data with each task.
+
+   Task functions and arguments must be picklable (i.e., functions defined at
+   the top level of a module or script) when run with more than one process.
+   Since worker processes cannot start process pools of their own, the tasks
+   should not request parallelism themselves.
+'''
+
+import multiprocessing
+import pickle
+import threading
+import traceback
+
+import profiling
+
+
+def _run_task(function, args, worker=False):
+    '''Calls a task's function and returns (success, result or traceback,
+       stages).
+
+       The stages are the timers recorded by the task if it was run in a
+       worker process, and None otherwise.
+    '''
+
+    if worker:
+        profiling.reset()
+
+    try:
+        with profiling.timer(getattr(function, '__name__', 'task')):
+            outcome = True, function(*args)
+    except Exception:
+        outcome = False, traceback.format_exc()
+
+    if worker:
+        # A result which cannot be pickled would be lost by the pool along
+        # with its callback, so report it as a failure of the task instead
+        if outcome[0]:
+            try:
+                pickle.dumps(outcome[1], pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                outcome = False, 'Unable to pickle the result of the ' + \
+                    'task:\n' + traceback.format_exc()
+
+        return outcome + (profiling.get_stages(),)
+    else:
+        return outcome + (None,)
+
+
+
+class TaskGraph:
+    '''The TaskGraph class.
+
+       This class stores a directed acyclic graph of tasks and runs them in
+       dependency order on a process pool.
+    '''
+
+    def __init__(self):
+        '''Initialize the TaskGraph class with no tasks.'''
+
+        self._tasks = {}
+        self._order = []
+
+
+    def add_task(self, name, function, args=(), dependencies=(), keep=False):
+        '''Adds a task to the graph.
+
+           The task calls function(*args, *results) where results are the
+           results of the named dependencies in order. The dependencies must
+           already be in the graph. If keep is True, the task's result is
+           included in the dictionary returned by run.
+        '''
+
+        if name in self._tasks:
+            raise Exception('Unable to add task ' + str(name) + ' since ' + \
+                            'the graph already contains a task with that name')
+
+        for dependency in dependencies:
+            if dependency not in self._tasks:
+                raise Exception('Unable to add task ' + str(name) + ' ' + \
+                                'since its dependency ' + str(dependency) + \
+                                ' is not in the graph')
+
+        self._tasks[name] = {'function': function, 'args': tuple(args),
+                             'dependencies': tuple(dependencies),
+                             'keep': keep}
+        self._order.append(name)
+
+
+    def get_num_tasks(self):
+        '''Returns the number of tasks in the graph.'''
+
+        return len(self._tasks)
+
+
+    def _get_task_args(self, name, results):
+        '''Returns the arguments for a task including its dependencies'
+           results.'''
+
+        task = self._tasks[name]
+        return task['args'] + tuple(results[dependency]
+                                    for dependency in task['dependencies'])
+
+
+    def _collect(self, pending, position, finished):
+        '''Moves the finished tasks from the pending AsyncResults to the
+           finished list (in the order the tasks were added).
+
+           A task which failed in the pool rather than in _run_task (ie, if
+           its arguments could not be pickled) is reported as a failure with
+           the pool's error.
+        '''
+
+        for name in sorted(pending, key=lambda task: position[task]):
+            if not pending[name].ready():
+                continue
+
+            async_result = pending.pop(name)
+
+            if async_result.successful():
+                finished.append((name, async_result.get()))
+            else:
+                try:
+                    async_result.get()
+                except Exception:
+                    finished.append((name, (False, traceback.format_exc(),
+                                            None)))
+
+
+    def run(self, n_jobs=-1, max_pending=None, verbose=False,
+            initializer=None, initargs=()):
+        '''Runs all of the tasks in dependency order.
+
+           The tasks are run by n_jobs worker processes (all cores if n_jobs is
+           -1, in this process if n_jobs is 1). At most max_pending tasks
+           (twice the number of processes by default) are submitted at once,
+           which bounds the memory held by the arguments of queued tasks.
+           Tasks are started in the order they were added whenever possible.
+           If an initializer is given, initializer(*initargs) is called once
+           in each worker process (or in this process if n_jobs is 1) before
+           any tasks are run.
+
+           Returns a dictionary of the results of the tasks added with keep
+           set to True, indexed by task name.
+        '''
+
+        if n_jobs == -1:
+            n_jobs = multiprocessing.cpu_count()
+
+        if max_pending is None:
+            max_pending = 2 * n_jobs
+
+        # The number of unfinished dependencies and the dependents of each task
+        num_waiting = {}
+        dependents = dict((name, []) for name in self._order)
+
+        for name in self._order:
+            num_waiting[name] = len(self._tasks[name]['dependencies'])
+            for dependency in self._tasks[name]['dependencies']:
+                dependents[dependency].append(name)
+
+        # The number of unfinished dependents for each task's result
+        num_users = dict((name, len(dependents[name])) for name in self._order)
+
+        ready = [name for name in self._order if num_waiting[name] == 0]
+        position = dict((name, i) for i, name in enumerate(self._order))
+        results = {}
+        kept = {}
+
+        # The results of the completed tasks waiting to be collected
+        finished = []
+
+        # The pool's result thread signals when a task finishes
+        event = threading.Event()
+
+        def notify(result):
+            event.set()
+
+        pool = None
+        workers = set()
+
+        if n_jobs > 1:
+            pool = multiprocessing.Pool(n_jobs, initializer, initargs)
+            workers.update(pool._pool)
+        elif initializer is not None:
+            initializer(*initargs)
+
+        pending = {}
+        num_done = 0
+        completed = False
+
+        try:
+            while num_done < len(self._order):
+
+                # Submit the ready tasks up to the bound on pending tasks
+                while len(ready) > 0 and (pool is None or
+                                          len(pending) < max_pending):
+                    name = ready.pop(0)
+                    args = (self._tasks[name]['function'],
+                            self._get_task_args(name, results))
+
+                    if pool is None:
+                        finished.append((name, _run_task(*args)))
+                        break
+
+                    pending[name] = pool.apply_async(_run_task,
+                                                     args + (True,),
+                                                     callback=notify)
+
+                # Wait for at least one task to finish, waking up regularly
+                # to find the tasks which failed without a callback (ie, if
+                # their arguments could not be pickled)
+                if pool is not None:
+                    event.wait(1.)
+                    event.clear()
+                    self._collect(pending, position, finished)
+
+                    # The pool replaces a killed worker process (ie, by the
+                    # OOM killer) without failing its task, so any worker
+                    # which has died must be reported here
+                    workers.update(pool._pool)
+
+                    for worker in workers:
+                        if worker.exitcode not in (None, 0):
+                            raise Exception('Unable to finish the tasks ' + \
+                                            'since a worker process ' + \
+                                            'exited with code ' + \
+                                            str(worker.exitcode))
+
+                while len(finished) > 0:
+                    name, (success, result, stages) = finished.pop(0)
+                    num_done += 1
+
+                    if stages is not None:
+                        profiling.merge(stages)
+
+                    if not success:
+                        raise Exception('Task ' + str(name) + ' failed ' + \
+                                        'with the following error:\n' + \
+                                        result)
+
+                    if verbose:
+                        print 'Finished task %d of %d: %s' % \
+                            (num_done, len(self._order), name)
+
+                    if self._tasks[name]['keep']:
+                        kept[name] = result
+
+                    if num_users[name] > 0:
+                        results[name] = result
+
+                    # Release the results no longer needed by any task
+                    for dependency in self._tasks[name]['dependencies']:
+                        num_users[dependency] -= 1
+                        if num_users[dependency] == 0:
+                            del results[dependency]
+
+                    # Queue the dependents whose dependencies have all
+                    # finished
+                    for dependent in dependents[name]:
+                        num_waiting[dependent] -= 1
+                        if num_waiting[dependent] == 0:
+                            ready.append(dependent)
+
+                    ready.sort(key=lambda task: position[task])
+
+            completed = True
+
+        finally:
+            # Stop the workers on any error (including KeyboardInterrupt)
+            if pool is not None:
+                if completed:
+                    pool.close()
+                    pool.join()
+                else:
+                    pool.terminate()
+
+        return kept
@@ -0,0 +1,474 @@
+'''A parallel cross-validated hyperparameter search engine.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import search"
+
+   This module evaluates a regression model for every point in a grid of
+   parameter settings using k-fold cross-validation. The grid points are
+   distributed across a pool of worker processes which each receive the
+   training samples once (when the worker is started) rather than with each
+   task. The score for each grid point is streamed to a results file as soon
+   as it finishes, so that partial results survive an interrupted study.
+
+   Two search strategies are available:
+
+       1) grid_search - cross-validates every grid point on all samples
+       2) successive_halving - cross-validates every grid point on a small
+          subset of the samples and only re-scores the best fraction of them
+          on progressively more samples
+
+   For SVR models with an RBF kernel, the grid points which share a value of
+   gamma are evaluated together by one worker. The kernel matrix for each
+   fold is computed once for that gamma and reused (with kernel='precomputed')
+   for every C and epsilon, then discarded before the next fold.
+
+   The scores are the negative mean squared error on each held-out fold (as
+   for sklearn's 'mean_squared_error' scoring), such that higher is "better."
+   If a cache.ResultCache is given, the scores for each grid point are stored
+   in it and grid points already scored on the same samples are not re-run.
+'''
+
+import itertools
+import json
+import multiprocessing
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics.pairwise import rbf_kernel
+
+import profiling
+from cache import get_data_hashes, get_key, get_params
+
+
+# The training data and folds shared by the worker processes
+_worker_data = None
+
+
+
+################################################################################
+##################################  Utilities  #################################
+################################################################################
+
+def expand_grid(param_grid):
+    '''Returns a list of parameter dictionaries for each grid point.
+
+       The param_grid is a dictionary mapping each parameter name to a list of
+       values, or a list of such dictionaries. The grid points are ordered
+       with the last parameter varying fastest, as in nested loops over the
+       parameters in order. Use an OrderedDict (or a list of (name, values)
+       tuples) to control the order.
+    '''
+
+    if isinstance(param_grid, dict):
+        param_grid = [param_grid]
+    elif len(param_grid) > 0 and isinstance(param_grid[0], tuple):
+        param_grid = [param_grid]
+
+    points = []
+
+    for grid in param_grid:
+        items = grid.items() if isinstance(grid, dict) else list(grid)
+        names = [name for name, values in items]
+
+        for values in itertools.product(*[values for name, values in items]):
+            points.append(dict(zip(names, values)))
+
+    return points
+
+
+def get_folds(num_samples, num_folds=3):
+    '''Returns a list of (train, test) index arrays for k-fold validation.
+
+       The folds are contiguous and unshuffled, which is the default for
+       sklearn's cross_val_score with regression models.
+    '''
+
+    indices = np.arange(num_samples)
+    sizes = np.ones(num_folds, dtype=np.int64) * (num_samples // num_folds)
+    sizes[:num_samples % num_folds] += 1
+
+    folds = []
+    start = 0
+
+    for size in sizes:
+        test = indices[start:start+size]
+        train = np.concatenate((indices[:start], indices[start+size:]))
+        folds.append((train, test))
+        start += size
+
+    return folds
+
+
+def cross_validate(estimator, X, y, folds):
+    '''Returns the negative mean squared error of the model on each fold.'''
+
+    scores = np.zeros(len(folds))
+
+    for i, (train, test) in enumerate(folds):
+        model = clone(estimator)
+        model.fit(X[train], y[train])
+        scores[i] = -np.mean((model.predict(X[test]) - y[test])**2)
+
+    return scores
+
+
+def get_kernel_groups(estimator, points, num_features):
+    '''Returns the grid points grouped by a shared RBF kernel.
+
+       Returns a list of (gamma, indices) tuples with the indices of the grid
+       points which use an RBF kernel with that value of gamma, or None if the
+       estimator is not a kernel model or any grid point does not use an RBF
+       kernel with a numeric gamma (in which case no kernels are cached).
+    '''
+
+    defaults = estimator.get_params()
+
+    if 'kernel' not in defaults or 'gamma' not in defaults:
+        return None
+
+    groups = {}
+
+    for i, params in enumerate(points):
+        kernel = params.get('kernel', defaults['kernel'])
+        gamma = params.get('gamma', defaults['gamma'])
+
+        if kernel != 'rbf':
+            return None
+
+        # The 'auto' value of gamma in sklearn (0.0 in older releases)
+        if gamma == 'auto' or gamma == 0.0:
+            gamma = 1. / num_features
+        elif isinstance(gamma, str):
+            return None
+
+        groups.setdefault(float(gamma), []).append(i)
+
+    return sorted(groups.items())
+
+
+def cross_validate_kernel(estimator, points, X, y, folds, gamma):
+    '''Returns the scores on each fold for grid points sharing an RBF kernel.
+
+       The kernel matrices between the training samples and between the test
+       and training samples are computed once per fold and reused to fit the
+       model with kernel='precomputed' for each of the parameter settings in
+       points. Only the kernel matrices for one fold are held at a time.
+    '''
+
+    scores = np.zeros((len(points), len(folds)))
+
+    for j, (train, test) in enumerate(folds):
+        K_train = rbf_kernel(X[train], gamma=gamma)
+        K_test = rbf_kernel(X[test], X[train], gamma=gamma)
+
+        for i, params in enumerate(points):
+            model = clone(estimator)
+            model.set_params(**params)
+            model.set_params(kernel='precomputed')
+            model.fit(K_train, y[train])
+            scores[i,j] = -np.mean((model.predict(K_test) - y[test])**2)
+
+        # Evict this fold's kernel matrices before building the next
+        del K_train, K_test
+
+    return scores
+
+
+
+################################################################################
+##############################  Parallel Search  ###############################
+################################################################################
+
+def _init_worker(estimator, X, y, folds):
+    '''Stores the training data for the tasks run by this worker process.'''
+
+    global _worker_data
+    _worker_data = (estimator, X, y, folds)
+
+
+def _evaluate(task):
+    '''Cross-validates one grid point (called by the worker processes).'''
+
+    index, params = task
+    estimator, X, y, folds = _worker_data
+
+    model = clone(estimator)
+    model.set_params(**params)
+
+    return [(index, cross_validate(model, X, y, folds))]
+
+
+def _evaluate_kernel(task):
+    '''Cross-validates the grid points sharing a kernel (called by the worker
+       processes).'''
+
+    gamma, indices, points = task
+    estimator, X, y, folds = _worker_data
+
+    scores = cross_validate_kernel(estimator, points, X, y, folds, gamma)
+
+    return list(zip(indices, scores))
+
+
+def _write_result(results_file, label, params, scores, extra=None):
+    '''Appends the scores for one grid point to the results file.'''
+
+    record = {'params': params, 'mean': float(np.mean(scores)),
+              'std': float(np.std(scores))}
+
+    if label is not None:
+        record['label'] = label
+    if extra is not None:
+        record.update(extra)
+
+    results_file.write(json.dumps(record, sort_keys=True) + '\n')
+    results_file.flush()
+
+
+def _evaluate_points(estimator, points, X, y, num_folds, n_jobs,
+                     results_file, label, extra=None, cache_kernels=True,
+                     cache=None):
+    '''Returns the cross-validation scores for each parameter setting.
+
+       The parameter settings are distributed across n_jobs worker processes
+       and the scores for each are appended to the results file (if not None)
+       as soon as they are available. If cache_kernels is True and the
+       settings all use an RBF kernel, each task is the group of settings
+       which share a value of gamma rather than a single setting. If a
+       ResultCache is given, only the settings which are not cached are run.
+    '''
+
+    folds = get_folds(X.shape[0], num_folds)
+    scores = [None] * len(points)
+
+    # Look up the scores for the parameter settings which were already run
+    keys = None
+    remaining = list(range(len(points)))
+
+    if cache is not None:
+        keys = []
+        remaining = []
+
+        # The samples and default parameters are the same for each setting
+        data_hashes = get_data_hashes(X, y)
+        default_params = get_params(estimator)
+
+        for index, params in enumerate(points):
+            model_params = dict(default_params)
+            model_params.update(params)
+            keys.append(get_key(X, y, model_params, data_hashes=data_hashes,
+                                folds=num_folds))
+
+            cached = cache.get(keys[-1])
+
+            if cached is None or cached['scores'] is None:
+                remaining.append(index)
+            else:
+                scores[index] = cached['scores']
+
+                if results_file is not None:
+                    _write_result(results_file, label, params, scores[index],
+                                  extra)
+
+    groups = None
+    if cache_kernels:
+        groups = get_kernel_groups(estimator, [points[i] for i in remaining],
+                                   X.shape[1])
+
+    if groups is None:
+        evaluate = _evaluate
+        tasks = [(i, points[i]) for i in remaining]
+    else:
+        evaluate = _evaluate_kernel
+        tasks = [(gamma, [remaining[i] for i in indices],
+                  [points[remaining[i]] for i in indices])
+                 for gamma, indices in groups]
+
+    if n_jobs == -1:
+        n_jobs = multiprocessing.cpu_count()
+
+    if n_jobs > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(min(n_jobs, len(tasks)), _init_worker,
+                                    (estimator, X, y, folds))
+        results = pool.imap_unordered(evaluate, tasks)
+    else:
+        pool = None
+        _init_worker(estimator, X, y, folds)
+        results = (evaluate(task) for task in tasks)
+
+    # Collect the scores for each grid point as they finish
+    try:
+        for task_results in results:
+            for index, point_scores in task_results:
+                scores[index] = point_scores
+
+                if results_file is not None:
+                    _write_result(results_file, label, points[index],
+                                  point_scores, extra)
+
+                if cache is not None:
+                    cache.put(keys[index], scores=point_scores)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return scores
+
+
+def _open_results(results_file):
+    '''Returns an open results file handle and whether it should be closed.'''
+
+    if isinstance(results_file, str):
+        return open(results_file, 'a'), True
+    else:
+        return results_file, False
+
+
+@profiling.timed()
+def grid_search(estimator, param_grid, X, y, num_folds=3, n_jobs=-1,
+                results_file=None, label=None, cache_kernels=True,
+                cache=None):
+    '''Cross-validates a model for every point in a parameter grid.
+
+       The grid points are evaluated by n_jobs worker processes (all cores if
+       n_jobs is -1, in this process if n_jobs is 1). Each grid point is only
+       fit once per fold. If results_file is given (a filename or an open
+       file handle), one JSON record with the parameters, mean and standard
+       deviation of the scores is appended per grid point as it finishes,
+       tagged with the optional label. If cache_kernels is True, RBF kernel
+       matrices are shared by the grid points with the same gamma. If a
+       cache.ResultCache is given as cache, the grid points which were
+       already scored on the same samples are read from it.
+
+       Returns a list of (params, mean score, score std. dev.) tuples in grid
+       order. Use get_best_params to select the best grid point.
+    '''
+
+    X = np.asarray(X)
+    y = np.asarray(y).ravel()
+
+    points = expand_grid(param_grid)
+    results_file, close_file = _open_results(results_file)
+
+    try:
+        scores = _evaluate_points(estimator, points, X, y, num_folds, n_jobs,
+                                  results_file, label, None, cache_kernels,
+                                  cache)
+    finally:
+        if close_file:
+            results_file.close()
+
+    return [(points[i], np.mean(scores[i]), np.std(scores[i]))
+            for i in range(len(points))]
+
+
+
+################################################################################
+#############################  Successive Halving  #############################
+################################################################################
+
+def get_halving_schedule(num_points, num_samples, factor=3, min_samples=100):
+    '''Returns the number of samples and candidates for each halving round.
+
+       The number of rounds is chosen such that keeping the best 1/factor of
+       the candidates after each round leaves a single candidate at the end.
+       The number of samples grows geometrically from min_samples in the
+       first round to all of the samples in the last round.
+    '''
+
+    num_rounds = 1
+    while factor**num_rounds < num_points:
+        num_rounds += 1
+
+    min_samples = min(min_samples, num_samples)
+
+    if num_rounds == 1:
+        sizes = [num_samples]
+    else:
+        growth = (float(num_samples) / min_samples)**(1. / (num_rounds - 1))
+        sizes = [int(round(min_samples * growth**r))
+                 for r in range(num_rounds - 1)]
+        sizes.append(num_samples)
+
+    candidates = [num_points]
+    for r in range(num_rounds - 1):
+        candidates.append(max(1, -(-candidates[-1] // factor)))
+
+    return list(zip(sizes, candidates))
+
+
+@profiling.timed()
+def successive_halving(estimator, param_grid, X, y, factor=3, min_samples=100,
+                       num_folds=3, n_jobs=-1, results_file=None, label=None,
+                       seed=1, cache_kernels=True, cache=None):
+    '''Searches a parameter grid by successive halving.
+
+       Every grid point is first cross-validated on a random subset of
+       min_samples samples (drawn with a fixed seed). Only the best 1/factor
+       of the grid points are kept for the next round, which uses a larger
+       subset of the samples, until the last round cross-validates the
+       remaining grid points on all of the samples exactly as grid_search
+       would. Each round is evaluated in parallel as for grid_search and the
+       results file records the round and number of samples for each score.
+
+       Returns a list of (params, mean score, score std. dev.) tuples for the
+       grid points in the last round, in grid order, such that get_best_params
+       selects the best grid point.
+    '''
+
+    X = np.asarray(X)
+    y = np.asarray(y).ravel()
+
+    points = expand_grid(param_grid)
+    schedule = get_halving_schedule(len(points), X.shape[0], factor,
+                                    min_samples)
+
+    # Nested random subsets of the samples for the early rounds
+    order = np.random.RandomState(seed).permutation(X.shape[0])
+
+    results_file, close_file = _open_results(results_file)
+    candidates = list(range(len(points)))
+
+    try:
+        for r, (num_samples, num_candidates) in enumerate(schedule):
+
+            # Keep the best candidates from the previous round (in grid order)
+            if r > 0:
+                ranking = sorted(range(len(candidates)),
+                                 key=lambda i: (-means[i], candidates[i]))
+                candidates = sorted(candidates[i] for i in
+                                    ranking[:num_candidates])
+
+            # The last round uses all samples in their original order
+            if r == len(schedule) - 1:
+                subset = np.arange(X.shape[0])
+            else:
+                subset = np.sort(order[:num_samples])
+
+            extra = {'round': r, 'samples': int(len(subset))}
+            scores = _evaluate_points(estimator,
+                                      [points[i] for i in candidates],
+                                      X[subset], y[subset], num_folds, n_jobs,
+                                      results_file, label, extra,
+                                      cache_kernels, cache)
+            means = [np.mean(point_scores) for point_scores in scores]
+    finally:
+        if close_file:
+            results_file.close()
+
+    return [(points[candidates[i]], means[i], np.std(scores[i]))
+            for i in range(len(candidates))]
+
+
+def get_best_params(results):
+    '''Returns the parameters with the highest mean score.
+
+       Ties are broken in favor of the first grid point, as with the
+       list.index(max(...)) idiom used by the model selection scripts.
+    '''
+
+    means = [mean for params, mean, std in results]
+
+    return results[means.index(max(means))][0]
@@ -0,0 +1,553 @@
+'''Serves cross-section predictions from trained models over HTTP.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from cluster import serving"
+
+   The models fitted and saved by an experiment (see experiment.py) predict
+   the converged pinwise cross-sections for one assembly from the tallies of
+   a short Monte Carlo run. The InferenceService class loads the models for
+   one (model, assembly, batch) once, ie, a clustered SVR or tree model for
+   each energy and tally, and predicts the 17x17xG cross-sections for each
+   tally from either:
+
+       1) the path to a statepoint with the 3x3 mesh per pin, from which the
+          mesh values of each tally are computed as in process/features.py
+       2) the raw 3x3 mesh per pin values of each tally, as nested lists
+          indexed by mesh x, mesh y and energy group (in ENERGIES order)
+
+   The predicted cross-sections are indexed by pin x, pin y and the energy
+   groups served, which are listed in the "energies" of each response.
+
+   Concurrent requests are queued and predicted in batches by a single
+   prediction thread, such that each model is called once on the stacked
+   feature vectors of all of the requests in a batch. The latency of each
+   request is recorded, and the 50th and 99th percentiles are reported with
+   the other metrics.
+
+   The serve function runs the service as an HTTP server with a thread per
+   connection and the following JSON endpoints:
+
+       POST /predict - {"statepoint": path} or {"tallies": {tally: mesh}},
+                       returns {"energies": [...], "tallies": {tally: ...}}
+       GET /metrics - the number of requests and batches and the latencies
+       GET /models - the model, assembly, batch, energies and tallies served
+'''
+
+import BaseHTTPServer
+import Queue
+import SocketServer
+import glob
+import json
+import os
+import signal
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import h5py as h5
+
+import experiment
+import profiling
+
+
+# The energy groups in the order they are stored in the statepoint tallies
+ENERGIES = ['High Energy', 'Low Energy']
+
+# The score for each tally and whether it is divided by the flux
+TALLY_SCORES = {'Flux': ('flux', False),
+                'Tot. RXN Rate': ('total', False),
+                'Abs. RXN Rate': ('absorption', False),
+                'Fiss. RXN Rate': ('fission', False),
+                'NuFiss. RXN Rate': ('nu-fission', False),
+                'Tot. XS': ('total', True),
+                'Abs. XS': ('absorption', True),
+                'Fiss. XS': ('fission', True),
+                'NuFiss. XS': ('nu-fission', True)}
+
+# The number of feature mesh cells per pin in x and y
+REFINEMENT = 3
+
+# The number of recent request latencies kept for the percentiles
+LATENCY_WINDOW = 10000
+
+
+
+def load_models(directory, name=None, assembly=None, batch=None):
+    '''Returns the models saved in a directory for one (model, assembly,
+       batch), indexed by (energy, tally).
+
+       Only the models which match the given name, assembly and batch (if
+       any) are loaded. The matching models must all be for the same model,
+       assembly and batch. Each value is a (model, metadata) tuple (see
+       experiment.load_model).
+    '''
+
+    models = {}
+    selections = set()
+
+    for filename in sorted(glob.glob(os.path.join(directory, '*.pkl'))):
+
+        model, metadata = experiment.load_model(filename)
+
+        if name is not None and metadata['name'] != name:
+            continue
+        if assembly is not None and metadata['assembly'] != assembly:
+            continue
+        if batch is not None and metadata['batch'] != batch:
+            continue
+
+        selections.add((metadata['name'], metadata['assembly'],
+                        metadata['batch']))
+        models[(metadata['energy'], metadata['tally'])] = (model, metadata)
+
+    if len(models) == 0:
+        raise Exception('Unable to find any models in ' + directory + \
+                        ' for model ' + str(name) + ', assembly ' + \
+                        str(assembly) + ' and batch ' + str(batch))
+
+    if len(selections) > 1:
+        raise Exception('Unable to serve the models in ' + directory + \
+                        ' for more than one (model, assembly, batch): ' + \
+                        str(sorted(selections)))
+
+    return models
+
+
+def read_statepoint(filename, tallies, path='tallies/tally1/'):
+    '''Returns the mesh values of each tally from a statepoint.
+
+       The mean of each score is read from the tally results, and the
+       cross-sections are divided by the flux as in process/features.py. The
+       values are returned as a dictionary indexed by tally with an array
+       indexed by mesh x, mesh y and energy group for each tally.
+    '''
+
+    # The score types are defined with the statepoint reader
+    try:
+        from statepoint import score_types
+    except ImportError:
+        raise Exception('Unable to read statepoint ' + filename + ' since ' + \
+                        'process/statepoint.py is not on the path')
+
+    sp_file = h5.File(filename, 'r')
+
+    try:
+        score_bins = np.ravel(sp_file[path + 'score_bins'][...])
+        tally_scores = [score_types[score] for score in score_bins]
+        num_score_bins = int(sp_file[path + 'total_score_bins'][0])
+        num_realizations = int(sp_file[path + 'n_realizations'][0])
+        results = sp_file[path + 'results']['sum']
+    finally:
+        sp_file.close()
+
+    results = np.reshape(results, (-1, num_score_bins)) / num_realizations
+
+    # The mesh is square with one filter bin per mesh cell and energy group
+    num_groups = len(ENERGIES)
+    mesh_size = int(round(np.sqrt(results.shape[0] // num_groups)))
+
+    if mesh_size**2 * num_groups != results.shape[0]:
+        raise Exception('Unable to read statepoint ' + filename + ' with ' + \
+                        str(results.shape[0]) + ' filter bins which are ' + \
+                        'not a square mesh with ' + str(num_groups) + \
+                        ' energy groups')
+
+    def get_mean(score):
+        if score not in tally_scores:
+            raise Exception('Unable to read score ' + score + ' which is ' + \
+                            'not in statepoint ' + filename)
+
+        column = results[:,tally_scores.index(score)]
+        return np.reshape(column, (mesh_size, mesh_size, num_groups))
+
+    meshes = {}
+
+    for tally in tallies:
+        score, divide = TALLY_SCORES[tally]
+        meshes[tally] = get_mean(score)
+
+        if divide:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                meshes[tally] = np.nan_to_num(meshes[tally] / get_mean('flux'))
+
+    return meshes
+
+
+def get_features(mesh, geometry=None):
+    '''Returns the feature vectors for each pin from one tally's mesh.
+
+       The 3x3 mesh cells for each pin are ordered as in process/samples.py,
+       followed by the geometry/materials features for each pin (if any).
+    '''
+
+    num_x = mesh.shape[0] // REFINEMENT
+    num_y = mesh.shape[1] // REFINEMENT
+
+    features = np.reshape(mesh, (num_x, REFINEMENT, num_y, REFINEMENT))
+    features = features.transpose(0,2,3,1).reshape(num_x * num_y,
+                                                   REFINEMENT**2)
+
+    if geometry is not None:
+        features = np.hstack((features, geometry))
+
+    return features
+
+
+
+class InferenceService:
+    '''The InferenceService class.
+
+       This class predicts the pinwise cross-sections for each request with
+       a set of models, batching concurrent requests in a prediction thread.
+    '''
+
+    def __init__(self, models, max_batch_size=64, max_delay=0.005):
+        '''Initialize the InferenceService class.
+
+           Takes in the models indexed by (energy, tally) from load_models.
+           Each batch holds at most max_batch_size requests, and the
+           prediction thread waits at most max_delay seconds after the first
+           request of a batch for more requests to arrive.
+        '''
+
+        self._models = models
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+
+        self._energies = [energy for energy in ENERGIES
+                          if any([key[0] == energy for key in models])]
+        self._tallies = sorted(set([key[1] for key in models]))
+
+        # Each tally must have a model for every energy group
+        for energy in self._energies:
+            for tally in self._tallies:
+                if (energy, tally) not in models:
+                    raise Exception('Unable to serve ' + tally + ' without ' + \
+                                    'a model for ' + energy)
+
+        metadata = list(models.values())[0][1]
+        # The number of pins is fixed by the geometry features, if used
+        self._num_pins = None
+        if metadata['geometry'] is not None:
+            self._num_pins = metadata['geometry'].shape[0]
+
+        self._info = {'model': metadata['name'],
+                      'assembly': metadata['assembly'],
+                      'batch': metadata['batch'],
+                      'energies': self._energies, 'tallies': self._tallies}
+
+        self._queue = Queue.Queue()
+        self._thread = None
+
+        # The metrics, which are updated by the server's threads
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._num_requests = 0
+        self._num_errors = 0
+        self._num_batches = 0
+        self._num_batched = 0
+
+
+    def get_info(self):
+        '''Returns a dictionary describing the models served.'''
+
+        return dict(self._info)
+
+
+    def start(self):
+        '''Starts the prediction thread.'''
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def stop(self):
+        '''Stops the prediction thread once the queued requests finish.'''
+
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+    def _run(self):
+        '''Predicts the queued requests in batches until stopped.'''
+
+        while True:
+
+            request = self._queue.get()
+
+            if request is None:
+                return
+
+            # Collect the requests which arrive shortly after the first
+            batch = [request]
+            deadline = time.time() + self._max_delay
+
+            while len(batch) < self._max_batch_size:
+                try:
+                    request = self._queue.get(
+                        timeout=max(deadline - time.time(), 0.))
+                except Queue.Empty:
+                    break
+
+                if request is None:
+                    self._queue.put(None)
+                    break
+
+                batch.append(request)
+
+            try:
+                self._predict_batch(batch)
+            except Exception as error:
+                for request in batch:
+                    request['error'] = error
+
+            with self._lock:
+                self._num_batches += 1
+                self._num_batched += len(batch)
+
+            for request in batch:
+                request['done'].set()
+
+
+    @profiling.timed('InferenceService.predict_batch')
+    def _predict_batch(self, batch):
+        '''Predicts the cross-sections for a batch of requests.
+
+           Each model is called once on the stacked feature vectors for all
+           of the requests with its tally.
+        '''
+
+        for (energy, tally), (model, metadata) in self._models.items():
+
+            group = self._energies.index(energy)
+            mesh_group = ENERGIES.index(energy)
+            requests = [request for request in batch
+                        if tally in request['meshes']]
+
+            if len(requests) == 0:
+                continue
+
+            features = [get_features(request['meshes'][tally][:,:,mesh_group],
+                                     metadata['geometry'])
+                        for request in requests]
+            predictions = model.predict(np.vstack(features))
+            profiling.count('samples', len(predictions))
+
+            # Split the predictions for the pins of each request
+            start = 0
+
+            for request, request_features in zip(requests, features):
+                stop = start + request_features.shape[0]
+                request['results'][tally][:,:,group] = np.reshape(
+                    predictions[start:stop],
+                    request['results'][tally].shape[:2])
+                start = stop
+
+
+    def predict(self, meshes):
+        '''Returns the predicted pinwise cross-sections for each tally.
+
+           Takes in a dictionary of the mesh values for some or all of the
+           tallies served, each indexed by mesh x, mesh y and energy group
+           for all of the groups in ENERGIES. The predictions are returned
+           as a dictionary with an array indexed by pin x, pin y and energy
+           group for each tally, for only the groups served. This blocks
+           until the request's batch has been predicted.
+        '''
+
+        num_groups = len(ENERGIES)
+        results = {}
+
+        for tally, mesh in meshes.items():
+            if tally not in self._tallies:
+                raise Exception('Unable to predict ' + str(tally) + ' ' + \
+                                'which is not one of ' + str(self._tallies))
+
+            if mesh.ndim != 3 or mesh.shape[2] != num_groups or \
+                    mesh.shape[0] % REFINEMENT or mesh.shape[1] % REFINEMENT:
+                raise Exception('Unable to predict ' + tally + ' for a ' + \
+                                'mesh of shape ' + str(mesh.shape) + ' ' + \
+                                'which is not (3 x pins, 3 x pins, ' + \
+                                str(num_groups) + ' groups)')
+
+            shape = (mesh.shape[0] // REFINEMENT, mesh.shape[1] // REFINEMENT)
+
+            if self._num_pins is not None and \
+                    shape[0] * shape[1] != self._num_pins:
+                raise Exception('Unable to predict ' + tally + ' for ' + \
+                                str(shape[0] * shape[1]) + ' pins since ' + \
+                                'the models were fit to ' + \
+                                str(self._num_pins) + ' pins')
+
+            results[tally] = np.zeros(shape + (len(self._energies),))
+
+        if len(results) == 0:
+            raise Exception('Unable to predict without any tallies')
+
+        if self._thread is None:
+            raise Exception('Unable to predict until the start method ' + \
+                            'is called')
+
+        request = {'meshes': meshes, 'results': results, 'error': None,
+                   'done': threading.Event()}
+        self._queue.put(request)
+        request['done'].wait()
+
+        if request['error'] is not None:
+            raise request['error']
+
+        return results
+
+
+    def handle(self, request):
+        '''Returns the response for a decoded JSON prediction request.
+
+           The request holds either a 'statepoint' path or the raw mesh
+           values of each tally in 'tallies'. The latency of each request
+           is recorded, including reading the statepoint.
+        '''
+
+        start = time.time()
+
+        try:
+            if 'statepoint' in request:
+                meshes = read_statepoint(request['statepoint'],
+                                         self._tallies)
+            elif 'tallies' in request:
+                meshes = dict((tally, np.asarray(mesh, dtype=np.float64))
+                              for tally, mesh in request['tallies'].items())
+            else:
+                raise Exception('Unable to predict without a statepoint ' + \
+                                'or tallies in the request')
+
+            results = self.predict(meshes)
+
+        except Exception:
+            with self._lock:
+                self._num_errors += 1
+            raise
+
+        response = {'energies': self._energies,
+                    'tallies': dict((tally, results[tally].tolist())
+                                    for tally in results)}
+
+        with self._lock:
+            self._num_requests += 1
+            self._latencies.append(time.time() - start)
+
+        return response
+
+
+    def get_metrics(self):
+        '''Returns a dictionary of the number of requests, errors and batches,
+           the mean batch size and the 50th and 99th percentile latencies (in
+           milliseconds) of the recent requests.'''
+
+        with self._lock:
+            latencies = np.array(self._latencies)
+            metrics = {'requests': self._num_requests,
+                       'errors': self._num_errors,
+                       'batches': self._num_batches,
+                       'mean_batch_size': self._num_batched / \
+                           float(max(self._num_batches, 1)),
+                       'p50_ms': None, 'p99_ms': None}
+
+        if len(latencies) > 0:
+            metrics['p50_ms'] = float(np.percentile(latencies, 50) * 1e3)
+            metrics['p99_ms'] = float(np.percentile(latencies, 99) * 1e3)
+
+        return metrics
+
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''Handles the HTTP requests to the InferenceService (see serve).'''
+
+    def _send(self, status, body):
+
+        data = json.dumps(body).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def do_GET(self):
+
+        if self.path == '/metrics':
+            self._send(200, self.server.service.get_metrics())
+        elif self.path == '/models':
+            self._send(200, self.server.service.get_info())
+        else:
+            self._send(404, {'error': 'Unknown path ' + self.path})
+
+
+    def do_POST(self):
+
+        if self.path != '/predict':
+            self._send(404, {'error': 'Unknown path ' + self.path})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            response = self.server.service.handle(request)
+        except Exception as error:
+            self._send(400, {'error': str(error)})
+            return
+
+        self._send(200, response)
+
+
+    def log_message(self, format, *args):
+
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format,
+                                                              *args)
+
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    '''An HTTP server which handles each connection in a thread.'''
+
+    daemon_threads = True
+
+
+
+def _interrupt(signum, frame):
+    '''Stops the server on SIGTERM as on SIGINT (see serve).'''
+
+    raise KeyboardInterrupt
+
+
+def serve(service, host='127.0.0.1', port=8000, verbose=False):
+    '''Serves predictions from an InferenceService over HTTP until
+       interrupted (with SIGINT or SIGTERM).'''
+
+    server = _Server((host, port), _RequestHandler)
+    server.service = service
+    server.verbose = verbose
+
+    # Signal handlers may only be set from the main thread
+    try:
+        signal.signal(signal.SIGTERM, _interrupt)
+    except ValueError:
+        pass
+
+    service.start()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
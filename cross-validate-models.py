@@ -19,6 +19,8 @@
    Models considered, with parameters:
 
       1) SVR - RBF kernel with: width (gamma), and penalty (C)
+         Nystroem - rank num_nystroem RBF kernel approximation with ridge
+         regression with: width (gamma), and ridge penalty (alpha)
       2) CART1 - Regression tree with: samples per leaf (min_samples_leaf)
       3) Cluster/SVR - KMeans clustering with varying k; SVR as (1)    
       4) Cluster AVG - KMeans clustering with varying k; Average of target 
@@ -28,13 +30,19 @@
 import math
 import h5py as h5
 import numpy as np
-import matplotlib.pyplot as plt
+from cluster import approximate
+from cluster import cache
 from cluster import cluster
+from cluster import error_metrics
+from cluster import figures
+from cluster import prediction
+from cluster import profiling
+from cluster import regression
+from cluster import search
 
 from sklearn import tree
 from sklearn.svm import SVR
 from sklearn.ensemble import RandomForestRegressor
-from sklearn import cross_validation
 from sklearn.cross_validation import train_test_split
 
 
@@ -49,10 +57,20 @@ eps = [1e-3,1e-2,.02,.05,.07,.1,.12,.15,.2]
 C = [1e-6,1e-5,1e-4,1e-3,1e-2,1e-1,1.,10.,100.]
 gamma = [1e-6,1e-5,1e-4,1e-3,1e-2,1e-1,1.,10.]
 
+# Nystroem kernel approximation rank and ridge penalties
+num_nystroem = 500
+alpha = [1e-6,1e-5,1e-4,1e-3,1e-2,1e-1]
+
 # CART parameters
 min_samples_leaf = [2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20]
 max_depth = [2,3,4,5,6,7,8]
 
+# Parameter grids to search with cross-validation. The SVR grid points are
+# evaluated in the order of nested loops over epsilon, C and gamma.
+svr_grid = [('epsilon', eps), ('C', C), ('gamma', gamma)]
+tree_grid = [{'min_samples_leaf': min_samples_leaf}, {'max_depth': max_depth}]
+nystroem_grid = [('alpha', alpha), ('gamma', gamma)]
+
 # Number of PCA components
 num_components = 3
 
@@ -81,9 +99,20 @@ tally = 'Tot. XS'
 
 sample_file = h5.File('data/' + assembly + '-samples.h5', 'r')
 
+# Stream the cross-validation scores for each grid point to a file, appending
+# to the scores from previous runs
+results_file = open('data/' + assembly + '-cv-scores.json', 'a')
+
+# Reuse the cross-validation scores for grid points scored in previous runs
+results_cache = cache.ResultCache('data/results-cache.db')
+
+# Predict the target values in chunks with a pool of threads
+predictor = prediction.BatchPredictor()
+
 
 # Initialize arrays for the RMS error for this energy
 rms_SVR = np.zeros((len(energies), len(batches)))
+rms_NYS = np.zeros((len(energies), len(batches)))
 rms_CART = np.zeros((len(energies), len(batches)))
 rms_RF = np.zeros((len(energies), len(batches)))
 rms_CLSVR = np.zeros((len(energies), len(batches)))
@@ -108,194 +137,138 @@ for energy_index, energy in enumerate(energies):
         print '    {0:-<76}'.format('')
 
         # Get target regression values for each sample
-        y = sample_file[batch][energy][tally]['Targets'][...]
-        y = np.reshape(y, 2890)
+        with profiling.timer('Read samples'):
+            y = sample_file[batch][energy][tally]['Targets'][...]
+            y = np.reshape(y, 2890)
 
-        # Get the feature vectors for each sample
-        X = sample_file[batch][energy][tally]['Features'][...]
+            # Get the feature vectors for each sample
+            X = sample_file[batch][energy][tally]['Features'][...]
+            profiling.count('bytes read', X.nbytes + y.nbytes)
         
 
         ########################################################################
         ################    TRAININING/TESTING DATA SPLITTING   ################
         ########################################################################
 
-        scores = list()
-        scores_std = list()
-
         #### Split the data
         split = .33
-        training = int((1-split)*len(X))
-        testing = int(split*len(X))
-        X_train, X_test, y_train, y_test = train_test_split(X, y, \
-                                                            test_size=split, \
-                                                            random_state=10)
+        pins = error_metrics.get_pins(np.arange(len(y)))
+        X_train, X_test, y_train, y_test, pins_train, pins_test = \
+            train_test_split(X, y, pins, test_size=split, random_state=10)
 
         ########################################################################
         #####################   SVR REGRESSION W/O CLUSTERING  #################
         ########################################################################
 
-        # We will store scores, g, and c in this list
-        scores_SVR = [[] for x in range(4)]
-        scores_std_SVR = []
-                    
-        # Extract features/targets for this cluster's samples
+        # Extract features/targets for these samples
         features = X_train
         targets = y_train
 
-        # Loop over each possible parameter setting
-        for e in eps:
-            for c in C:
-                for g in gamma:
-                    
-                    # Fit an SVR model on these samples
-                    model_SVR = SVR(kernel=kernel, C=c, gamma=g)
-                    model_SVR.fit(features, targets)
-
-                    scores = cross_validation.cross_val_score(model_SVR, \
-                                                    features, \
-                                                    targets, \
-                                                    scoring='mean_squared_error')
-
-                    scores_SVR[0].append(np.mean(scores))
-                    scores_std_SVR.append(np.std(scores))
-                    scores_SVR[1].append(c)
-                    scores_SVR[2].append(g)
-                    scores_SVR[3].append(e)
-        
-        # Optimal e, c, g found from the index of the max value
-        best_c = scores_SVR[1][scores_SVR[0].index(max(scores_SVR[0]))]
-        best_gamma = scores_SVR[2][scores_SVR[0].index(max(scores_SVR[0]))]
-        best_e = scores_SVR[3][scores_SVR[0].index(max(scores_SVR[0]))]
+        # Cross-validate the parameter settings in parallel, keeping only the
+        # best third of them for each round on more samples
+        scores_SVR = search.successive_halving(SVR(kernel=kernel), svr_grid, \
+                                        features, targets, \
+                                        results_file=results_file, \
+                                        cache=results_cache, \
+                                        label=energy + '/' + batch + '/SVR')
+
+        # Optimal e, c, g found from the max mean score
+        best_params = search.get_best_params(scores_SVR)
+        best_c = best_params['C']
+        best_gamma = best_params['gamma']
+        best_e = best_params['epsilon']
         
         print ' Optimal SVR: gamma=%1.1E, C=%1.1E, epsilon=%1.1E' % \
             (best_gamma, best_c, best_e)
 
         # Retrain the model for the best parameters
         model_SVR = SVR(kernel=kernel, C=best_c, gamma=best_gamma, epsilon=best_e)
-        model_SVR.fit(features, targets)
+        with profiling.timer('Fit SVR'):
+            model_SVR.fit(features, targets)
 
         ########################################################################
-        ################################   CART    #############################
+        ######################   NYSTROEM KERNEL APPROXIMATION   ###############
         ########################################################################
 
-        scores_CART = [[] for x in range(3)]
-        scores_std_CART = []
-                    
-        # Extract features/targets for this cluster's samples
+        # Extract features/targets for these samples
         features = X_train
         targets = y_train
 
-        # Loop over each possible minimum leaves parameter setting
-        for leaf in min_samples_leaf:
-                    
-            # Fit a CART model on these samples
-            model_CART = tree.DecisionTreeRegressor(min_samples_leaf=leaf)
-            model_CART.fit(features, targets)
+        # Cross-validate each ridge penalty and kernel width setting
+        model_NYS = approximate.ApproximateKernelRidge(method='nystroem', \
+                                                    n_components=num_nystroem)
+        scores_NYS = search.grid_search(model_NYS, nystroem_grid, features, \
+                                        targets, results_file=results_file, \
+                                        cache=results_cache, \
+                                        label=energy + '/' + batch + '/NYS')
 
-            scores = cross_validation.cross_val_score(model_CART, \
-                                                   features, \
-                                                   targets, \
-                                                   scoring='mean_squared_error')
-            scores_CART[0].append(0)
-            scores_CART[1].append(leaf)
-            scores_CART[2].append(np.mean(scores))
-            scores_std_CART.append(np.std(scores))
+        best_params = search.get_best_params(scores_NYS)
 
-        # Loop over each possible minimum leaves parameter setting
-        for depth in max_depth:
+        print ' Optimal Nystroem: gamma=%1.1E, alpha=%1.1E' % \
+            (best_params['gamma'], best_params['alpha'])
 
-            # Fit a CART model on these samples
-            model_CART = tree.DecisionTreeRegressor(max_depth=depth)
-            model_CART.fit(features, targets)
+        # Retrain the model for the best parameters
+        model_NYS.set_params(**best_params)
+        with profiling.timer('Fit Nystroem'):
+            model_NYS.fit(features, targets)
 
-            scores = cross_validation.cross_val_score(model_CART, \
-                                                   features, \
-                                                   targets, \
-                                                   scoring='mean_squared_error')
-            scores_CART[0].append(1)
-            scores_CART[1].append(depth)
-            scores_CART[2].append(np.mean(scores))
-            scores_std_CART.append(np.std(scores))
-
-        max_score_index = scores_CART[2].index(max(scores_CART[2]))
-        best_param_type=scores_CART[0][max_score_index]
-        best_param = scores_CART[1][max_score_index]
+        ########################################################################
+        ################################   CART    #############################
+        ########################################################################
+
+        # Extract features/targets for these samples
+        features = X_train
+        targets = y_train
+
+        # Cross-validate each minimum leaves and maximum depth setting
+        scores_CART = search.grid_search(tree.DecisionTreeRegressor(), \
+                                         tree_grid, features, targets, \
+                                         results_file=results_file, \
+                                         cache=results_cache, \
+                                         label=energy + '/' + batch + '/CART')
+
+        best_params = search.get_best_params(scores_CART)
+        best_param_type = 0 if 'min_samples_leaf' in best_params else 1
+        best_param = best_params.get('min_samples_leaf', \
+                                     best_params.get('max_depth'))
         types = ['min samples per leaf', 'max depth']
 
         print '    Optimal CART:  type=%s    value=%0.2g' % \
             (types[best_param_type], best_param)
     
         # Retrain the model for the best parameters
-        if best_param_type == 0:
-            model_CART = tree.DecisionTreeRegressor(min_samples_leaf=best_param)
-        else:
-            model_CART = tree.DecisionTreeRegressor(max_depth=best_param)
-
-        model_CART.fit(features, targets)
+        model_CART = tree.DecisionTreeRegressor(**best_params)
+        with profiling.timer('Fit CART'):
+            model_CART.fit(features, targets)
 
         ########################################################################
         #######################   RANDOM FOREST    ###########################
         ########################################################################
 
-        scores_RF = [[] for x in range(3)]
-        scores_std_RF = list()
-                    
         # Extract features/targets for these samples
         features = X_train
         targets = y_train
 
-        # Loop over each possible parameter setting
-        for leaf in min_samples_leaf:
-                    
-            # Fit an RF model on these samples
-            model_RF = RandomForestRegressor(n_estimators=25, \
-                                             max_features=.7, \
-                                             min_samples_leaf=leaf)
-            model_RF.fit(features, targets)
-
-            this_scores = cross_validation.cross_val_score(model_RF, \
-                                                           features, \
-                                                           targets, \
-                                                           scoring='mean_squared_error')
-            scores_RF[0].append(0)
-            scores_RF[1].append(leaf)
-            scores_RF[2].append(np.mean(this_scores))
-            scores_std_RF.append(np.std(this_scores))
-
-        for depth in max_depth:
-
-            # Fit a RF model on these samples
-            model_RF = RandomForestRegressor(n_estimators=25, \
-                                             max_features=.7, \
-                                             max_depth=depth)
-            model_RF.fit(features, targets)
-
-            this_scores = cross_validation.cross_val_score(model_RF, \
-                                                           features, \
-                                                           targets, \
-                                                           scoring='mean_squared_error')
-            scores_RF[0].append(1)
-            scores_RF[1].append(depth)
-            scores_RF[2].append(np.mean(this_scores))
-            scores_std_RF.append(np.std(this_scores))
-
-        best_param_type = scores_RF[0][scores_RF[2].index(max(scores_RF[2]))]
-        best_param = scores_RF[1][scores_RF[2].index(max(scores_RF[2]))]
+        # Cross-validate each minimum leaves and maximum depth setting
+        model_RF = RandomForestRegressor(n_estimators=25, max_features=.7)
+        scores_RF = search.grid_search(model_RF, tree_grid, features, \
+                                       targets, results_file=results_file, \
+                                       cache=results_cache, \
+                                       label=energy + '/' + batch + '/RF')
+
+        best_params = search.get_best_params(scores_RF)
+        best_param_type = 0 if 'min_samples_leaf' in best_params else 1
+        best_param = best_params.get('min_samples_leaf', \
+                                     best_params.get('max_depth'))
         types = ['min samples per leaf', 'max depth']
         print ' Optimal Random Forest: type=%s value=%0.2g' % \
             (types[best_param_type], best_param)
     
         # Retrain the model for the best parameters
-        if best_param_type == 0:
-            model_RF = RandomForestRegressor(n_estimators=25, \
-                                             max_features=.7, \
-                                             min_samples_leaf=best_param)
-        else:
-            model_RF = RandomForestRegressor(n_estimators=25, \
-                                             max_features=.7, \
-                                             max_depth=best_param)
-
-        model_RF.fit(features, targets)
+        model_RF = RandomForestRegressor(n_estimators=25, max_features=.7, \
+                                         **best_params)
+        with profiling.timer('Fit Random Forest'):
+            model_RF.fit(features, targets)
                
         ########################################################################
         #############################   CLUSTERING   ###########################
@@ -331,43 +304,34 @@ for energy_index, energy in enumerate(energies):
         best_c=[0 for x in range(num_clusters)]
         best_e=[0 for x in range(num_clusters)]
         for c in range(num_clusters):
-
-            scores_CLSVR = [[] for x in range(4)]
-            scores_std_CLSVR = list()
                     
             # Extract features/targets for this cluster's samples
             features = X_train_PCA[indices[c],:]
             targets = y_train[indices[c]]
 
-            # Loop over each possible parameter setting
-            for e in eps:
-                for p in C:
-                    for g in gamma:
-                    
-                        # Fit an SVR model on this cluster's samples
-                        models_CLSVR[c] = SVR(kernel=kernel, C=p, gamma=g)
-                        models_CLSVR[c].fit(features, targets)
-
-                        scores = cross_validation.cross_val_score(models_CLSVR[c], \
-                                                    features, \
-                                                    targets, \
-                                                    scoring='mean_squared_error')
-
-                        scores_CLSVR[0].append(np.mean(scores))
-                        scores_std_CLSVR.append(np.std(scores))
-                        scores_CLSVR[1].append(p)
-                        scores_CLSVR[2].append(g)
-                        scores_CLSVR[3].append(e)
-
-            max_score_index = scores_CLSVR[0].index(max(scores_CLSVR[0]))
-            best_c[c] = scores_CLSVR[1][max_score_index]
-            best_gamma[c] = scores_CLSVR[2][max_score_index]
-            best_e[c] = scores_CLSVR[3][max_score_index]
+            # Cross-validate the parameter settings by successive halving
+            scores_CLSVR = search.successive_halving(SVR(kernel=kernel), \
+                                        svr_grid, \
+                                        features, targets, \
+                                        results_file=results_file, \
+                                        cache=results_cache, \
+                                        label=energy + '/' + batch + \
+                                              '/CLSVR-' + str(c))
+
+            best_params = search.get_best_params(scores_CLSVR)
+            best_c[c] = best_params['C']
+            best_gamma[c] = best_params['gamma']
+            best_e[c] = best_params['epsilon']
    
-            # Retrain the model for the best parameters
+            # Store an SVR model with the best parameters for this cluster
             models_CLSVR[c] = SVR(kernel=kernel, C=best_c[c], \
                                   gamma=best_gamma[c], epsilon=best_e[c])
-            models_CLSVR[c].fit(features, targets)
+
+        # Retrain the per-cluster models for the best parameters
+        model_CLSVR = regression.ClusteredRegressor( \
+                                [models_CLSVR[c] for c in range(num_clusters)], \
+                                cluster_model=cluster_model, n_jobs=-1)
+        model_CLSVR.fit(X_train, y_train)
 
         print ' Optimal Clustered SVR: gammas=' + str(best_gamma)
         print ' Optimal Clustered SVR: c=' + str(best_c)
@@ -388,19 +352,22 @@ for energy_index, energy in enumerate(energies):
 
         ##############################  TRAINING  ##############################
 
-        # Initialize an empty array for the predicted target values
-        y_train_predict_SVR = np.zeros(len(y_train))
-                    
-        # Store the predicted values for this cluster's samples
-        y_train_predict_SVR = model_SVR.predict(X_train)
+        # Predict the target values in chunks
+        y_train_predict_SVR = predictor.predict(model_SVR, X_train)
 
         ###############################  TESTING  ##############################
 
-        # Initialize an empty array for the predicted target values
-        y_test_predict_SVR = np.zeros(len(y_test))
+        # Predict the target values in chunks
+        y_test_predict_SVR = predictor.predict(model_SVR, X_test)
+
 
-        # Store the predicted values for this cluster's samples
-        y_test_predict_SVR = model_SVR.predict(X_test)
+        ########################################################################
+        ##################   NYSTROEM KERNEL APPROX. PREDICTION   ##############
+        ########################################################################
+
+        # Predict the target values for the training and test samples
+        y_train_predict_NYS = predictor.predict(model_NYS, X_train)
+        y_test_predict_NYS = predictor.predict(model_NYS, X_test)
 
 
         ########################################################################
@@ -409,19 +376,13 @@ for energy_index, energy in enumerate(energies):
 
         ###############################  TRAINING  #############################
 
-        # Initialize an empty array for the predicted target values
-        y_train_predict_CART = np.zeros(len(y_train))
-                    
-        # Store the predicted values for this cluster's samples
-        y_train_predict_CART = model_CART.predict(X_train)
+        # Predict the target values in chunks
+        y_train_predict_CART = predictor.predict(model_CART, X_train)
 
         ###############################  TESTING  ##############################
 
-        # Initialize an empty array for the predicted target values
-        y_test_predict_CART = np.zeros(len(y_test))
-
-        # Store the predicted values for this cluster's samples
-        y_test_predict_CART = model_CART.predict(X_test)
+        # Predict the target values in chunks
+        y_test_predict_CART = predictor.predict(model_CART, X_test)
           
         ##########################################################################
         ######################## RF PREDICTION   ###############################
@@ -429,19 +390,13 @@ for energy_index, energy in enumerate(energies):
 
         ##########################  TRAINING  ##########################
 
-        # Initialize an empty array for the predicted target values
-        y_train_predict_RF = np.zeros(len(y_train))
-                    
-        # Store the predicted values for this cluster's samples
-        y_train_predict_RF = model_RF.predict(X_train)
+        # Predict the target values in chunks
+        y_train_predict_RF = predictor.predict(model_RF, X_train)
 
         ###########################  TESTING  ##########################
 
-        # Initialize an empty array for the predicted target values
-        y_test_predict_RF = np.zeros(len(y_test))
-
-        # Store the predicted values for this cluster's samples
-        y_test_predict_RF = model_RF.predict(X_test)
+        # Predict the target values in chunks
+        y_test_predict_RF = predictor.predict(model_RF, X_test)
 
         ########################################################################
         #####################   SVR PREDICTION W/CLUSTERING   ##################
@@ -449,37 +404,13 @@ for energy_index, energy in enumerate(energies):
 
         ###############################  TRAINING  #############################
 
-        # Initialize an empty array for the predicted target values
-        y_train_predict_CLSVR = np.zeros(len(y_train))
-
-        # Loop over each cluster and make predictions for each 
-        # training sample
-        for c in range(num_clusters):
-
-            # Extract features for this cluster's samples
-            features = X_train_PCA[indices[c],:]
-                    
-            # Store the predicted values for this cluster's samples
-            y_train_predict_CLSVR[indices[c]]=models_CLSVR[c].predict(features)
-
-        ###############################  TRAINING  #############################
-
-        # Initialize an empty array for the predicted target values
-        y_test_predict_CLSVR = np.zeros(len(y_test))
-
-        # Get the cluster IDs for each training sample
-        #     ie, 0 - cluster 0, 1 - cluster 1, ...
-        indices = cluster_model.clusterize(X_test_PCA)
+        # Predict the target values for each training sample
+        y_train_predict_CLSVR = predictor.predict(model_CLSVR, X_train)
 
-        # Loop over each cluster and make predictions for each 
-        # training sample
-        for c in range(num_clusters):
+        ###############################  TESTING  ##############################
 
-            # Extract features for this cluster's samples
-            features = X_test_PCA[indices[c],:]
-                    
-            # Store the predicted values for this cluster's samples
-            y_test_predict_CLSVR[indices[c]]=models_CLSVR[c].predict(features)
+        # Predict the target values for each test sample
+        y_test_predict_CLSVR = predictor.predict(model_CLSVR, X_test)
 
 
 
@@ -490,51 +421,51 @@ for energy_index, energy in enumerate(energies):
         ###############################  TRAINING  #############################
 
         # Predict the target values for each training sample
-        y_train_predict_CLAVG = model_CLAVG.predict(X_train_PCA)
+        y_train_predict_CLAVG = predictor.predict(model_CLAVG, X_train_PCA)
 
         ###############################  TESTING  ##############################
 
         # Predict the target values for each test sample
-        y_test_predict_CLAVG = model_CLAVG.predict(X_test_PCA)
+        y_test_predict_CLAVG = predictor.predict(model_CLAVG, X_test_PCA)
     
 
         ########################################################################
         #######################    TRAINING/TESTING ERROR   ####################
         ########################################################################
 
-        # Compute the RMS error for the training and test samples
-        train_error_SVR = np.power(y_train_predict_SVR - y_train, 2)
-        test_error_SVR = np.power(y_test_predict_SVR - y_test, 2)
-        train_error_SVR = np.sqrt(np.mean(train_error_SVR))
-        test_error_SVR = np.sqrt(np.mean(test_error_SVR))
-        
-        # Compute the RMS error for the training and test samples
-        train_error_CART = np.power(y_train_predict_CART - y_train, 2)
-        test_error_CART = np.power(y_test_predict_CART - y_test, 2)
-        train_error_CART = np.sqrt(np.mean(train_error_CART))
-        test_error_CART = np.sqrt(np.mean(test_error_CART))
-
-        # Compute the RMS error for the training and test samples
-        train_error_RF = np.power(y_train_predict_RF - y_train, 2)
-        test_error_RF = np.power(y_test_predict_RF - y_test, 2)
-        train_error_RF = np.sqrt(np.mean(train_error_RF))
-        test_error_RF = np.sqrt(np.mean(test_error_RF))
-              
-        # Compute the RMS error for the training and test samples
-        train_error_CLSVR = np.power(y_train_predict_CLSVR - y_train, 2)
-        test_error_CLSVR = np.power(y_test_predict_CLSVR - y_test, 2)
-        train_error_CLSVR = np.sqrt(np.mean(train_error_CLSVR))
-        test_error_CLSVR = np.sqrt(np.mean(test_error_CLSVR))
-
-        # Compute the RMS error for the training and test samples
-        train_error_CLAVG = np.power(y_train_predict_CLAVG - y_train, 2)
-        test_error_CLAVG = np.power(y_test_predict_CLAVG - y_test, 2)
-        train_error_CLAVG = np.sqrt(np.mean(train_error_CLAVG))
-        test_error_CLAVG = np.sqrt(np.mean(test_error_CLAVG))
+        # Compute the RMS error for the training and test samples for all
+        # of the models at once
+        with profiling.timer('Compute errors'):
+            train_predictions = np.vstack((y_train_predict_SVR, \
+                                           y_train_predict_NYS, \
+                                           y_train_predict_CART, \
+                                           y_train_predict_RF, \
+                                           y_train_predict_CLSVR, \
+                                           y_train_predict_CLAVG))
+            test_predictions = np.vstack((y_test_predict_SVR, \
+                                          y_test_predict_NYS, \
+                                          y_test_predict_CART, \
+                                          y_test_predict_RF, \
+                                          y_test_predict_CLSVR, \
+                                          y_test_predict_CLAVG))
+
+            train_errors = error_metrics.compute_errors(train_predictions,
+                                                        y_train)
+            test_errors = error_metrics.compute_errors(test_predictions,
+                                                       y_test, pins=pins_test)
+
+            train_error_SVR, train_error_NYS, train_error_CART, \
+                train_error_RF, train_error_CLSVR, train_error_CLAVG = \
+                train_errors['rms']
+            test_error_SVR, test_error_NYS, test_error_CART, test_error_RF, \
+                test_error_CLSVR, test_error_CLAVG = test_errors['rms']
 
         # Store the RMS error for this 
         rms_SVR[energy_index][batch_index] = test_error_SVR
 
+        # Store the RMS error for this 
+        rms_NYS[energy_index][batch_index] = test_error_NYS
+
         # Store the RMS error for this 
         rms_CART[energy_index][batch_index] = test_error_CART
 
@@ -550,6 +481,8 @@ for energy_index, energy in enumerate(energies):
         # Print the results for this case to the screen
         print '    SVR: \t train err. %0.3g \t test err. %0.3g' \
                 % (train_error_SVR, test_error_SVR)
+        print '    Nystroem: \t train err. %0.3g \t test err. %0.3g' \
+                % (train_error_NYS, test_error_NYS)
         print '    CART: \t train err. %0.3g \t test err. %0.3g' \
                 % (train_error_CART, test_error_CART)
         print ' RF: \t train err. %0.3g \t test err. %0.3g' \
@@ -559,62 +492,55 @@ for energy_index, energy in enumerate(energies):
         print '    CL AVG: \t train err. %0.3g \t test err. %0.3g' \
                 % (train_error_CLAVG, test_error_CLAVG)
 
+        # Report the pin with the largest RMS test error for each model
+        names = ['SVR', 'Nystroem', 'CART', 'RF', 'CL SVR', 'CL AVG']
+        pin_errors = test_errors['pin rms']
+
+        for i, name in enumerate(names):
+            pin = np.nanargmax(pin_errors[i])
+            print '    %s: \t worst pin %d (%0.3g) \t max test err. %0.3g' \
+                % (name, pin, pin_errors[i][pin], test_errors['max'][i])
+
+    print '{0:-<80}'.format('')
+    print 'Predicted %d samples at %0.3g samples/sec' % \
+        (predictor.get_num_samples(total=True), \
+         predictor.get_throughput(total=True))
+
     count = count + 1
 
+# Close the cross-validation scores file and results cache
+results_file.close()
+results_cache.close()
+predictor.close()
+
 ################################################################################
 ###################################    PLOTS   #################################
 ################################################################################
 
-# Plot the RMS for this tally, low energy
-energy = 'Low Energy'
-
-fig = plt.figure()
-plt.semilogy(rms_ref['Batches'],rms_ref[assembly][energy][tally][...], \
-                 linewidth=2)
-plt.semilogy(batches, rms_SVR[0], linewidth=2)
-plt.semilogy(batches, rms_CART[0], linewidth=2)
-plt.semilogy(batches, rms_RF[0], linewidth=2)
-plt.semilogy(batches, rms_CLSVR[0], linewidth=2)
-plt.semilogy(batches, rms_CLAVG[0], linewidth=2)
-    
-# Annotate the plot
-plt.ylabel('RMS Error')
-plt.xlabel('Batch #')
-plt.title('Low Energy ' + tally + ' RMS Error')
-plt.grid(b=True, which='major', color='b', linestyle='-')
-plt.grid(b=True, which='minor', color='r', linestyle='--')
-plt.legend(['Monte Carlo', 'RBF-SVR', 'CART', \
-            'Random Forest', 'Clustered RBF-SVR', 'Clustered Avg.'])
-
-# Save the plot
-filename = 'low-energy-' + tally.replace('.', '').replace(' ', '-').lower()
-filename = 'process/rms-plots/' + assembly + '/' + filename + '.png'
-plt.savefig(filename, bbox_inches='tight')
-plt.show()
-
-# Plot the RMS for this tally, high energy
-energy = 'High Energy'
-
-fig = plt.figure()
-plt.semilogy(rms_ref['Batches'],rms_ref[assembly][energy][tally][...], \
-                 linewidth=2)
-plt.semilogy(batches, rms_SVR[1], linewidth=2)
-plt.semilogy(batches, rms_CART[1], linewidth=2)
-plt.semilogy(batches, rms_RF[1], linewidth=2)
-plt.semilogy(batches, rms_CLSVR[1], linewidth=2)
-plt.semilogy(batches, rms_CLAVG[1], linewidth=2)
-    
-# Annotate the plot
-plt.ylabel('RMS Error')
-plt.xlabel('Batch #')
-plt.title('High Energy ' + tally + ' RMS Error')
-plt.grid(b=True, which='major', color='b', linestyle='-')
-plt.grid(b=True, which='minor', color='r', linestyle='--')
-plt.legend(['Monte Carlo', 'RBF-SVR', 'CART', \
-            'Random Forest', 'Clustered RBF-SVR', 'Clustered Avg.'])
-
-# Save the plot
-filename = 'high-energy-' + tally.replace('.', '').replace(' ', '-').lower()
-filename = 'process/rms-plots/' + assembly + '/' + filename + '.png'
-plt.savefig(filename, bbox_inches='tight')
-plt.show()
+# Store the RMS for this tally for each energy for the plotting stage
+figure_results = figures.FigureResults()
+models = [('RBF-SVR', rms_SVR), ('Nystroem RBF', rms_NYS), ('CART', rms_CART),
+          ('Random Forest', rms_RF), ('Clustered RBF-SVR', rms_CLSVR),
+          ('Clustered Avg.', rms_CLAVG)]
+
+for energy_index, energy in enumerate(energies):
+
+    lines = [('Monte Carlo', rms_ref['Batches'][...], \
+              rms_ref[assembly][energy][tally][...])]
+
+    for name, rms in models:
+        lines.append((name, batches, rms[energy_index]))
+
+    # Store the plot
+    filename = energy.replace(' ', '-').lower() + '-' + \
+               tally.replace('.', '').replace(' ', '-').lower()
+    filename = 'process/rms-plots/' + assembly + '/' + filename + '.png'
+    figure_results.add_lines(filename, lines, \
+                             title=energy + ' ' + tally + ' RMS Error', \
+                             xlabel='Batch #', ylabel='RMS Error')
+
+rms_ref.close()
+figure_results.close()
+
+# Render the plots in parallel
+figures.render(names=figure_results.get_names())
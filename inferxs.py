@@ -0,0 +1,136 @@
+'''The command line entry point for running InferXS experiments.
+
+   Date: 10/19/2026
+
+   Usage: python inferxs.py run config.yaml [--jobs N] [--list]
+          python inferxs.py serve data/models [--model NAME]
+                                 [--assembly A] [--batch B]
+                                 [--host 127.0.0.1] [--port 8000]
+
+   The run command reads an experiment configuration (YAML if PyYAML is
+   installed, or JSON) which defines the slices of the samples files, the
+   models and parameter grids and the outputs declaratively (see
+   cluster/experiment.py for the format). The samples for each slice are read
+   once and shared by the worker processes which fit, predict and score each
+   model on each slice with the same SVR, tree, clustering and PCA code as
+   the experiment scripts. The RMS errors for each case are printed, and
+   written to the results file and the fitted models to the models directory
+   if the configuration names them. The --list option only prints the cases
+   which would be run.
+
+   The serve command loads the models saved by an experiment for one model,
+   assembly and batch once, and serves predictions of the pinwise
+   cross-sections from a statepoint or the raw 3x3 mesh tallies over HTTP,
+   batching concurrent requests (see cluster/serving.py). The p50 and p99
+   request latencies are reported at /metrics.
+'''
+
+import argparse
+import os
+import sys
+
+# The statepoint score types are in the process directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'process'))
+
+from cluster import experiment
+from cluster import profiling
+from cluster import serving
+
+
+################################################################################
+####################################  OPTIONS  #################################
+################################################################################
+
+parser = argparse.ArgumentParser(description='Run InferXS experiments ' + \
+                                 'or serve predictions.')
+subparsers = parser.add_subparsers(dest='command')
+
+run_parser = subparsers.add_parser('run', help='run an experiment from ' + \
+                                   'a YAML or JSON configuration')
+run_parser.add_argument('config', help='the experiment configuration file')
+run_parser.add_argument('--jobs', type=int, default=None, \
+                        help='number of worker processes (-1 for all ' + \
+                             'cores, the config\'s jobs by default)')
+run_parser.add_argument('--list', action='store_true', \
+                        help='only list the cases in the experiment')
+
+serve_parser = subparsers.add_parser('serve', help='serve predictions ' + \
+                                     'from the models saved by an experiment')
+serve_parser.add_argument('models', help='the directory of saved models')
+serve_parser.add_argument('--model', default=None, \
+                          help='the name of the model to serve')
+serve_parser.add_argument('--assembly', default=None, \
+                          help='the assembly to serve models for')
+serve_parser.add_argument('--batch', type=int, default=None, \
+                          help='the batch the models were fit for')
+serve_parser.add_argument('--host', default='127.0.0.1', \
+                          help='the address to listen on')
+serve_parser.add_argument('--port', type=int, default=8000, \
+                          help='the port to listen on')
+serve_parser.add_argument('--max-batch', type=int, default=64, \
+                          help='the maximum number of requests per batch')
+serve_parser.add_argument('--max-delay', type=float, default=5., \
+                          help='the time to wait for a batch to fill (ms)')
+serve_parser.add_argument('--verbose', action='store_true', \
+                          help='log each HTTP request')
+
+args = parser.parse_args()
+
+
+################################################################################
+######################################  RUN  ###################################
+################################################################################
+
+def run(args):
+    '''Runs (or lists the cases of) an experiment configuration.'''
+
+    study = experiment.Experiment(experiment.load_config(args.config))
+    cases = study.get_cases()
+
+    if args.list:
+        for name, (assembly, batch, energy, tally) in cases:
+            print '%-20s %-30s Batch-%-5d %-12s %s' % \
+                (name, assembly, batch, energy, tally)
+        print '%d cases' % len(cases)
+        return
+
+    print 'Loading %d slices' % len(study.get_slices())
+    study.load()
+
+    print 'Running %d cases' % len(cases)
+    records = study.run(n_jobs=args.jobs)
+
+    for record in records:
+        print '%-20s %-30s Batch-%-5d %-12s %-16s train err. %0.3g ' \
+            '\t test err. %0.3g%s' % \
+            (record['model'], record['assembly'], record['batch'],
+             record['energy'], record['tally'], record['train_rms'],
+             record['test_rms'], ' (cached)' if record['cached'] else '')
+
+    if study.get_output('results') is not None:
+        print 'Wrote results to ' + study.get_output('results')
+
+
+def serve(args):
+    '''Serves predictions from the saved models until interrupted.'''
+
+    models = serving.load_models(args.models, args.model, args.assembly,
+                                 args.batch)
+    service = serving.InferenceService(models, args.max_batch,
+                                       args.max_delay / 1e3)
+    info = service.get_info()
+
+    print 'Serving %s for %s Batch-%d (%s) on http://%s:%d' % \
+        (info['model'], info['assembly'], info['batch'],
+         ', '.join(info['tallies']), args.host, args.port)
+
+    serving.serve(service, args.host, args.port, args.verbose)
+    print service.get_metrics()
+
+
+if args.command == 'run':
+    with profiling.timer('Run experiment'):
+        run(args)
+elif args.command == 'serve':
+    serve(args)
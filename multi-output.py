@@ -0,0 +1,166 @@
+'''Performs multi-output regression for all tallies and energies at once.
+
+   Date: 10/19/2026
+
+   Usage: python multi-output.py
+
+   This script learns the targets for all of the tallies and both energy
+   groups for one assembly and batch with a single model. Rather than fitting
+   a separate model to the 18-dimensional feature vectors for each (energy,
+   tally), the samples are stacked side by side (see load_stacked_samples in
+   cluster/samples.py): the feature vector for each pin holds the 9 Monte
+   Carlo tally features for each (energy, tally) followed by the 9 geometry/
+   materials features shared by all of them, and the target vector for each
+   pin holds the converged tally for each (energy, tally).
+
+   This script splits the samples into training and test sets and fits the
+   following models, each of which predicts all of the targets for a pin with
+   one fit and one predict:
+
+       1) CART - a regression tree with multiple outputs
+       2) Random Forest - an ensemble of regression trees with multiple outputs
+       3) Nystroem RBF - a Nystroem kernel approximation with ridge regression
+          solved for all outputs with the same features and normal equations
+
+   For comparison, a Random Forest is also fit separately for each (energy,
+   tally) on the usual 18-dimensional feature vectors. The Root Mean Square
+   (RMS) testing error for each target and the total fitting and prediction
+   times for each model are reported to the bash.
+'''
+
+import time
+import numpy as np
+from cluster import approximate
+from cluster import error_metrics
+from cluster import profiling
+from cluster import samples
+
+from sklearn import tree
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.cross_validation import train_test_split
+
+
+
+################################################################################
+################################    DATA EXTRACTION   ##########################
+################################################################################
+
+# 3 Assembly types are available:
+#    Fuel-1.6wo-CRD
+#    Fuel-2.4wo-16BA-grid-56
+#    Fuel-3.1wo-instr-16BA-grid-17
+assembly = 'Fuel-1.6wo-CRD'
+filename = 'data/' + assembly + '-samples.h5'
+
+# Different batch means are available:
+#     10, 50, 100, 200, 300, 400, 500, 600, 700, 800, 900, 1000
+batch = 'Batch-1000'
+
+energies = ['Low Energy', 'High Energy']
+tallies = ['Tot. XS', 'Abs. XS', 'Fiss. XS', 'NuFiss. XS']
+
+# Get the stacked feature and target vectors for each sample
+with profiling.timer('Read samples'):
+    features, targets, outputs = samples.load_stacked_samples(filename, batch, \
+                                                              energies, tallies)
+    profiling.count('bytes read', features.nbytes + targets.nbytes)
+
+
+
+################################################################################
+#####################    TRAININING/TESTING DATA SPLITTING   ###################
+################################################################################
+
+split = .33
+
+#### Split the data
+X_train, X_test, y_train, y_test = train_test_split(features, targets, \
+                                                    test_size=split, \
+                                                    random_state=10)
+
+
+
+################################################################################
+##########################    MULTI-OUTPUT REGRESSION   ########################
+################################################################################
+
+models = [('CART', tree.DecisionTreeRegressor(min_samples_leaf=5)),
+          ('Random Forest', RandomForestRegressor(n_estimators=25, \
+                                                  max_features=.7)),
+          ('Nystroem RBF', approximate.ApproximateKernelRidge( \
+                                method='nystroem', n_components=500, \
+                                gamma=0.1))]
+
+errors = {}
+times = {}
+
+for name, model in models:
+
+    start = time.time()
+
+    with profiling.timer('Fit ' + name):
+        model.fit(X_train, y_train)
+        profiling.count('samples', len(y_train))
+
+    with profiling.timer('Predict ' + name):
+        y_test_predict = model.predict(X_test)
+        profiling.count('samples', len(y_test))
+
+    times[name] = time.time() - start
+
+    # The RMS testing error for each (energy, tally), with the outputs as rows
+    errors[name] = error_metrics.get_rms(y_test_predict.T, y_test.T)
+
+
+
+################################################################################
+#########################    SINGLE-OUTPUT REGRESSION   ########################
+################################################################################
+
+# Fit a Random Forest separately for each (energy, tally) for comparison
+name = 'Random Forest (per tally)'
+errors[name] = np.zeros(len(outputs))
+times[name] = 0.
+
+for i, (energy, tally) in enumerate(outputs):
+
+    # The usual 18-dimensional feature vectors for this (energy, tally)
+    X_single = np.hstack((features[:,9*i:9*(i+1)], features[:,-9:]))
+
+    X_train_single, X_test_single, y_train_single, y_test_single = \
+        train_test_split(X_single, targets[:,i], test_size=split, \
+                         random_state=10)
+
+    start = time.time()
+    model = RandomForestRegressor(n_estimators=25, max_features=.7)
+
+    with profiling.timer('Fit ' + name):
+        model.fit(X_train_single, y_train_single)
+        profiling.count('samples', len(y_train_single))
+
+    with profiling.timer('Predict ' + name):
+        y_test_predict = model.predict(X_test_single)
+        profiling.count('samples', len(y_test_single))
+
+    times[name] += time.time() - start
+
+    errors[name][i] = error_metrics.get_rms(y_test_predict, y_test_single)
+
+models.append((name, None))
+
+
+
+################################################################################
+###############################  REPORT RESULTS  ###############################
+################################################################################
+
+print 'TESTING ERROR EVALUATION'
+print assembly + ' ' + batch
+print ' '
+
+for name, model in models:
+
+    print '%s: fit/predict time %0.3f sec' % (name, times[name])
+
+    for i, (energy, tally) in enumerate(outputs):
+        print '    %s %s testing error is %f' % (energy, tally, errors[name][i])
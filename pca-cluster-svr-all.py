@@ -3,7 +3,10 @@
    Author: William Boyd
    Date: 11/11/2013
 
-   Usage: python pca-cluster-svr-all.py
+   Usage: python pca-cluster-svr-all.py [--assemblies A [A ...]]
+                                        [--tallies T [T ...]]
+                                        [--energies E [E ...]]
+                                        [--batches B [B ...]] [--jobs N]
 
    This script is an extension of cluster-svr.py to include PCA dimensionality
    reduction prior to clustering. The data is stored as 18-dimensional feature
@@ -22,16 +25,36 @@
 
    The script then predicts the target value (tally value after 1000 batches)
    for each training and test sample and compares it to the reference target
-   value to compute the Root Mean Square (RMS) errors for training and 
-   testing data. The plots of the RMS errors are overlaid with the Monte Carlo 
+   value to compute the Root Mean Square (RMS) errors for training and
+   testing data. The plots of the RMS errors are overlaid with the Monte Carlo
    RMS errors in data/targets-batch-rms.h5 and are saved to process/rms-plots/.
+
+   The fitted model and RMS errors for each case are stored in the results
+   cache in data/results-cache.db, such that a re-run only fits the models
+   for cases whose samples or parameters have changed.
+
+   Each (assembly, tally, energy, batch) case is expanded into a chain of
+   load, fit, predict and score tasks which are run on a pool of --jobs
+   worker processes (all cores by default) by the cluster.scheduler module.
+   Each worker opens the samples files once and the loaded samples for a case
+   are shared by its fit, predict and score tasks. Once all of the cases have
+   been scored, the RMS errors for each plot are stored in the figure results
+   file and the plots are rendered in parallel (see cluster/figures.py). The
+   command line options select a subset of the assemblies, tallies, energies
+   and batches to run. The time spent by the load, fit, predict and score
+   tasks is summed over the workers in the timing tree (see
+   cluster/profiling.py).
 '''
 
-import math
+import argparse
 import h5py as h5
 import numpy as np
-import matplotlib.pyplot as plt
-from cluster import cluster
+from cluster import cache
+from cluster import error_metrics
+from cluster import figures
+from cluster import profiling
+from cluster import regression
+from cluster import scheduler
 
 from sklearn.svm import SVR
 from sklearn.cross_validation import train_test_split
@@ -52,6 +75,10 @@ kernel = 'rbf'
 C = 1e3
 gamma = 0.1
 
+# Fraction of samples used for testing and the seed for the split
+split = .33
+seed = 10
+
 
 ################################################################################
 #################################   DATA EXTRACTION  ###########################
@@ -66,8 +93,144 @@ batches = [10,50,100,200,300,400,500,600,700,800,900,1000]
 energies = ['Low Energy', 'High Energy']
 tallies = ['Tot. XS', 'Abs. XS', 'Fiss. XS', 'NuFiss. XS']
 
-# Open a handle to the HDF5 file with the Monte Carlo RMS errors for each batch
-rms_ref = h5.File('data/target-batch-rms.h5', 'r')
+# Select the subset of the sweep to run from the command line
+parser = argparse.ArgumentParser(description='PCA, clustering and SVR ' + \
+                                             'regression for all datasets')
+parser.add_argument('--assemblies', nargs='+', default=assemblies, \
+                    choices=assemblies)
+parser.add_argument('--tallies', nargs='+', default=tallies, choices=tallies)
+parser.add_argument('--energies', nargs='+', default=energies, \
+                    choices=energies)
+parser.add_argument('--batches', nargs='+', type=int, default=batches, \
+                    choices=batches)
+parser.add_argument('--jobs', type=int, default=-1, \
+                    help='number of worker processes (-1 for all cores)')
+args = parser.parse_args()
+
+# Keep the selected values in the order of the full sweep
+assemblies = [assembly for assembly in assemblies \
+              if assembly in args.assemblies]
+tallies = [tally for tally in tallies if tally in args.tallies]
+energies = [energy for energy in energies if energy in args.energies]
+batches = [batch for batch in batches if batch in args.batches]
+
+
+
+################################################################################
+#################################   SWEEP TASKS   ##############################
+################################################################################
+
+# The samples files and results cache opened by this process
+sample_files = {}
+results_cache = []
+
+
+def get_sample_file(assembly):
+    '''Returns this process' file handle for an assembly's samples file.'''
+
+    if assembly not in sample_files:
+        sample_files[assembly] = h5.File('data/' + assembly + '-samples.h5', \
+                                         'r')
+
+    return sample_files[assembly]
+
+
+def get_results_cache():
+    '''Returns this process' handle to the cache of fitted models.'''
+
+    if len(results_cache) == 0:
+        results_cache.append(cache.ResultCache('data/results-cache.db'))
+
+    return results_cache[0]
+
+
+def load(assembly, tally, energy, batch):
+    '''Loads and splits the samples for one case.
+
+       Returns a dictionary with the training/test samples, the results cache
+       key for the case and the cached RMS errors (None if not cached).
+    '''
+
+    sample_file = get_sample_file(assembly)
+    batch = 'Batch-' + str(batch)
+
+    # Get target regression values for each sample
+    y = sample_file[batch][energy][tally]['Targets'][...]
+    y = np.reshape(y, 2890)
+
+    # Get the feature vectors for each sample
+    X = sample_file[batch][energy][tally]['Features'][...]
+    profiling.count('bytes read', X.nbytes + y.nbytes)
+
+    # Split the data
+    X_train, X_test, y_train, y_test = train_test_split(X, y, \
+                                                        test_size=split, \
+                                                        random_state=seed)
+
+    # Look up the results for this case from a previous run
+    params = cache.get_params(SVR(kernel=kernel, C=C, gamma=gamma))
+    params.update({'model': 'ClusteredRegressor', \
+                   'num_clusters': num_clusters, \
+                   'num_components': num_components})
+    key = cache.get_key(X, y, params, seed=seed, split=split)
+    cached = get_results_cache().get(key)
+
+    data = {'X_train': X_train, 'X_test': X_test, \
+            'y_train': y_train, 'y_test': y_test, 'key': key, 'rms': None}
+
+    if cached is not None:
+        data['rms'] = cached['rms']
+
+    return data
+
+
+def fit(data):
+    '''Fits the clustered SVR model for one case (unless it is cached).'''
+
+    if data['rms'] is not None:
+        return None
+
+    # Build a cluster model using PCA transformation and KMeans
+    # and fit an SVR model on the samples within each cluster
+    # NOTE: This means that SVR is being performed in the lower
+    #       dimensional space spanned by the SVD singular vectors
+    svr = SVR(kernel=kernel, C=C, gamma=gamma)
+    model = regression.ClusteredRegressor(svr, num_clusters=num_clusters, \
+                                          num_components=num_components)
+    model.fit(data['X_train'], data['y_train'])
+
+    return model
+
+
+def predict(data, model):
+    '''Predicts the target values for the training and test samples.'''
+
+    if model is None:
+        return None
+
+    return model.predict(data['X_train']), model.predict(data['X_test'])
+
+
+def score(data, model, predictions):
+    '''Returns the training and test RMS errors for one case.
+
+       The fitted model and RMS errors are stored in the results cache.
+    '''
+
+    if predictions is None:
+        return data['rms']['train'], data['rms']['test']
+
+    # Compute the RMS error for the training and test samples
+    y_train_predict, y_test_predict = predictions
+    train_error = error_metrics.get_rms(y_train_predict, data['y_train'])
+    test_error = error_metrics.get_rms(y_test_predict, data['y_test'])
+
+    # Store the model and RMS errors for future runs
+    get_results_cache().put(data['key'], model=model, \
+                            rms={'train': float(train_error), \
+                                 'test': float(test_error)})
+
+    return train_error, test_error
 
 
 
@@ -75,175 +238,98 @@ rms_ref = h5.File('data/target-batch-rms.h5', 'r')
 ############################   MODEL FITTING/PREDICTION  #######################
 ################################################################################
 
+# Expand the sweep into a chain of tasks for each case
+graph = scheduler.TaskGraph()
+
+for assembly in assemblies:
+    for tally in tallies:
+        for energy in energies:
+            for batch in batches:
+                case = (assembly, tally, energy, batch)
+
+                graph.add_task(('load',) + case, load, case)
+                graph.add_task(('fit',) + case, fit, \
+                               dependencies=[('load',) + case])
+                graph.add_task(('predict',) + case, predict, \
+                               dependencies=[('load',) + case, \
+                                             ('fit',) + case])
+                graph.add_task(('score',) + case, score, \
+                               dependencies=[('load',) + case, \
+                                             ('fit',) + case, \
+                                             ('predict',) + case], keep=True)
+
+# The stages timed by each task are merged under this stage
+with profiling.timer('Run tasks'):
+    errors = graph.run(n_jobs=args.jobs)
+
+# Close this process' results cache (if it ran any tasks)
+for handle in results_cache:
+    handle.close()
+
+
+
+################################################################################
+#################################   RESULTS/PLOTS  #############################
+################################################################################
+
+# Open a handle to the HDF5 file with the Monte Carlo RMS errors for each batch
+rms_ref = h5.File('data/target-batch-rms.h5', 'r')
+ref_batches = rms_ref['Batches'][...]
+
+# The RMS errors for each plot are stored for the plotting stage
+figure_results = figures.FigureResults()
+
 # Iterate over each assembly type
 for assembly in assemblies:
 
     print assembly
 
-    # Open the HDF5 file for access to this assembly's Monte Carlo sample data
-    sample_file = h5.File('data/' + assembly + '-samples.h5', 'r')
-
     # Loop over each tally type
     for tally in tallies:
 
         print '  ' + tally
 
-        # Initialize a Matplotlib figure for the RMS error vs. batches
-        fig = plt.figure()
+        # The curves of RMS error vs. batches for this figure
+        lines = []
 
         # Iterate over energies (Low, High)
         for energy in energies:
 
             print '    ' + energy
 
-            # Plot the RMS error from Monte Carlo for this tally/energy
-            plt.semilogy(rms_ref['Batches'], 
-                         rms_ref[assembly][energy][tally][...], linewidth=2)
+            # The RMS error from Monte Carlo for this tally/energy
+            lines.append((energy + ' - Actual', ref_batches,
+                          rms_ref[assembly][energy][tally][...]))
 
             # Initialize an array for the SVR RMS error for this tally/energy
             rms = np.zeros(len(batches))
 
             # Iterate over batches
-            for index in enumerate(batches):
-    
-                # Construct the batch identifier for the HDF5 dataset
-                batch = 'Batch-' + str(index[1])
-
-                # Get target regression values for each sample
-                y = sample_file[batch][energy][tally]['Targets'][...]
-                y = np.reshape(y, 2890)
-
-                # Get the feature vectors for each sample
-                X = sample_file[batch][energy][tally]['Features'][...]
-
-
-                ################################################################
-                ############    TRAININING/TESTING DATA SPLITTING   ############
-                ################################################################
-
-                #### Split the data
-                split = .33
-                training = int((1-split)*len(X))
-                testing = int(split*len(X))
-                X_train, X_test, y_train, y_test = train_test_split(X, y, \
-                                                            test_size=split, \
-                                                            random_state=10)
-
- 
-                ################################################################
-                #########################    CLUSTERING   ######################
-                ################################################################
-
-                # Build a cluster model using PCA transformation and KMeans
-                cluster_model = cluster.Cluster(X_train)
-                cluster_model.build_pca_model(num_components=num_components)
-                cluster_model.build_clusters(method='kmeans', 
-                                             num_clusters=num_clusters)
-
-                # Apply PCA feature space transformation to the input features
-                # NOTE: This means that SVR is being performed in the lower
-                #       dimensional space spanned by the SVD singular vectors
-                X_test = cluster_model.apply_pca_model(X_test)
-                X_train = cluster_model.apply_pca_model(X_train)
-
-
-                ################################################################
-                #######################    SVR REGRESSION   ####################
-                ################################################################
-
-                # Initialize an empty dictionary to contain SVR models
-                # for each cluster, indexed by cluster ID
-                models = {}
-
-                # Get the cluster IDs for each training sample
-                #     ie, 0 - cluster 0, 1 - cluster 1, ...
-                indices = cluster_model.clusterize(X_train)
-
-                # Loop over each cluster and train a model for it's samples
-                for c in range(num_clusters):
-                    
-                    # Extract features/targets for this cluster's samples
-                    features = X_train[indices[c],:]
-                    targets = y_train[indices[c]]
-                    
-                    # Fit an SVR model on this cluster's samples
-                    models[c] = SVR(kernel=kernel, C=C, gamma=gamma)
-                    models[c].fit(features, targets)
-
-
-                ################################################################
-                ###################    CLUSTER/SVR PREDICTION   ################
-                ################################################################
-
-                ##########################  TRAINING  ##########################
-
-                # Initialize an empty array for the predicted target values
-                y_train_predict = np.zeros(len(y_train))
-
-                # Loop over each cluster and make predictions for each 
-                # training sample
-                for c in range(num_clusters):
-
-                    # Extract features for this cluster's samples
-                    features = X_train[indices[c],:]
-                    
-                    # Store the predicted values for this cluster's samples
-                    y_train_predict[indices[c]] = models[c].predict(features)
-
-
-                ###########################  TESTING  ##########################
-                
-                # Get the cluster IDs for each test sample
-                #     ie, 0 - cluster 0, 1 - cluster 1, ...
-                indices = cluster_model.clusterize(X_test)
-
-                # Initialize an empty array for the predicted target values
-                y_test_predict = np.zeros(len(y_test))
-
-                # Loop over each cluster and make predictions for each 
-                # test sample
-                for c in range(num_clusters):
-
-                    # Extract features for this cluster's samples
-                    features = X_test[indices[c]]
-
-                    # Store the predicted values for this cluster's samples
-                    y_test_predict[indices[c]] = models[c].predict(features)
-    
-
-                ################################################################
-                ##################    TRAINING/TESTING ERROR   #################
-                ################################################################
-
-                # Compute the RMS error for the training and test samples
-                train_error = np.power(y_train_predict - y_train, 2)
-                test_error = np.power(y_test_predict - y_test, 2)
-                train_error = np.sqrt(np.mean(train_error))
-                test_error = np.sqrt(np.mean(test_error))
-
-                # Store the RMS error for this 
-                rms[index[0]] = test_error
-                
-                # Print the results for this case to the screen
-                print '        Batch %d \t train err. %.3g \t test err. %0.3g' \
-                        % (index[1] , train_error, test_error)
+            for index, batch in enumerate(batches):
+
+                train_error, test_error = \
+                    errors[('score', assembly, tally, energy, batch)]
 
-            # Plot the SVR RMS for this tally, energy
-            plt.semilogy(batches, rms, linewidth=2)
+                # Store the RMS error for this
+                rms[index] = test_error
 
-        # Annotate the plot
-        plt.ylabel('Root Mean Squared Error')
-        plt.xlabel('Batch #')
-        plt.title(assembly + ' ' + tally + ' RMS')
-        plt.legend(energies)
-        plt.grid(b=True, which='major', color='b', linestyle='-')
-        plt.grid(b=True, which='minor', color='r', linestyle='--')
-        plt.legend(['Low Energy - Actual', 'Low Energy - RBF', 
-                   'High Energy - Actual', 'High Energy - RBF'])
+                # Print the results for this case to the screen
+                print '        Batch %d \t train err. %.3g \t test err. %0.3g' \
+                        % (batch, train_error, test_error)
 
-        
+            # The SVR RMS for this tally, energy
+            lines.append((energy + ' - RBF', batches, rms))
 
-        # Save the plot
+        # Store the plot
         filename = tally.replace('.', '').replace(' ', '-').lower()
         filename = 'process/rms-plots/' + assembly + '/' + filename + '.png'
-        plt.savefig(filename)
+        figure_results.add_lines(filename, lines, \
+                                 title=assembly + ' ' + tally + ' RMS', \
+                                 xlabel='Batch #', \
+                                 ylabel='Root Mean Squared Error')
+
+rms_ref.close()
+figure_results.close()
+
+# Render the plots in parallel once all of the results are stored
+figures.render(names=figure_results.get_names(), n_jobs=args.jobs)
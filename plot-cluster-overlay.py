@@ -12,15 +12,20 @@
        4) 1-dimensional target values
  
    The script then generates 2D plots of fuel assemblies with each pin color 
-   coded by the cluster within which it resides. The plots are all located in
-   the cluster/overlay-plots directory.
+   coded by the cluster within which it resides. The cluster IDs for all of
+   the pins of all of the random number seeds are predicted at once (see
+   Cluster.get_overlays), and each plot shows a grid of maps with one map per
+   seed. A summary plot for each scheme shows the map for the first seed for
+   each number of clusters. The overlays are stored in the figure results file
+   and the plots are rendered in parallel once all of the clustering is done
+   (see cluster/figures.py). The plots are all located in the
+   cluster/overlay-plots directory.
 '''
 
-import math
 import h5py as h5
 import numpy as np
-import matplotlib.pyplot as plt
 from cluster import cluster
+from cluster import figures
 
 
 ################################################################################
@@ -57,136 +62,71 @@ energy = 'Low Energy'
 #    Tot. XS, Abs. XS, Fiss. XS, NuFiss. XS
 tally = 'Tot. XS'
 
-# Initialize an empty array of zeros for 2D plots
-overlay = np.zeros((17,17))
-
-
-# Loop over all cluster models
-for clusters in num_clusters:
-
-    print '%d Clusters...' % (clusters)
-
-    #############################################################################
-    ##############################   PCA CLUSTERING   ###########################
-    #############################################################################
+# Read in the feature vectors and targets for all samples
+features = sample_file[batch][energy][tally]['Features'][...]
+targets = sample_file[batch][energy][tally]['Targets'][...]
 
-    # Read in the feature vectors for all samples
-    features = sample_file[batch][energy][tally]['Features'][...]
-
-    # Build a cluster model using PCA transformation and KMeans
-    cluster_model = cluster.Cluster(features)
-    cluster_model.build_pca_model(num_components = num_components)
-    cluster_model.build_clusters(method='kmeans', num_clusters = clusters)
+# The samples for each random number seed are consecutive 17x17 assemblies
+num_pins = cluster.LATTICE_SHAPE[0] * cluster.LATTICE_SHAPE[1]
+num_seeds = features.shape[0] // num_pins
+seed_titles = ['Seed ' + str(seed+1) for seed in range(num_seeds)]
 
-    # Project feature vectors into PCA basis
-    features = cluster_model.apply_pca_model(features)
-
-    # Get a dictionary of sample indices for each cluster
-    cluster_indices = cluster_model.clusterize(features[0:289])
-
-    # Predict the cluster for each of the first 289 samples representing 
-    # tallies from a single OpenMC simulation with a particular random
-    # number seed
-    for i in range(17):
-        for j in range(17):
-            overlay[i,j]=cluster_model.predict_cluster_index(features[i*17+j])
-
-    # Create a 2D plot for this cluster
-    fig = plt.figure()
-    plt.imshow(overlay, interpolation='nearest')
-    plt.title(str(clusters) + ' Clusters from PCA Features')
-    plt.savefig('cluster/overlay-plots/pca-features/' + str(clusters) + \
-                    '-clusters' + '.png', bbox_inches='tight')
-
-
-    #############################################################################
-    ###########################   GEOMETRY CLUSTERING   #########################
-    #############################################################################
-
-    # Read in the feature vectors for all samples
-    features = sample_file[batch][energy][tally]['Features'][...]
-    features = features[:,9:18]
-
-    # Build a cluster model using only geometry/materials features and KMeans
-    cluster_model = cluster.Cluster(features)
-    cluster_model.build_clusters(method='kmeans', num_clusters = clusters)
-    
-    # Get a dictionary of sample indices for each cluster
-    cluster_indices = cluster_model.clusterize(features[0:289])
-
-    # Predict the cluster for each of the first 289 samples representing 
-    # tallies from a single OpenMC simulation with a particular random
-    # number seed
-    for i in range(17):
-        for j in range(17):
-            overlay[i,j]=cluster_model.predict_cluster_index(features[i*17+j])
-
-    # Get a dictionary of sample indices for each cluster
-    fig = plt.figure()
-    plt.imshow(overlay, interpolation='nearest')
-    plt.title(str(clusters) + ' Clusters from Geometry Features')
-    plt.savefig('cluster/overlay-plots/geometry-features/' + str(clusters) + \
-                    '-clusters' + '.png', bbox_inches='tight')
-
-
-    #############################################################################
-    ########################   3X3 TALLY MESH CLUSTERING   ######################
-    #############################################################################
-
-    # Read in the feature vectors for all samples
-    features = sample_file[batch][energy][tally]['Features'][...]
-    features = features[:,0:9]
-
-    # Build a cluster model using only the 3x3 tally mesh features and KMeans
-    cluster_model = cluster.Cluster(features)
-    cluster_model.build_pca_model(num_components = num_components)
-    cluster_model.build_clusters(method='kmeans', num_clusters=clusters)
-
-    # Project feature vectors into PCA basis
-    features = cluster_model.apply_pca_model(features)
-    
-    # Get a dictionary of sample indices for each cluster
-    cluster_indices = cluster_model.clusterize(features[0:289])
-
-    # Predict the cluster for each of the first 289 samples representing 
-    # tallies from a single OpenMC simulation with a particular random
-    # number seed
-    for i in range(17):
-        for j in range(17):
-            overlay[i,j]=cluster_model.predict_cluster_index(features[i*17+j])
-
-    # Get a dictionary of sample indices for each cluster
-    fig = plt.figure()
-    plt.imshow(overlay, interpolation='nearest')
-    plt.title(str(clusters) + ' Clusters from Tally Mesh Features')
-    plt.savefig('cluster/overlay-plots/pca-3x3-mesh-features/' + \
-                    str(clusters) + '-clusters' + '.png', bbox_inches='tight')
-
-
-    #############################################################################
-    ###########################   TARGETS CLUSTERING   ##########################
-    #############################################################################
-
-    # Read in the feature vectors for all samples
-    targets = sample_file[batch][energy][tally]['Targets'][...]
-
-    # Build a cluster model using only the 3x3 tally mesh features and KMeans
-    cluster_model = cluster.Cluster(targets)
-    cluster_model.build_clusters(method='kmeans', num_clusters=clusters)
-
-    # Get a dictionary of sample indices for each cluster
-    cluster_indices = cluster_model.clusterize(targets[0:289])
-
-    # Predict the cluster for each of the first 289 samples representing 
-    # tallies from a single OpenMC simulation with a particular random
-    # number seed
-    for i in range(17):
-        for j in range(17):
-            overlay[i,j]=cluster_model.predict_cluster_index(targets[i*17+j])
-
-    # Get a dictionary of sample indices for each cluster
-    fig = plt.figure()
-    plt.imshow(overlay, interpolation='nearest')
-    plt.title(str(clusters) + ' Clusters from Target Values')
-    plt.savefig('cluster/overlay-plots/targets/' + \
-                    str(clusters) + '-clusters' + '.png', bbox_inches='tight')
+# The feature vectors, whether to use PCA and the plots directory for each
+# clustering scheme
+schemes = [('PCA Features', features, True, 'pca-features'),
+           ('Geometry Features', features[:,9:18], False,
+            'geometry-features'),
+           ('Tally Mesh Features', features[:,0:9], True,
+            'pca-3x3-mesh-features'),
+           ('Target Values', targets, False, 'targets')]
+
+
+################################################################################
+##################################    CLUSTERING   #############################
+################################################################################
+
+# Store the overlays for each plot for the plotting stage
+figure_results = figures.FigureResults()
+
+# Loop over all clustering schemes
+for name, X, use_pca, directory in schemes:
+
+    directory = 'cluster/overlay-plots/' + directory + '/'
+
+    # The first seed's overlay for each number of clusters
+    overlays = []
+
+    # Loop over all cluster models
+    for clusters in num_clusters:
+
+        print '%d Clusters from %s...' % (clusters, name)
+
+        # Build a cluster model using (optionally) a PCA transformation
+        # and KMeans
+        cluster_model = cluster.Cluster(X)
+
+        if use_pca:
+            cluster_model.build_pca_model(num_components = num_components)
+
+        cluster_model.build_clusters(method='kmeans', num_clusters = clusters)
+
+        # Predict the cluster for every pin of every seed in one call
+        seed_overlays = cluster_model.get_overlays(X)
+        overlays.append(seed_overlays[0])
+
+        # Store a grid of 2D plots of this cluster model for each seed
+        title = str(clusters) + ' Clusters from ' + name
+        figure_results.add_overlays(directory + str(clusters) + '-clusters' + \
+                                    '.png', seed_overlays, seed_titles, title,
+                                    num_clusters=clusters)
+
+    # Store a grid of 2D plots for the first seed for each cluster model
+    titles = [str(clusters) + ' Clusters' for clusters in num_clusters]
+    figure_results.add_overlays(directory + 'all-clusters.png', overlays,
+                                titles, 'Clusters from ' + name,
+                                num_clusters=max(num_clusters))
+
+figure_results.close()
+
+# Render all of the plots in parallel
+figures.render(names=figure_results.get_names())
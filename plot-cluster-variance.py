@@ -9,14 +9,16 @@
    tally, energy, batch) using PCA and KMeans. A histogram of the sample
    target values within each cluster is then generated and stored to the
    /cluster/histograms directory. The variance and mean for each cluster is 
-   computed and reported to the bash and to each plot.
+   computed and reported to the bash and to each plot. The histograms are
+   stored in the figure results file and rendered in parallel (see
+   cluster/figures.py).
 '''
 
 import math
 import h5py as h5
 import numpy as np
-import matplotlib.pyplot as plt
 from cluster import cluster
+from cluster import figures
 
 
 ################################################################################
@@ -74,6 +76,9 @@ print '{0:-<80}'.format('')
 print 'Cluster       # Samples           Mean                 Std. Dev.'
 print '{0:-<80}'.format('')
 
+# Store each cluster's histogram for the plotting stage
+figure_results = figures.FigureResults()
+
 for c in range(num_clusters):
 
     cluster_targets = targets[cluster_indices[c]]
@@ -83,15 +88,15 @@ for c in range(num_clusters):
     
     print '%d\t\t%d\t\t%f\t\t%f' % (c, num_samples, mean, std_dev)
     
-    fig = plt.figure()
-    n, bins, patches = plt.hist(cluster_targets, 8, color='green', \
-                                histtype='bar', hatch='//', edgecolor='black')
-
-    # Annotate the plot and save it to /cluster/histograms
-    plt.xlabel('Tot. XS')
-    plt.ylabel('Sample Counts')
-    plt.title('Cluster-' + str(c) + ' Histogram')
-    plt.figtext(0.55, 0.8, 'Mean = %0.3f\nStd. Dev. = %1.3e' % \
-                    (mean, std_dev), {'weight':'bold', 'size':14})
-    plt.savefig('cluster/histograms/' + str(c) + '-clusters.png',
-                    bbox_inches='tight')
+    # Annotate the plot and store it for /cluster/histograms
+    figure_results.add_histogram('cluster/histograms/' + str(c) + \
+                                 '-clusters.png', cluster_targets, bins=8, \
+                                 title='Cluster-' + str(c) + ' Histogram', \
+                                 xlabel='Tot. XS', ylabel='Sample Counts', \
+                                 text='Mean = %0.3f\nStd. Dev. = %1.3e' % \
+                                      (mean, std_dev))
+
+figure_results.close()
+
+# Render the histograms in parallel
+figures.render(names=figure_results.get_names())
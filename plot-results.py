@@ -0,0 +1,47 @@
+'''Renders the figures stored in an intermediate figure results file.
+
+   Date: 10/19/2026
+
+   Usage: python plot-results.py [--results data/figure-results.h5]
+                                 [--match rms-plots] [--jobs -1]
+
+   The pca-cluster-svr-all.py, cross-validate-models.py,
+   plot-cluster-variance.py and plot-cluster-overlay.py scripts store the
+   data for each of their figures (ie, the RMS errors for each batch, the
+   target values within each cluster or the cluster ID for each pin) in the
+   figure results file (see cluster/figures.py). This script re-renders the
+   figures from the results file in a pool of worker processes without
+   recomputing any results, ie, after changing the plotting code. Only the
+   figures whose output filenames contain one of the --match strings are
+   rendered, if any are given.
+'''
+
+import argparse
+import time
+from cluster import figures
+
+
+parser = argparse.ArgumentParser(description='Render the figures stored ' + \
+                                             'in a figure results file')
+parser.add_argument('--results', default=figures.RESULTS_FILE, \
+                    help='the figure results file')
+parser.add_argument('--match', nargs='+', default=None, \
+                    help='only render figures with one of these substrings')
+parser.add_argument('--jobs', type=int, default=-1, \
+                    help='number of worker processes (-1 for all cores)')
+args = parser.parse_args()
+
+
+names = figures.get_figure_names(args.results)
+
+if args.match is not None:
+    names = [name for name in names \
+             if any([match in name for match in args.match])]
+
+start = time.time()
+saved = figures.render(args.results, names, n_jobs=args.jobs)
+
+for name in saved:
+    print 'Saved ' + name
+
+print 'Rendered %d figures in %0.2f sec' % (len(saved), time.time() - start)
@@ -3,7 +3,7 @@
    Author: William Boyd
    Date: 11/5/2013
 
-   Usage: python samples.py
+   Usage: python samples.py [--max-rss 2048]
 
    NOTE: This file must be run after first running "features.py" and 
    targets.py". This file can only be run on nsecluster.mit.edu where all
@@ -23,67 +23,78 @@
 
    This data extraction and reorganization is performed for 3 different fuel 
    assembly types. The assemblies are taken from the BEAVRS benchmark. 
+
+   The samples for each batch, energy and dataset are built for a chunk of
+   random number seeds at once in a preallocated buffer. If the --max-rss
+   option is given (in MB), the number of seeds in each chunk is sized to fit
+   within the memory budget (see cluster/profiling.py), and the peak memory
+   usage per stage is printed if the budget would be exceeded.
 '''
 
+import argparse
 import h5py as h5
 import numpy as np
 import os
+import sys
 
+sys.path.insert(0, '..')
+from cluster import profiling
 
-def exportSamples(samples, mc_features, geom_features, targets, energy, dataset):
 
-    mc_features = mc_features[energy][dataset][...]
-    targets = targets[energy][dataset][...]
+parser = argparse.ArgumentParser(description='Export the samples file ' + \
+                                 'for each assembly.')
+parser.add_argument('--max-rss', type=float, default=None,
+                    help='The maximum resident set size in MB')
+args = parser.parse_args()
 
-    # Initialize an array for all of the feature vectors (stored as rows)
-    # for each sample - indexed first by sample, then feature
-    new_features = np.zeros((17*17, 18))
-    new_targets = np.zeros((17*17,1))
+budget = profiling.MemoryBudget(args.max_rss)
 
-    # Initialie the sample counter
-    sample_cnt = 0
 
-    for x in range(target_mesh_x):
-        for y in range(target_mesh_y):
+@profiling.timed('Export samples')
+def exportSamples(samples, mc_feature_group, buffers, targets, energy,
+                  dataset):
 
-            mask = [(x*3,y*3), (x*3+1,y*3), (x*3+2,y*3), \
-                        (x*3,y*3+1), (x*3+1,y*3+1), (x*3+2,y*3+1), \
-                        (x*3,y*3+2), (x*3+1,y*3+2), (x*3+2,y*3+2)]
+    new_features, new_targets = buffers
 
-            # Populate the feature vector for this sample
-            for i in enumerate(mask):
-                new_features[sample_cnt, i[0]] = mc_features[i[1][0], i[1][1]]
-            
-            # Append geometry/materials features to the feature vector
-            new_features[sample_cnt, 9:] = geom_features[sample_cnt,:]
+    num_samples = target_mesh_x * target_mesh_y
+    chunk_seeds = new_features.shape[0] // num_samples
 
-            # Extract the target for this sample
-            new_targets[sample_cnt] = targets[x][y]
+    # Each chunk of seeds is written to its rows of the full size datasets
+    samples.create_dataset('Features', (len(seeds)*num_samples, 18),
+                           maxshape=(None,18), dtype=new_features.dtype)
+    samples.create_dataset('Targets', (len(seeds)*num_samples, 1),
+                           maxshape=(None,1), dtype=new_targets.dtype)
 
-            # Update sample counter
-            sample_cnt += 1
+    # The targets are the same for each seed
+    new_targets[:,0] = np.tile(targets[energy][dataset].ravel(), chunk_seeds)
 
-    # Concatenate new features and targets to the existing datasets
-    if 'Features' in samples.keys():
-        feature_dataset = samples['Features']
-        target_dataset = samples['Targets']
+    for start in range(0, len(seeds), chunk_seeds):
 
-        feature_shape = feature_dataset.shape
-        target_shape = target_dataset.shape
+        stop = min(start + chunk_seeds, len(seeds))
+        rows = (stop - start) * num_samples
 
-        feature_dataset.resize((feature_shape[0]+17*17, feature_shape[1]))
-        target_dataset.resize((target_shape[0]+17*17, target_shape[1]))
+        with profiling.timer('Read features'):
+            for i, seed in enumerate(seeds[start:stop]):
+                mc_features = mc_feature_group[seed][energy][dataset][...]
+                profiling.count('bytes read', mc_features.nbytes)
 
-        feature_dataset[feature_shape[0]:,:] = new_features
-        target_dataset[target_shape[0]:] = new_targets
+                # Reorder the 3x3 mesh cells for each pin into feature
+                # vectors (indexed first by sample, then feature)
+                mc_features = mc_features.reshape(target_mesh_x, 3,
+                                                  target_mesh_y, 3)
+                new_features[i*num_samples:(i+1)*num_samples,:9] = \
+                    mc_features.transpose(0,2,3,1).reshape(num_samples, 9)
 
-    else:
+        budget.check('Read features')
+        profiling.count('samples', rows)
 
-        samples.create_dataset('Features', (17*17,18), maxshape=(None,18))
-        samples.create_dataset('Targets', (17*17,1), maxshape=(None,1))
+        with profiling.timer('Write samples'):
+            samples['Features'][start*num_samples:stop*num_samples] = \
+                new_features[:rows]
+            samples['Targets'][start*num_samples:stop*num_samples] = \
+                new_targets[:rows]
 
-        samples['Features'][:,:] = new_features
-        samples['Targets'][:,:] = new_targets
+        budget.check('Write samples')
 
     return
 
@@ -91,10 +102,6 @@ def exportSamples(samples, mc_features, geom_features, targets, energy, dataset)
 # Remove old HDF5 samples data file
 os.system('rm ../data/samples.h5')
 
-# Open file handles to feature and target values
-target_file = h5.File('../data/sample-targets.h5', 'r')
-geom_feature_file = h5.File('../data/geometry-features.h5', 'r')
-
 # The mesh dimensions
 target_mesh_x = 17
 target_mesh_y = 17
@@ -123,7 +130,41 @@ energies = ['High Energy', 'Low Energy']
 datasets = ['Flux', 'Tot. RXN Rate', 'Abs. RXN Rate', 'Fiss. RXN Rate', \
             'NuFiss. RXN Rate', 'Tot. XS', 'Abs. XS', 'Fiss. XS', 'NuFiss. XS']
 
-# Loop over assemblies, random number seeds, batches, energies and datasets
+# Read the (small) targets and geometry features for all assemblies up front
+# such that only the features and samples files are open at once
+all_targets = {}
+all_geom_features = {}
+
+with profiling.timer('Read targets'):
+    target_file = h5.File('../data/sample-targets.h5', 'r')
+    geom_feature_file = h5.File('../data/geometry-features.h5', 'r')
+
+    for assembly in assemblies:
+        all_geom_features[assembly] = geom_feature_file[assembly][...]
+        all_targets[assembly] = {}
+
+        for energy in energies:
+            all_targets[assembly][energy] = {}
+
+            for dataset in datasets:
+                all_targets[assembly][energy][dataset] = \
+                    target_file[assembly][energy][dataset][...]
+
+    geom_feature_file.close()
+    target_file.close()
+
+# Size the chunks of seeds from the scratch buffers and features per seed
+num_samples = target_mesh_x * target_mesh_y
+seed_size = num_samples * 19 * np.dtype(np.float32).itemsize + \
+    feature_mesh_x * feature_mesh_y * np.dtype(np.float64).itemsize
+chunk_seeds = budget.get_chunk_size(seed_size, len(seeds))
+
+# Preallocate the scratch buffers of feature vectors and targets (stored as
+# rows) which are reused for each chunk of seeds
+new_features = np.zeros((chunk_seeds*num_samples, 18), dtype=np.float32)
+new_targets = np.zeros((chunk_seeds*num_samples, 1), dtype=np.float32)
+
+# Loop over assemblies, batches, energies, datasets and random number seeds
 for assembly in assemblies:
 
     # Create file handle for the file of features data
@@ -137,44 +178,38 @@ for assembly in assemblies:
 
     print 'Exporting ' + assembly
 
-    targets = target_file[assembly]
-    geom_features = geom_feature_file[assembly]
+    targets = all_targets[assembly]
 
-    for seed in seeds:
+    # Append geometry/materials features to the feature vectors, which are
+    # the same for each batch, energy, dataset and seed
+    new_features[:,9:] = np.tile(all_geom_features[assembly], (chunk_seeds,1))
 
-        print '    ' + seed
-        
-        for batch in batches:
+    for batch in batches:
 
-            print '        batch-'+str(batch)
+        print '    batch-'+str(batch)
 
-            if not ('Batch-'+str(batch)) in sample_file.keys():
-                batch_group = sample_file.create_group('Batch-'+str(batch))
+        batch_group = sample_file.create_group('Batch-'+str(batch))
 
-            batch_group = sample_file['Batch-'+str(batch)]
-            mc_features = mc_feature_file[assembly][seed]['Batch-'+str(batch+250)]
+        # The features for this batch, indexed by seed
+        mc_feature_group = {}
 
-            for energy in energies:
+        for seed in seeds:
+            mc_feature_group[seed] = \
+                mc_feature_file[assembly][seed]['Batch-'+str(batch+250)]
 
-                if energy not in batch_group.keys():
-                    energy_group = batch_group.create_group(energy)
+        for energy in energies:
 
-                energy_group = batch_group[energy]
+            energy_group = batch_group.create_group(energy)
 
-                for dataset in datasets:
+            for dataset in datasets:
 
-                    if dataset not in energy_group.keys():
-                        dataset_group = energy_group.create_group(dataset)
-                    
-                    dataset_group = energy_group[dataset]
-                    exportSamples(dataset_group, mc_features, geom_features, targets, energy, dataset)
+                dataset_group = energy_group.create_group(dataset)
+                exportSamples(dataset_group, mc_feature_group,
+                              (new_features, new_targets), targets, energy,
+                              dataset)
 
     sample_file.close()
     mc_feature_file.close()
 
 
 print 'Finished'
-
-
-geom_feature_file.close()
-target_file.close()
@@ -0,0 +1,126 @@
+'''Data processing script to generate synthetic statepoints and samples files.
+
+   Date: 10/19/2026
+
+   Usage: python synthetic-data.py [--assemblies 193] [--lattice 17 17]
+                                   [--groups 2] [--seeds 10] [--noise 0.1]
+                                   [--directory ../synthetic] [--statepoints]
+
+   This python script generates synthetic data for a core of fuel assemblies
+   (see synthetic.py) to test how the data processing and machine learning
+   scale beyond our three 17x17 assemblies without running OpenMC. A
+   '<assembly>-samples.h5' file is written for each assembly to
+   '<directory>/data/' in the same layout as samples.py, such that the model
+   scripts may be run on the synthetic samples.
+
+   If the --statepoints option is given, the statepoints with the 3x3 mesh
+   per pin for each random number seed and batch and the converged pinwise
+   statepoint are also written for each assembly in the same layout as
+   openmc-input:
+
+       <directory>/openmc-input/<assembly>/three-by-three/seed-<n>/
+           statepoint.<batch>.h5
+       <directory>/openmc-input/<assembly>/pinwise/statepoint.<batch>.h5
+
+   The statepoints are large (the source bank alone is 64 bytes per
+   particle), so they are only written when needed, ie, to test features.py,
+   targets.py and the tally plotter at scale.
+'''
+
+import argparse
+import os
+
+import synthetic
+
+
+parser = argparse.ArgumentParser(description='Generate synthetic ' + \
+                                 'statepoints and samples files.')
+parser.add_argument('--assemblies', type=int, default=193,
+                    help='The number of assemblies in the core')
+parser.add_argument('--lattice', type=int, nargs=2, default=[17, 17],
+                    help='The number of pins in x and y in each assembly')
+parser.add_argument('--refinement', type=int, default=3,
+                    help='The number of feature mesh cells per pin in x and y')
+parser.add_argument('--groups', type=int, default=2,
+                    help='The number of energy groups')
+parser.add_argument('--scores', nargs='+', default=synthetic.SCORES,
+                    help='The scores in each tally')
+parser.add_argument('--seeds', type=int, default=10,
+                    help='The number of random number seeds')
+parser.add_argument('--batches', type=int, nargs='+',
+                    default=[10, 50, 100, 200, 300, 400, 500, 600, 700, 800,
+                             900, 1000],
+                    help='The active batches with samples for each seed')
+parser.add_argument('--inactive', type=int, default=250,
+                    help='The number of inactive batches')
+parser.add_argument('--particles', type=int, default=40000,
+                    help='The number of particles per batch')
+parser.add_argument('--noise', type=float, default=0.1,
+                    help='The relative standard deviation of each batch tally')
+parser.add_argument('--seed', type=int, default=1,
+                    help='The random number seed for the cross-sections')
+parser.add_argument('--directory', default='../synthetic',
+                    help='The output directory')
+parser.add_argument('--statepoints', action='store_true',
+                    help='Also write the statepoints for each assembly')
+args = parser.parse_args()
+
+
+core = synthetic.SyntheticCore(args.assemblies, args.lattice, args.refinement,
+                               args.groups, args.scores, args.seed)
+
+batches = sorted(args.batches)
+final_batch = batches[-1] + args.inactive
+
+data_directory = os.path.join(args.directory, 'data')
+
+if not os.path.exists(data_directory):
+    os.makedirs(data_directory)
+
+for i, assembly in enumerate(core.get_assembly_names()):
+
+    print 'Exporting ' + assembly
+
+    filename = os.path.join(data_directory, assembly + '-samples.h5')
+    synthetic.write_samples(filename, core, i, args.seeds, batches,
+                            args.inactive, final_batch, args.noise,
+                            args.particles)
+
+    if not args.statepoints:
+        continue
+
+    # Write the statepoints from which the samples would be processed
+    directory = os.path.join(args.directory, 'openmc-input', assembly)
+    means = core.get_means(i)
+
+    for seed in range(args.seeds):
+
+        print '    seed-' + str(seed+1)
+
+        seed_directory = os.path.join(directory, 'three-by-three',
+                                      'seed-' + str(seed+1))
+
+        if not os.path.exists(seed_directory):
+            os.makedirs(seed_directory)
+
+        for batch in batches:
+            filename = os.path.join(seed_directory, 'statepoint.' + \
+                                    str(batch+args.inactive) + '.h5')
+            synthetic.write_statepoint(filename, means, batch+args.inactive,
+                                       args.inactive, final_batch,
+                                       args.scores, args.noise,
+                                       args.particles, seed+1, args.lattice)
+
+    pinwise_directory = os.path.join(directory, 'pinwise')
+
+    if not os.path.exists(pinwise_directory):
+        os.makedirs(pinwise_directory)
+
+    filename = os.path.join(pinwise_directory, 'statepoint.' + \
+                            str(final_batch) + '.h5')
+    synthetic.write_statepoint(filename, core.get_pin_means(i, means),
+                               final_batch, args.inactive, final_batch,
+                               args.scores, args.noise, args.particles, 1,
+                               args.lattice)
+
+print 'Finished'
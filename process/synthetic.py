@@ -0,0 +1,800 @@
+'''Generates synthetic OpenMC statepoint and samples files for scale testing.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from synthetic import SyntheticCore"
+
+   The SyntheticCore class builds the true (converged) tallies for each fuel
+   assembly in a core with a physically plausible spatial flux shape: a
+   fundamental mode (Bessel function) radial shape across the core, thermal
+   flux peaking around the water-filled guide tubes and depression around
+   burnable absorbers within each assembly, and moderator peaking within each
+   pin cell. The reaction rates are the flux times the cross-sections for the
+   material in each mesh cell, which are interpolated across the energy
+   groups between typical thermal and fast values for our 17x17 assemblies.
+   The cores are loaded with three enrichments as in the BEAVRS benchmark,
+   with the highest enrichment in the outer third of the assemblies and a
+   checkerboard of the two lower enrichments inside, and with burnable
+   absorbers in a checkerboard of the higher enrichment assemblies.
+
+   The write_statepoint function writes an HDF5 statepoint file with the same
+   layout as the statepoints written by OpenMC 0.5.2 for our simulations (see
+   statepoint.py): the run metadata, k-effective and entropy for each batch,
+   the global tallies, the source bank, a single rectilinear mesh and a single
+   tally with a mesh filter, an energy filter and one or more scores. The
+   tally results are stored with the same padded (sum, sum_sq) compound type
+   as OpenMC, such that the files are parsed by the StatePoint class and read
+   by the tally plotter exactly as the real statepoints are.
+
+   The tally means for each batch and random number seed are sampled about
+   the true means with a relative standard deviation that decreases with the
+   square root of the number of active batches and increases for bins with
+   lower tallies, such that the tallies from earlier batches are noisier than
+   the tallies from later batches, as for a real simulation. The
+   write_samples function writes a '<assembly>-samples.h5' file with the same
+   layout, samples and feature vectors as process/samples.py would write from
+   the features and targets of the same synthetic statepoints, without
+   writing the statepoints themselves.
+'''
+
+import numpy as np
+import h5py as h5
+import scipy.ndimage
+import scipy.special
+
+from statepoint import score_types
+
+
+# The scores tallied on each mesh in our simulations (see tallies.xml)
+SCORES = ['nu-fission', 'flux', 'total', 'absorption', 'fission']
+
+# The score_bins code in the statepoint for each score
+SCORE_CODES = dict((score, code) for code, score in score_types.items())
+
+# The dataset names for each score in the features, targets and samples files
+RATE_NAMES = {'flux': 'Flux', 'total': 'Tot. RXN Rate',
+              'absorption': 'Abs. RXN Rate', 'fission': 'Fiss. RXN Rate',
+              'nu-fission': 'NuFiss. RXN Rate'}
+XS_NAMES = {'total': 'Tot. XS', 'absorption': 'Abs. XS',
+            'fission': 'Fiss. XS', 'nu-fission': 'NuFiss. XS'}
+
+# The pin pitch (cm) of the 17x17 fuel assemblies
+PIN_PITCH = 1.25984
+
+# The lower edge of the fast energy group (MeV) and the upper energy (MeV)
+THERMAL_CUTOFF = 4.e-6
+MAX_ENERGY = 20.
+
+# The padded compound types used by OpenMC for tally results and source sites
+TALLY_DTYPE = np.dtype({'names': ['sum', 'sum_sq'],
+                        'formats': ['<f8', '<f8'],
+                        'offsets': [8, 16], 'itemsize': 24})
+SOURCE_DTYPE = np.dtype([('wgt', '<f8'), ('xyz', '<f8', (3,)),
+                         ('uvw', '<f8', (3,)), ('E', '<f8')])
+
+# The materials in each pin (as in geometry-features.py)
+FUEL = 0
+WATER = 1
+ABSORBER = 2
+FISSION_CHAMBER = 3
+
+# The guide tube pins in a 17x17 assembly and the 16 of those with burnable
+# absorbers in the assemblies with burnable absorbers
+GUIDE_TUBES = [(2,5), (2,8), (2,11), (3,3), (3,13), (5,2), (5,5), (5,8),
+               (5,11), (5,14), (8,2), (8,5), (8,8), (8,11), (8,14), (11,2),
+               (11,5), (11,8), (11,11), (11,14), (13,3), (13,13), (14,5),
+               (14,8), (14,11)]
+ABSORBER_TUBES = [(2,5), (2,8), (2,11), (3,3), (3,13), (5,2), (5,14), (8,2),
+                  (8,14), (11,2), (11,14), (13,3), (13,13), (14,5), (14,8),
+                  (14,11)]
+
+# The pin cell cross-sections (1/cm) in the thermal and fast groups for each
+# material, from the converged 2-group tallies for the 1.6 wt% assembly
+THERMAL_XS = {FUEL: {'total': 1.30, 'absorption': 0.054, 'fission': 0.0258},
+              WATER: {'total': 1.69, 'absorption': 0.0225, 'fission': 0.},
+              ABSORBER: {'total': 1.45, 'absorption': 0.30, 'fission': 0.},
+              FISSION_CHAMBER: {'total': 1.69, 'absorption': 0.0225,
+                                'fission': 0.}}
+FAST_XS = {FUEL: {'total': 0.539, 'absorption': 0.0078, 'fission': 0.00155},
+           WATER: {'total': 0.622, 'absorption': 0.00049, 'fission': 0.},
+           ABSORBER: {'total': 0.56, 'absorption': 0.005, 'fission': 0.},
+           FISSION_CHAMBER: {'total': 0.622, 'absorption': 0.00049,
+                             'fission': 0.}}
+THERMAL_NU = 2.44
+FAST_NU = 2.63
+
+# The assembly averaged thermal and fast flux (per source particle)
+THERMAL_FLUX = 0.0475
+FAST_FLUX = 0.1166
+
+# The fuel enrichments (wt%) loaded in a checkerboard in the inner two thirds
+# of the core and in the outer third of the core
+ENRICHMENTS = [1.6, 2.4, 3.1]
+
+
+def get_energy_bins(num_groups):
+    '''Returns the energy filter bin edges (MeV) for a number of groups.
+
+       The two group structure is the same as in our simulations. More groups
+       are spaced logarithmically between the thermal cutoff and 20 MeV.
+    '''
+
+    if num_groups == 1:
+        return np.array([0., MAX_ENERGY])
+
+    return np.hstack(([0.], np.logspace(np.log10(THERMAL_CUTOFF),
+                                        np.log10(MAX_ENERGY), num_groups)))
+
+
+def get_energy_names(num_groups):
+    '''Returns the names of the energy groups in the features, targets and
+       samples files (ie, 'High Energy' and 'Low Energy' for two groups).
+
+       The groups are in the (ascending) order of the energy filter bins in
+       the statepoints.
+    '''
+
+    if num_groups == 2:
+        return ['High Energy', 'Low Energy']
+    else:
+        return ['Group ' + str(g+1) for g in range(num_groups)]
+
+
+def get_core_positions(num_assemblies=193):
+    '''Returns the (x,y) position of each assembly in a square core lattice.
+
+       The assemblies fill the positions closest to the center of the
+       smallest odd-sized square lattice which holds them all, such that 193
+       assemblies fill the standard 15x15 four-loop PWR core map.
+    '''
+
+    size = int(np.ceil(np.sqrt(num_assemblies)))
+    size += 1 - size % 2
+    center = (size - 1) / 2.
+
+    positions = [(x, y) for x in range(size) for y in range(size)]
+    positions.sort(key=lambda p: (np.hypot(p[0]-center, p[1]-center), p))
+
+    return sorted(positions[:num_assemblies]), size
+
+
+def get_assembly_materials(lattice=(17,17), absorbers=False):
+    '''Returns the material in each pin of an assembly.
+
+       The 17x17 assemblies have 24 guide tubes and a central instrument tube
+       filled with water, or with 16 burnable absorber rods and a fission
+       chamber if absorbers is True. Other lattices have guide tubes at every
+       third pin.
+    '''
+
+    materials = np.zeros(lattice, dtype=int)
+
+    if tuple(lattice) == (17,17):
+        for pin in GUIDE_TUBES:
+            materials[pin] = WATER
+
+        if absorbers:
+            for pin in ABSORBER_TUBES:
+                materials[pin] = ABSORBER
+            materials[8,8] = FISSION_CHAMBER
+
+    else:
+        materials[2::3,2::3] = ABSORBER if absorbers else WATER
+
+    return materials
+
+
+def get_geometry_features(materials):
+    '''Returns the geometry/materials features for each pin in a lattice.
+
+       Takes in a 2D array of the material in each pin (0 - fuel, 1 - water,
+       2 - burnable absorber, 3 - fission chamber) and returns the same 9
+       features per pin (stored as rows in x, y order) as
+       geometry-features.py: the number of neighboring water, burnable
+       absorber and fission chamber pins across the faces and corners, the
+       faces only and the corners only.
+    '''
+
+    materials = np.asarray(materials)
+    nx, ny = materials.shape
+    features = np.zeros((nx*ny, 9))
+
+    for i, material in enumerate([WATER, ABSORBER, FISSION_CHAMBER]):
+
+        # Pad the lattice such that pins on the edges have no neighbors
+        padded = np.zeros((nx+2, ny+2))
+        padded[1:-1,1:-1] = (materials == material)
+
+        faces = padded[:-2,1:-1] + padded[2:,1:-1] + \
+                padded[1:-1,:-2] + padded[1:-1,2:]
+        corners = padded[:-2,:-2] + padded[2:,:-2] + \
+                  padded[:-2,2:] + padded[2:,2:]
+
+        # The center pin is counted with its faces and corners
+        features[:,3*i] = np.ravel(faces + corners + padded[1:-1,1:-1])
+        features[:,3*i+1] = np.ravel(faces)
+        features[:,3*i+2] = np.ravel(corners)
+
+    return features
+
+
+
+class SyntheticCore:
+    '''The SyntheticCore class.
+
+       This class generates the true tally means for each assembly in a core
+       on a mesh with refinement x refinement cells per pin.
+    '''
+
+    def __init__(self, num_assemblies=193, lattice=(17,17), refinement=3,
+                 num_groups=2, scores=SCORES, seed=1):
+        '''Initialize the SyntheticCore class.
+
+           Takes in the number of assemblies in the core, the number of pins
+           in x and y in each assembly, the number of mesh cells in x and y
+           per pin, the number of energy groups and the scores to tally. The
+           random number seed is used to perturb the cross-sections in each
+           pin by a small amount.
+        '''
+
+        for score in scores:
+            if score not in RATE_NAMES:
+                raise Exception('Unable to generate tallies for score ' + \
+                                score + ' which is not one of ' + \
+                                str(sorted(RATE_NAMES.keys())))
+
+        if isinstance(lattice, int):
+            lattice = (lattice, lattice)
+
+        self._lattice = tuple(lattice)
+        self._refinement = refinement
+        self._num_groups = num_groups
+        self._scores = list(scores)
+        self._seed = seed
+        self._positions, self._core_size = get_core_positions(num_assemblies)
+
+        # The extrapolated radius (in pins) of the core is just outside the
+        # outermost corner of any assembly
+        corners = np.array(self._positions) - self._core_size / 2.
+        corners = (np.abs(corners) + 1.) * np.array(self._lattice)
+        self._extrapolated = 1.05 * np.max(np.hypot(corners[:,0],
+                                                    corners[:,1]))
+
+        # Load the highest enrichment in the outer third of the assemblies
+        center = (self._core_size - 1) / 2.
+        distances = [np.hypot(x-center, y-center) for x, y in self._positions]
+        outer = np.sort(distances)[(2 * num_assemblies) // 3]
+
+        self._enrichments = []
+        self._absorbers = []
+
+        for (x, y), distance in zip(self._positions, distances):
+            if distance >= outer and num_assemblies > 1:
+                enrichment = ENRICHMENTS[2]
+            else:
+                enrichment = ENRICHMENTS[(x+y) % 2]
+
+            self._enrichments.append(enrichment)
+            self._absorbers.append(enrichment > ENRICHMENTS[0] and \
+                                   (x+y) % 2 == 1)
+
+
+    def get_num_assemblies(self):
+        '''Returns the number of assemblies in the core.'''
+
+        return len(self._positions)
+
+
+    def get_assembly_names(self):
+        '''Returns the name of each assembly (ie, 'Fuel-2.4wo-16BA-023').'''
+
+        names = []
+
+        for i in range(self.get_num_assemblies()):
+            name = 'Fuel-' + str(self._enrichments[i]) + 'wo-'
+
+            if self._absorbers[i]:
+                name += '16BA-'
+
+            names.append(name + '%03d' % (i+1))
+
+        return names
+
+
+    def get_lattice(self):
+        '''Returns the number of pins in x and y in each assembly.'''
+
+        return self._lattice
+
+
+    def get_refinement(self):
+        '''Returns the number of mesh cells in x and y per pin.'''
+
+        return self._refinement
+
+
+    def get_num_groups(self):
+        '''Returns the number of energy groups.'''
+
+        return self._num_groups
+
+
+    def get_scores(self):
+        '''Returns the scores in each tally.'''
+
+        return list(self._scores)
+
+
+    def get_mesh_shape(self):
+        '''Returns the number of mesh cells in x and y in each assembly.'''
+
+        return (self._lattice[0] * self._refinement,
+                self._lattice[1] * self._refinement)
+
+
+    def get_materials(self, assembly):
+        '''Returns the material in each pin of an assembly (by index).'''
+
+        return get_assembly_materials(self._lattice, self._absorbers[assembly])
+
+
+    def get_geometry_features(self, assembly):
+        '''Returns the geometry/materials features for each pin of an
+           assembly (by index).'''
+
+        return get_geometry_features(self.get_materials(assembly))
+
+
+    def _get_group_weights(self):
+        '''Returns the fraction of the way from the thermal to the fast group
+           for each energy group.'''
+
+        if self._num_groups == 1:
+            return np.array([0.5])
+        else:
+            return np.linspace(0., 1., self._num_groups)
+
+
+    def _get_flux(self, assembly, materials):
+        '''Returns the flux in each mesh cell and energy group.'''
+
+        r = self._refinement
+        nx, ny = self.get_mesh_shape()
+        weights = self._get_group_weights()
+
+        # Fundamental mode radial shape across the core with the mesh cell
+        # centers in units of pins from the center of the core. A single
+        # assembly has reflective boundaries (as in our simulations) and a
+        # flat shape.
+        if self.get_num_assemblies() == 1:
+            shape = np.ones((nx, ny))
+
+        else:
+            x, y = self._positions[assembly]
+            center = self._core_size / 2.
+            core_x = (x - center) * self._lattice[0] + (np.arange(nx)+0.5) / r
+            core_y = (y - center) * self._lattice[1] + (np.arange(ny)+0.5) / r
+            radius = np.hypot(core_x[:,np.newaxis], core_y[np.newaxis,:])
+            shape = scipy.special.j0(2.405 * radius / self._extrapolated)
+
+        # Thermal flux peaking around water and depression around absorbers,
+        # smoothed over about one pin pitch
+        cells = np.kron(materials, np.ones((r, r), dtype=int))
+        water = (cells == WATER) | (cells == FISSION_CHAMBER)
+        water = scipy.ndimage.gaussian_filter(water * 1., r, mode='nearest')
+        absorber = scipy.ndimage.gaussian_filter((cells == ABSORBER) * 1., r,
+                                                 mode='nearest')
+
+        # Moderator peaking within each pin cell (away from the fuel)
+        offset = np.abs(np.arange(r) - (r - 1) / 2.) / max(r - 1, 1)
+        pin = np.tile(offset, self._lattice[0])[:,np.newaxis] + \
+              np.tile(offset, self._lattice[1])[np.newaxis,:]
+
+        flux = np.zeros((nx, ny, self._num_groups))
+
+        for g, w in enumerate(weights):
+            thermal = 1. - w
+            spectrum = thermal * THERMAL_FLUX + w * FAST_FLUX
+            spectrum *= 2. / self._num_groups
+
+            local = 1. + thermal * (0.8 * water - 0.4 * absorber + \
+                                    0.04 * pin) - w * 0.05 * water
+
+            flux[:,:,g] = spectrum * shape * local / (r*r)
+
+        return flux
+
+
+    def _get_cross_sections(self, assembly, materials):
+        '''Returns the cross-section for each mesh cell, energy group and
+           reaction in a dictionary indexed by reaction.'''
+
+        r = self._refinement
+        nx, ny = self.get_mesh_shape()
+        weights = self._get_group_weights()
+        cells = np.kron(materials, np.ones((r, r), dtype=int))
+
+        # The fuel is concentrated in the center of each fuel pin cell
+        offset = np.abs(np.arange(r) - (r - 1) / 2.) / max(r - 1, 1)
+        fuel = 1.5 - (np.tile(offset, self._lattice[0])[:,np.newaxis] + \
+                      np.tile(offset, self._lattice[1])[np.newaxis,:])
+        fuel /= np.mean(fuel[:r,:r])
+
+        # The fission cross-section increases with the square root of the
+        # enrichment relative to the 1.6 wt% assembly
+        enrichment = np.sqrt(self._enrichments[assembly] / ENRICHMENTS[0])
+
+        # Perturb the cross-sections in each mesh cell by up to 1%
+        rng = np.random.RandomState([self._seed, assembly])
+        perturbation = 1. + 0.01 * rng.uniform(-1., 1., (nx, ny))
+
+        xs = {}
+
+        for reaction in ['total', 'absorption', 'fission']:
+            xs[reaction] = np.zeros((nx, ny, self._num_groups))
+
+            for g, w in enumerate(weights):
+                for material in THERMAL_XS:
+                    thermal = THERMAL_XS[material][reaction]
+                    fast = FAST_XS[material][reaction]
+
+                    # Interpolate logarithmically between thermal and fast
+                    if thermal > 0. and fast > 0.:
+                        value = thermal**(1.-w) * fast**w
+                    else:
+                        value = 0.
+
+                    xs[reaction][:,:,g][cells == material] = value
+
+                if reaction == 'fission':
+                    xs[reaction][:,:,g] *= fuel * enrichment
+
+                xs[reaction][:,:,g] *= perturbation
+
+        nu = THERMAL_NU * (1. - weights) + FAST_NU * weights
+        xs['nu-fission'] = xs['fission'] * nu
+
+        return xs
+
+
+    def get_means(self, assembly):
+        '''Returns the true tally means for an assembly (by index) on the
+           refined mesh, indexed by mesh x, mesh y, energy group and score.'''
+
+        materials = self.get_materials(assembly)
+        flux = self._get_flux(assembly, materials)
+        xs = self._get_cross_sections(assembly, materials)
+
+        means = np.zeros(flux.shape + (len(self._scores),))
+
+        for i, score in enumerate(self._scores):
+            if score == 'flux':
+                means[...,i] = flux
+            else:
+                means[...,i] = flux * xs[score]
+
+        return means
+
+
+    def get_pin_means(self, assembly, means=None):
+        '''Returns the true tally means for an assembly (by index) on the
+           pinwise mesh, which are the sums of the tallies in the refined mesh
+           cells in each pin.'''
+
+        if means is None:
+            means = self.get_means(assembly)
+
+        r = self._refinement
+        means = np.reshape(means, (self._lattice[0], r, self._lattice[1], r) + \
+                           means.shape[2:])
+
+        return np.sum(np.sum(means, axis=3), axis=1)
+
+
+
+def sample_means(means, batch, n_inactive=250, noise=0.1, seed=1):
+    '''Returns the sampled tally means and their standard deviations after a
+       batch of a simulation.
+
+       The relative standard deviation of each batch's tally is noise for the
+       largest tally of each score, and increases with the inverse square
+       root of the tally for smaller tallies. The sampled means are seeded by
+       the random number seed and the batch.
+    '''
+
+    num_realizations = batch - n_inactive
+
+    if num_realizations < 2:
+        raise Exception('Unable to sample the tallies for batch ' + \
+                        str(batch) + ' with fewer than two active batches')
+
+    means = np.asarray(means, dtype=np.float64)
+    largest = np.abs(means).reshape((-1, means.shape[-1])).max(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = noise * np.sqrt(np.abs(means) * largest)
+        std = np.nan_to_num(std / np.sqrt(num_realizations))
+
+    rng = np.random.RandomState([seed, batch])
+    sampled = means + std * rng.standard_normal(means.shape)
+
+    return sampled, std
+
+
+def get_tallies(means, scores=SCORES):
+    '''Returns the reaction rates and cross-sections from the tally means.
+
+       Takes in an array of the means indexed by mesh x, mesh y, energy group
+       and score, and returns a dictionary of the 3D array (x, y, group) of
+       each reaction rate and cross-section indexed by the dataset names in
+       the features, targets and samples files (ie, 'Tot. XS').
+    '''
+
+    scores = list(scores)
+
+    if 'flux' not in scores:
+        raise Exception('Unable to compute the cross-sections from the ' + \
+                        'scores ' + str(scores) + ' without the flux')
+
+    flux = means[...,scores.index('flux')]
+    tallies = {}
+
+    for i, score in enumerate(scores):
+        tallies[RATE_NAMES[score]] = means[...,i]
+
+        if score in XS_NAMES:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tallies[XS_NAMES[score]] = np.nan_to_num(means[...,i] / flux)
+
+    return tallies
+
+
+def _write_int(f, path, values, dtype='<i4'):
+    '''Writes a 1D integer dataset.'''
+
+    f.create_dataset(path, data=np.atleast_1d(np.asarray(values, dtype=dtype)))
+
+
+def _write_double(f, path, values):
+    '''Writes a 1D double precision dataset.'''
+
+    f.create_dataset(path, data=np.atleast_1d(np.asarray(values, dtype='<f8')))
+
+
+def _write_string(f, path, value):
+    '''Writes a variable length string dataset.'''
+
+    f.create_dataset(path, (1,), dtype=h5.special_dtype(vlen=str))
+    f[path][0] = value
+
+
+def write_statepoint(filename, means, batch, n_inactive=250, n_batches=None,
+                     scores=SCORES, noise=0.1, n_particles=40000, seed=1,
+                     lattice=(17,17), pitch=PIN_PITCH):
+    '''Writes a synthetic statepoint file for one batch of a simulation.
+
+       Takes in the output filename, an array of the true tally means indexed
+       by mesh x, mesh y, energy group and score (in the order of scores), and
+       the current batch number. The tally is accumulated over the
+       (batch - n_inactive) active batches, with the noise described in
+       sample_means. The mesh spans an assembly with a lattice of pins of the
+       given pitch (cm), such that a 17x17 mesh has one cell per pin and a
+       51x51 mesh has 3x3 cells per pin for a 17x17 lattice. The random number
+       seed is written to the file and, with the batch, seeds the noise.
+    '''
+
+    means = np.asarray(means, dtype=np.float64)
+
+    if means.ndim != 4 or means.shape[3] != len(scores):
+        raise Exception('Unable to write statepoint ' + filename + ' with ' + \
+                        'means of shape ' + str(means.shape) + ' which ' + \
+                        'is not (mesh x, mesh y, groups, ' + \
+                        str(len(scores)) + ' scores)')
+
+    if n_batches is None:
+        n_batches = batch
+
+    mesh_shape = means.shape[:2]
+    num_groups = means.shape[2]
+    num_filter_bins = mesh_shape[0] * mesh_shape[1] * num_groups
+
+    # Sample the tally means and their variances after n active batches
+    n = batch - n_inactive
+    sampled, std = sample_means(means, batch, n_inactive, noise, seed)
+    sampled = np.ravel(sampled)
+    std = np.ravel(std)
+
+    results = np.zeros(sampled.shape, dtype=TALLY_DTYPE)
+    results['sum'] = n * sampled
+    results['sum_sq'] = n * (sampled**2 + (n-1) * std**2)
+
+    rng = np.random.RandomState([seed, batch, 1])
+
+    f = h5.File(filename, 'w')
+
+    try:
+        # Run metadata
+        _write_int(f, 'filetype', -1)
+        _write_int(f, 'revision', 9)
+        _write_int(f, 'version_major', 0)
+        _write_int(f, 'version_minor', 5)
+        _write_int(f, 'version_release', 2)
+        _write_string(f, 'date_and_time', '2013-11-01 00:00:00')
+        _write_string(f, 'path', filename)
+        _write_int(f, 'seed', seed, '<i8')
+        _write_int(f, 'run_mode', 2)
+        _write_int(f, 'n_particles', n_particles, '<i8')
+        _write_int(f, 'n_batches', n_batches)
+        _write_int(f, 'current_batch', batch)
+
+        # Criticality information for each generation
+        k_generation = 1. + 0.005 * rng.standard_normal(batch)
+        _write_int(f, 'n_inactive', n_inactive)
+        _write_int(f, 'gen_per_batch', 1)
+        _write_double(f, 'k_generation', k_generation)
+        _write_double(f, 'entropy', 8. + 0.01 * rng.standard_normal(batch))
+        _write_double(f, 'k_col_abs', np.sum(k_generation[n_inactive:]))
+        _write_double(f, 'k_col_tra', np.sum(k_generation[n_inactive:]))
+        _write_double(f, 'k_abs_tra', np.sum(k_generation[n_inactive:]))
+        _write_double(f, 'k_combined',
+                      [np.mean(k_generation[n_inactive:]),
+                       np.std(k_generation[n_inactive:]) / np.sqrt(n)])
+
+        # Mesh
+        width = pitch * np.array(lattice, dtype=np.float64)
+        lower_left = -width / 2.
+        width /= np.array(mesh_shape)
+        _write_int(f, 'tallies/n_meshes', 1)
+        _write_int(f, 'tallies/mesh1/id', 1)
+        _write_int(f, 'tallies/mesh1/type', 1)
+        _write_int(f, 'tallies/mesh1/n_dimension', 2)
+        _write_int(f, 'tallies/mesh1/dimension', mesh_shape)
+        _write_double(f, 'tallies/mesh1/lower_left', lower_left)
+        _write_double(f, 'tallies/mesh1/upper_right', -lower_left)
+        _write_double(f, 'tallies/mesh1/width', width)
+
+        # Tally with a mesh filter and an energy filter
+        base = 'tallies/tally1/'
+        _write_int(f, 'tallies/n_tallies', 1)
+        _write_int(f, base + 'id', 1)
+        _write_int(f, base + 'n_realizations', n)
+        _write_int(f, base + 'total_score_bins', len(scores))
+        _write_int(f, base + 'total_filter_bins', num_filter_bins)
+        _write_int(f, base + 'n_filters', 2)
+        _write_int(f, base + 'filter1/type', 6)
+        _write_int(f, base + 'filter1/n_bins', mesh_shape[0]*mesh_shape[1])
+        _write_int(f, base + 'filter1/bins', 1)
+        _write_int(f, base + 'filter2/type', 7)
+        _write_int(f, base + 'filter2/n_bins', num_groups)
+        _write_double(f, base + 'filter2/bins', get_energy_bins(num_groups))
+        _write_int(f, base + 'n_nuclide_bins', 1)
+        _write_int(f, base + 'nuclide_bins', -1)
+        _write_int(f, base + 'n_score_bins', len(scores))
+        _write_int(f, base + 'score_bins',
+                   [SCORE_CODES[score] for score in scores])
+        _write_int(f, base + 'scatt_order', np.zeros(len(scores)))
+        _write_int(f, base + 'n_user_score_bins', len(scores))
+
+        # Global tallies (k-effective estimators and leakage) and results
+        global_tallies = np.zeros(4, dtype=TALLY_DTYPE)
+        global_tallies['sum'] = n
+        global_tallies['sum_sq'] = n
+        _write_int(f, 'n_realizations', n)
+        _write_int(f, 'n_global_tallies', 4)
+        f.create_dataset('global_tallies', data=global_tallies)
+        _write_int(f, 'tallies/tallies_present', 1)
+        f.create_dataset(base + 'results', data=results)
+
+        # Source bank of fission sites uniformly spread across the assembly
+        source_bank = np.zeros(n_particles, dtype=SOURCE_DTYPE)
+        source_bank['wgt'] = 1.
+        source_bank['xyz'][:,:2] = rng.uniform(lower_left, -lower_left,
+                                               (n_particles, 2))
+        source_bank['uvw'][:,2] = 1.
+        source_bank['E'] = 2.
+        f.create_dataset('source_bank', data=source_bank)
+
+    finally:
+        f.close()
+
+
+def get_sample_features(mc_features, geom_features, refinement=3):
+    '''Returns the feature vectors (stored as rows) for each pin.
+
+       Takes in a 2D array of a tally on the refined mesh and the geometry
+       features for each pin, and returns the refinement x refinement tallies
+       in each pin followed by its geometry features, in the same order as
+       exportSamples in samples.py.
+    '''
+
+    r = refinement
+    nx = mc_features.shape[0] // r
+    ny = mc_features.shape[1] // r
+
+    # The mesh cells in each pin are ordered with x varying fastest
+    mc_features = np.reshape(mc_features, (nx, r, ny, r))
+    mc_features = np.transpose(mc_features, (0, 2, 3, 1))
+    mc_features = np.reshape(mc_features, (nx*ny, r*r))
+
+    return np.hstack((mc_features, geom_features))
+
+
+def write_samples(filename, core, assembly, seeds, batches, n_inactive=250,
+                  final_batch=None, noise=0.1, n_particles=40000):
+    '''Writes the samples file for an assembly of a SyntheticCore.
+
+       Takes in the output filename, the core, the assembly (by index), the
+       number of random number seeds and the list of active batches. The
+       samples file has the same layout and samples as samples.py would write
+       from the features and targets of the synthetic statepoints for each
+       seed and batch (see write_statepoint), where the targets are the
+       pinwise tallies after the final batch (the last batch plus the
+       inactive batches by default) of the first seed.
+    '''
+
+    batches = sorted(batches)
+
+    if final_batch is None:
+        final_batch = batches[-1] + n_inactive
+
+    r = core.get_refinement()
+    scores = core.get_scores()
+    num_groups = core.get_num_groups()
+    energies = get_energy_names(num_groups)
+    lattice = core.get_lattice()
+    num_pins = lattice[0] * lattice[1]
+
+    means = core.get_means(assembly)
+    geom_features = core.get_geometry_features(assembly)
+
+    pin_means = sample_means(core.get_pin_means(assembly, means), final_batch,
+                             n_inactive, noise, 1)[0]
+    targets = get_tallies(pin_means, scores)
+    datasets = sorted(targets.keys())
+
+    sample_file = h5.File(filename, 'w')
+    sample_file.attrs['# Energy Groups'] = num_groups
+    sample_file.attrs['# Batches'] = batches[-1]
+    sample_file.attrs['# Particles / Batch'] = n_particles
+    sample_file.attrs['# Inactive Batches'] = n_inactive
+
+    try:
+        for batch in batches:
+
+            # The features for every seed are stacked for each dataset
+            features = dict(((dataset, g), []) for dataset in datasets \
+                            for g in range(num_groups))
+
+            for seed in range(seeds):
+                sampled = sample_means(means, batch+n_inactive, n_inactive,
+                                       noise, seed+1)[0]
+                tallies = get_tallies(sampled, scores)
+
+                for dataset, g in features:
+                    features[(dataset, g)].append(get_sample_features(
+                        tallies[dataset][:,:,g], geom_features, r))
+
+            batch_group = sample_file.create_group('Batch-' + str(batch))
+
+            for g, energy in enumerate(energies):
+                energy_group = batch_group.create_group(energy)
+
+                for dataset in datasets:
+                    new_features = np.vstack(features[(dataset, g)])
+                    new_targets = np.tile(np.reshape(targets[dataset][:,:,g],
+                                                     (num_pins, 1)),
+                                          (seeds, 1))
+
+                    # Resizable single precision datasets, as in samples.py
+                    dataset_group = energy_group.create_group(dataset)
+                    dataset_group.create_dataset('Features',
+                                                 new_features.shape,
+                                                 maxshape=(None,
+                                                 new_features.shape[1]))
+                    dataset_group.create_dataset('Targets', new_targets.shape,
+                                                 maxshape=(None, 1))
+                    dataset_group['Features'][...] = new_features
+                    dataset_group['Targets'][...] = new_targets
+
+    finally:
+        sample_file.close()
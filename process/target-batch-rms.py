@@ -3,18 +3,37 @@
    Author: William Boyd
    Date: 11/6/2013
 
-   Usage: python target-batch-rms.py
+   Usage: python target-batch-rms.py [--max-rss 2048]
 
    This file computes the root-mean squared errors for all batch-wise target
    values, including tallies in each energy group for each assembly. All of
    the RMS errors are stored in HDF5 to 'data/target-rms.h5'.
+
+   Each statepoint is read once for both energy groups, and only the sums of
+   the scores needed for the targets are read from the tally results for a
+   chunk of mesh rows at a time into preallocated buffers. If the --max-rss
+   option is given (in MB), the number of mesh rows in each chunk is sized to
+   fit within the memory budget (see cluster/profiling.py), and the peak
+   memory usage per stage is printed if the budget would be exceeded.
 '''
 
-from statepoint import StatePoint
-import matplotlib.pyplot as plt
+from statepoint import score_types
+import argparse
 import h5py as h5
 import numpy as np
-import os
+import sys
+
+sys.path.insert(0, '..')
+from cluster import profiling
+
+
+parser = argparse.ArgumentParser(description='Compute the RMS errors ' + \
+                                 'for all batch-wise target values.')
+parser.add_argument('--max-rss', type=float, default=None,
+                    help='The maximum resident set size in MB')
+args = parser.parse_args()
+
+budget = profiling.MemoryBudget(args.max_rss)
 
 import socket
 if socket.gethostname() is not 'nsecluster.mit.edu':
@@ -22,6 +41,79 @@ if socket.gethostname() is not 'nsecluster.mit.edu':
         'statepoint files are stored'
     exit()
 
+
+def read_layout(filename):
+    '''Returns the score columns and the number of score bins for the tally.
+
+       The layout is read from the converged statepoint and is assumed to be
+       the same for each batch's statepoint.
+    '''
+
+    sp_file = h5.File(filename, 'r')
+
+    try:
+        score_bins = np.ravel(sp_file[path + 'score_bins'][...])
+        tally_scores = [score_types[score] for score in score_bins]
+
+        for score in scores:
+            if score not in tally_scores:
+                raise Exception('Unable to read score ' + score + ' which ' + \
+                                'is not in the tally with scores ' + \
+                                str(tally_scores))
+
+        num_score_bins = int(sp_file[path + 'total_score_bins'][0])
+        num_filter_bins = int(sp_file[path + 'total_filter_bins'][0])
+    finally:
+        sp_file.close()
+
+    if num_filter_bins != x * y * groups:
+        raise Exception('Unable to read the tally with ' + \
+                        str(num_filter_bins) + ' filter bins rather than ' + \
+                        str(x * y * groups) + ' for the target mesh')
+
+    columns = [tally_scores.index(score) for score in scores]
+    return columns, num_score_bins
+
+
+def read_rows(sp_file, layout, start, stop, values):
+    '''Reads the batch means and cross-sections for a chunk of mesh rows.
+
+       The means of each score and the group cross-sections are stored in
+       values[:, :stop-start], which is indexed by dataset, mesh row, mesh
+       column and energy group.
+    '''
+
+    columns, num_score_bins = layout
+    num_realizations = int(sp_file[path + 'n_realizations'][0])
+    dataset = sp_file[path + 'results']
+
+    # Only read the sums for the filter bins in this chunk of mesh rows
+    row_bins = y * groups
+
+    if dataset.ndim == 2:
+        data = dataset[start*row_bins:stop*row_bins, 'sum']
+    else:
+        data = dataset[start*row_bins*num_score_bins:
+                       stop*row_bins*num_score_bins, 'sum']
+        data = data.reshape(-1, num_score_bins)
+
+    profiling.count('bytes read', data.nbytes)
+
+    rows = stop - start
+
+    for i, column in enumerate(columns):
+        values[i,:rows] = data[:,column].reshape(rows, y, groups)
+
+    values[:len(scores),:rows] /= num_realizations
+
+    # Compute group cross-sections for both energy groups
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(values[1:len(scores),:rows], values[0,:rows],
+                  values[len(scores):,:rows])
+
+    values[len(scores):,:rows] = np.nan_to_num(values[len(scores):,:rows])
+
+
 # Create HDF5 file handle for each assembly's RMS error
 rms_file = h5.File('../data/target-batch-rms.h5', 'w')
 
@@ -40,6 +132,15 @@ assemblies = ['Fuel-1.6wo-CRD', \
 # The energy levels for the tallies
 energies = ['Low Energy', 'High Energy']
 
+# The scores for the reaction rate datasets, followed by the cross-sections
+# (ie, each reaction rate divided by the flux)
+scores = ['flux', 'total', 'absorption', 'fission', 'nu-fission']
+datasets = ['Flux', 'Tot. RXN Rate', 'Abs. RXN Rate', 'Fiss. RXN Rate', \
+            'NuFiss. RXN Rate', 'Tot. XS', 'Abs. XS', 'Fiss. XS', 'NuFiss. XS']
+
+# The path to the tally results in each statepoint
+path = 'tallies/tally1/'
+
 # Batch numbers of interest - 260 to 1240 in increments of 10
 batches = np.linspace(260,1240,99)
 rms_file.create_dataset('Batches', data=batches-250)
@@ -55,115 +156,79 @@ for assembly in assemblies:
     # Read in the converged tally results for this assembly
     directory = '../openmc-input/' + assembly + '/pinwise/'
     filename = 'statepoint.1250.h5'
-    conv_sp = StatePoint(directory + filename)
-    conv_sp.read_results()
-
-    # Extract 2D numpy arrays of the batch means for each type of tally
-    conv_flux = conv_sp.extract_results(1, 'flux')['mean']
-    conv_tot_rxn_rate = conv_sp.extract_results(1, 'total')['mean']
-    conv_abs_rxn_rate = conv_sp.extract_results(1, 'absorption')['mean']
-    conv_fiss_rxn_rate = conv_sp.extract_results(1, 'fission')['mean']
-    conv_nufiss_rxn_rate = conv_sp.extract_results(1, 'nu-fission')['mean']
-
-    # Reshape to grid with energy group as third index
-    conv_flux = np.reshape(conv_flux, (x, y, groups))
-    conv_tot_rxn_rate = np.reshape(conv_tot_rxn_rate, (x, y, groups))
-    conv_abs_rxn_rate = np.reshape(conv_abs_rxn_rate, (x, y, groups))
-    conv_fiss_rxn_rate = np.reshape(conv_fiss_rxn_rate, (x, y, groups))
-    conv_nufiss_rxn_rate = np.reshape(conv_nufiss_rxn_rate, (x, y, groups))
+    layout = read_layout(directory + filename)
 
-    # Compute group cross-sections for both energy groups
-    conv_tot_xs = np.nan_to_num(conv_tot_rxn_rate / conv_flux)
-    conv_abs_xs = np.nan_to_num(conv_abs_rxn_rate / conv_flux)
-    conv_fiss_xs = np.nan_to_num(conv_fiss_rxn_rate / conv_flux)
-    conv_nufiss_xs = np.nan_to_num(conv_nufiss_rxn_rate / conv_flux)
+    # Size the chunks of mesh rows from the sums read and the buffers needed
+    # for each row
+    row_size = y * groups * 8 * (layout[1] + len(datasets))
+    chunk_rows = budget.get_chunk_size(row_size, x)
+
+    # Preallocate the buffer for the converged values and the scratch buffer
+    # for each chunk of mesh rows, indexed by dataset, row, column and group
+    conv_values = np.zeros((len(datasets), x, y, groups))
+    values = np.zeros((len(datasets), chunk_rows, y, groups))
+
+    with profiling.timer('Read statepoints'):
+        sp_file = h5.File(directory + filename, 'r')
+
+        for start in range(0, x, chunk_rows):
+            stop = min(start + chunk_rows, x)
+            read_rows(sp_file, layout, start, stop,
+                      conv_values[:,start:stop])
+
+        sp_file.close()
+
+    budget.check('Read statepoints')
+
+    # The sum of the squared errors over the mesh for each batch, dataset and
+    # energy group
+    sq_errors = np.zeros((len(batches), len(datasets), groups))
+
+    # Loop over each batch
+    for batch in enumerate(batches):
+
+        print '    Batch-' + str(batch[0])
+
+        # Read in the tally results for this batch
+        filename = 'statepoint.' + str(int(batch[1])) + '.h5'
+        print directory + filename
+
+        sp_file = h5.File(directory + filename, 'r')
+
+        for start in range(0, x, chunk_rows):
+
+            stop = min(start + chunk_rows, x)
+            rows = stop - start
+
+            with profiling.timer('Read statepoints'):
+                read_rows(sp_file, layout, start, stop, values)
+
+            budget.check('Read statepoints')
+
+            # Compute the squared errors for each mesh cell between this
+            # batch mean and the converged values
+            with profiling.timer('Compute RMS errors'):
+                chunk = values[:,:rows]
+                chunk -= conv_values[:,start:stop]
+                chunk **= 2
+                sq_errors[batch[0]] += chunk.sum(axis=1).sum(axis=1)
+
+            budget.check('Compute RMS errors')
+
+        sp_file.close()
+
+    # Compute the RMS for each tally type over the mesh
+    rms = np.sqrt(sq_errors / (x * y))
 
     # Loop over energies (0 - low energy index, 1 - high energy index)
-    for energy in enumerate(energies):
-
-        flux_rms = np.zeros(len(batches))
-        tot_rxn_rate_rms = np.zeros(len(batches))
-        abs_rxn_rate_rms = np.zeros(len(batches))
-        fiss_rxn_rate_rms = np.zeros(len(batches))
-        nufiss_rxn_rate_rms = np.zeros(len(batches))
-        tot_xs_rms = np.zeros(len(batches))
-        abs_xs_rms = np.zeros(len(batches))
-        fiss_xs_rms = np.zeros(len(batches))
-        nufiss_xs_rms = np.zeros(len(batches))
-
-        energy_group = assembly_group.create_group(energy[1])
-
-        # Loop over each batch
-        for batch in enumerate(batches):
-
-            print '    Batch-' + str(batch[0])
-        
-            # Read in the tally results for this batch
-            filename = 'statepoint.' + str(int(batch[1])) + '.h5'
-            print directory + filename
-            sp = StatePoint(directory + filename)
-            sp.read_results()
-
-            # Get the batch, energy indices
-            b = batch[0]
-            e = energy[0]
-
-            # Extract 2D numpy arrays of the batch means for each type of tally
-            flux = sp.extract_results(1, 'flux')['mean']
-            tot_rxn_rate = sp.extract_results(1, 'total')['mean']
-            abs_rxn_rate = sp.extract_results(1, 'absorption')['mean']
-            fiss_rxn_rate = sp.extract_results(1, 'fission')['mean']
-            nufiss_rxn_rate = sp.extract_results(1, 'nu-fission')['mean']
-        
-            # Reshape to grid with energy group as third index
-            flux = np.reshape(flux, (x, y, groups))
-            tot_rxn_rate = np.reshape(tot_rxn_rate, (x, y, groups))
-            abs_rxn_rate = np.reshape(abs_rxn_rate, (x, y, groups))
-            fiss_rxn_rate = np.reshape(fiss_rxn_rate, (x, y, groups))
-            nufiss_rxn_rate = np.reshape(nufiss_rxn_rate, (x, y, groups))
-
-            # Compute group cross-sections for both energy groups
-            tot_xs = np.nan_to_num(tot_rxn_rate / flux)
-            abs_xs = np.nan_to_num(abs_rxn_rate / flux)
-            fiss_xs = np.nan_to_num(fiss_rxn_rate / flux)
-            nufiss_xs = np.nan_to_num(nufiss_rxn_rate / flux)
-        
-            # Compute RMS for each mesh cell between this batch mean and the 
-            # converged values
-            flux_sq = np.power(flux - conv_flux, 2)
-            tot_rxn_rate_sq = np.power(tot_rxn_rate - conv_tot_rxn_rate, 2)
-            abs_rxn_rate_sq = np.power(abs_rxn_rate - conv_abs_rxn_rate, 2)
-            fiss_rxn_rate_sq = np.power(fiss_rxn_rate - conv_fiss_rxn_rate, 2)
-            nufiss_rxn_rate_sq =np.power(nufiss_rxn_rate-conv_nufiss_rxn_rate,2)
-            tot_xs_sq = np.power(tot_xs - conv_tot_xs, 2)
-            abs_xs_sq = np.power(abs_xs - conv_abs_xs, 2)
-            fiss_xs_sq = np.power(fiss_xs - conv_fiss_xs, 2)
-            nufiss_xs_sq = np.power(nufiss_xs - conv_nufiss_xs, 2)
-
-            print '        ' + energy[1]
-
-            # Compute the RMS for each tally type
-            flux_rms[b] = np.sqrt(np.mean(flux_sq[:,:,e]))
-            tot_rxn_rate_rms[b] = np.sqrt(np.mean(tot_rxn_rate_sq[:,:,e]))
-            abs_rxn_rate_rms[b] = np.sqrt(np.mean(abs_rxn_rate_sq[:,:,e]))
-            fiss_rxn_rate_rms[b] = np.sqrt(np.mean(fiss_rxn_rate_sq[:,:,e]))
-            nufiss_rxn_rate_rms[b] = np.sqrt(np.mean(nufiss_rxn_rate_sq[:,:,e]))
-            tot_xs_rms[b] = np.sqrt(np.mean(tot_xs_sq[:,:,e]))
-            abs_xs_rms[b] = np.sqrt(np.mean(abs_xs_sq[:,:,e]))
-            fiss_xs_rms[b] = np.sqrt(np.mean(fiss_xs_sq[:,:,e]))
-            nufiss_xs_rms[b] = np.sqrt(np.mean(nufiss_xs_sq[:,:,e]))
+    for e, energy in enumerate(energies):
+
+        energy_group = assembly_group.create_group(energy)
 
         # Store the RMS to HDF5 as a dataset for this assembly, energy group
-        energy_group.create_dataset('Flux', data=flux_rms)
-        energy_group.create_dataset('Tot. RXN Rate', data=tot_rxn_rate_rms)
-        energy_group.create_dataset('Abs. RXN Rate', data=abs_rxn_rate_rms)
-        energy_group.create_dataset('Fiss. RXN Rate', data=fiss_rxn_rate_rms)
-        energy_group.create_dataset('NuFiss. RXN Rate',data=nufiss_rxn_rate_rms)
-        energy_group.create_dataset('Tot. XS', data=tot_xs_rms)
-        energy_group.create_dataset('Abs. XS', data=abs_xs_rms)
-        energy_group.create_dataset('Fiss. XS', data=fiss_xs_rms)
-        energy_group.create_dataset('NuFiss. XS', data=nufiss_xs_rms)
-
-
-# Close the HDF5 file handle      
+        for i, dataset in enumerate(datasets):
+            energy_group.create_dataset(dataset, data=rms[:,i,e])
+
+
+# Close the HDF5 file handle
 rms_file.close()
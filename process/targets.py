@@ -23,6 +23,14 @@ from statepoint import StatePoint
 import h5py as h5
 import numpy as np
 import os
+import sys
+
+sys.path.insert(0, '..')
+from cluster import profiling
+
+# Time reading and extracting the tallies from each statepoint
+profiling.instrument(StatePoint, ['__init__', 'read_results',
+                                  'extract_results'])
 
 # Remove old HDF5 target data file
 os.system('rm ../data/sample-targets.h5')
@@ -59,56 +67,63 @@ for assembly in assemblies:
     low_energy = assembly_group.create_group('Low Energy')
 
     # Import the OpenMC results for this assembly
-    sp = StatePoint('../openmc-input/'+assembly+'/pinwise/statepoint.1250.h5')
-    sp.read_results()
-
-    # Extract 2D numpy arrays of the batch means for each type of tally
-    flux = sp.extract_results(1, 'flux')['mean']
-    tot_rxn_rate = sp.extract_results(1, 'total')['mean']
-    abs_rxn_rate = sp.extract_results(1, 'absorption')['mean']
-    fiss_rxn_rate = sp.extract_results(1, 'fission')['mean']
-    nufiss_rxn_rate = sp.extract_results(1, 'nu-fission')['mean']
+    filename = '../openmc-input/'+assembly+'/pinwise/statepoint.1250.h5'
+    with profiling.timer('Read statepoints'):
+        sp = StatePoint(filename)
+        sp.read_results()
+
+        # Extract 2D numpy arrays of the batch means for each type of tally
+        flux = sp.extract_results(1, 'flux')['mean']
+        tot_rxn_rate = sp.extract_results(1, 'total')['mean']
+        abs_rxn_rate = sp.extract_results(1, 'absorption')['mean']
+        fiss_rxn_rate = sp.extract_results(1, 'fission')['mean']
+        nufiss_rxn_rate = sp.extract_results(1, 'nu-fission')['mean']
+        profiling.count('bytes read', os.path.getsize(filename))
 
     # Reshape to grid with energy group as third index
-    flux = np.reshape(flux, (x, y, groups))
-    tot_rxn_rate = np.reshape(tot_rxn_rate, (x, y, groups))
-    abs_rxn_rate = np.reshape(abs_rxn_rate, (x, y, groups))
-    fiss_rxn_rate = np.reshape(fiss_rxn_rate, (x, y, groups))
-    nufiss_rxn_rate = np.reshape(nufiss_rxn_rate, (x, y, groups))
-
-    # Compute group cross-sections for both energy groups
-    tot_xs = np.nan_to_num(tot_rxn_rate / flux)
-    abs_xs = np.nan_to_num(abs_rxn_rate / flux)
-    fiss_xs = np.nan_to_num(fiss_rxn_rate / flux)
-    nufiss_xs = np.nan_to_num(nufiss_rxn_rate / flux)
+    with profiling.timer('Compute cross-sections'):
+        flux = np.reshape(flux, (x, y, groups))
+        tot_rxn_rate = np.reshape(tot_rxn_rate, (x, y, groups))
+        abs_rxn_rate = np.reshape(abs_rxn_rate, (x, y, groups))
+        fiss_rxn_rate = np.reshape(fiss_rxn_rate, (x, y, groups))
+        nufiss_rxn_rate = np.reshape(nufiss_rxn_rate, (x, y, groups))
+
+        # Compute group cross-sections for both energy groups
+        tot_xs = np.nan_to_num(tot_rxn_rate / flux)
+        abs_xs = np.nan_to_num(abs_rxn_rate / flux)
+        fiss_xs = np.nan_to_num(fiss_rxn_rate / flux)
+        nufiss_xs = np.nan_to_num(nufiss_rxn_rate / flux)
 
     # Store all possible targets to the HDF5 file
-    high_energy.create_dataset('Flux', data=flux[:,:,0])
-    low_energy.create_dataset('Flux', data=flux[:,:,1])
+    with profiling.timer('Write targets'):
+        high_energy.create_dataset('Flux', data=flux[:,:,0])
+        low_energy.create_dataset('Flux', data=flux[:,:,1])
     
-    high_energy.create_dataset('Tot. RXN Rate', data=tot_rxn_rate[:,:,0])
-    low_energy.create_dataset('Tot. RXN Rate', data=tot_rxn_rate[:,:,1])
+        high_energy.create_dataset('Tot. RXN Rate', data=tot_rxn_rate[:,:,0])
+        low_energy.create_dataset('Tot. RXN Rate', data=tot_rxn_rate[:,:,1])
 
-    high_energy.create_dataset('Abs. RXN Rate', data=abs_rxn_rate[:,:,0])
-    low_energy.create_dataset('Abs. RXN Rate', data=abs_rxn_rate[:,:,1])
+        high_energy.create_dataset('Abs. RXN Rate', data=abs_rxn_rate[:,:,0])
+        low_energy.create_dataset('Abs. RXN Rate', data=abs_rxn_rate[:,:,1])
 
-    high_energy.create_dataset('Fiss. RXN Rate', data=fiss_rxn_rate[:,:,0])
-    low_energy.create_dataset('Fiss. RXN Rate', data=fiss_rxn_rate[:,:,1])
+        high_energy.create_dataset('Fiss. RXN Rate', data=fiss_rxn_rate[:,:,0])
+        low_energy.create_dataset('Fiss. RXN Rate', data=fiss_rxn_rate[:,:,1])
 
-    high_energy.create_dataset('NuFiss. RXN Rate', data=nufiss_rxn_rate[:,:,0])
-    low_energy.create_dataset('NuFiss. RXN Rate', data=nufiss_rxn_rate[:,:,1])
+        high_energy.create_dataset('NuFiss. RXN Rate',
+                                   data=nufiss_rxn_rate[:,:,0])
+        low_energy.create_dataset('NuFiss. RXN Rate',
+                                  data=nufiss_rxn_rate[:,:,1])
 
-    high_energy.create_dataset('Tot. XS', data=tot_xs[:,:,0])
-    low_energy.create_dataset('Tot. XS', data=tot_xs[:,:,1])
+        high_energy.create_dataset('Tot. XS', data=tot_xs[:,:,0])
+        low_energy.create_dataset('Tot. XS', data=tot_xs[:,:,1])
 
-    high_energy.create_dataset('Abs. XS', data=abs_xs[:,:,0])
-    low_energy.create_dataset('Abs. XS', data=abs_xs[:,:,1])
+        high_energy.create_dataset('Abs. XS', data=abs_xs[:,:,0])
+        low_energy.create_dataset('Abs. XS', data=abs_xs[:,:,1])
 
-    high_energy.create_dataset('Fiss. XS', data=fiss_xs[:,:,0])
-    low_energy.create_dataset('Fiss. XS', data=fiss_xs[:,:,1])
+        high_energy.create_dataset('Fiss. XS', data=fiss_xs[:,:,0])
+        low_energy.create_dataset('Fiss. XS', data=fiss_xs[:,:,1])
 
-    high_energy.create_dataset('NuFiss. XS', data=nufiss_xs[:,:,0])
-    low_energy.create_dataset('NuFiss. XS', data=nufiss_xs[:,:,1])
+        high_energy.create_dataset('NuFiss. XS', data=nufiss_xs[:,:,0])
+        low_energy.create_dataset('NuFiss. XS', data=nufiss_xs[:,:,1])
 
 # Close the HDF5 file
 f.close()
@@ -17,7 +17,8 @@
    polynomial kernels using the training data. Finally, the model is used
    to predict the target values for the test samples and the Root Mean Square
    (RMS) error with respect to the true target values is computed and reported
-   to the bash.
+   to the bash. An approximate RBF kernel model (a rank 500 Nystroem feature
+   map with ridge regression) is fit alongside the SVR models for comparison.
 '''
 
 import h5py as h5
@@ -26,6 +27,9 @@ import pylab as pl
 import math
 from sklearn.svm import SVR
 from sklearn.cross_validation import train_test_split
+from cluster import approximate
+from cluster import error_metrics
+from cluster import profiling
 
 
 
@@ -53,10 +57,13 @@ energy = 'High Energy'
 tally = 'Tot. XS'
 
 # Get target regression values for each sample
-targets = sample_file[batch][energy][tally]['Targets'][...]
-targets = [l[0] for l in targets]
-# Get the feature vectors for each sample
-features = sample_file[batch][energy][tally]['Features'][...]
+with profiling.timer('Read samples'):
+    targets = sample_file[batch][energy][tally]['Targets'][...]
+    profiling.count('bytes read', targets.nbytes)
+    targets = [l[0] for l in targets]
+    # Get the feature vectors for each sample
+    features = sample_file[batch][energy][tally]['Features'][...]
+    profiling.count('bytes read', features.nbytes)
 
 
 
@@ -65,8 +72,6 @@ features = sample_file[batch][energy][tally]['Features'][...]
 ################################################################################
 
 split = .33
-training = int((1-split)*len(features))
-testing = int(split*len(features))
 
 #### Split the data
 X_train, X_test, y_train, y_test = train_test_split(features, targets, \
@@ -80,13 +85,20 @@ X_train, X_test, y_train, y_test = train_test_split(features, targets, \
 ################################################################################
 
 #### Fit regression model
-svr_rbf = SVR(kernel='rbf', C=1e3, gamma=0.1)
-svr_lin = SVR(kernel='linear', C=1e3)
-svr_poly = SVR(kernel='poly', C=1e3, degree=2)
+with profiling.timer('Fit models'):
+    svr_rbf = SVR(kernel='rbf', C=1e3, gamma=0.1)
+    svr_lin = SVR(kernel='linear', C=1e3)
+    svr_poly = SVR(kernel='poly', C=1e3, degree=2)
 
-y_train_rbf = svr_rbf.fit(X_train, y_train).predict(X_train)
-y_train_lin = svr_lin.fit(X_train, y_train).predict(X_train)
-y_train_poly = svr_poly.fit(X_train, y_train).predict(X_train)
+    y_train_rbf = svr_rbf.fit(X_train, y_train).predict(X_train)
+    y_train_lin = svr_lin.fit(X_train, y_train).predict(X_train)
+    y_train_poly = svr_poly.fit(X_train, y_train).predict(X_train)
+
+    #### Fit the approximate RBF kernel model
+    rbf_nys = approximate.ApproximateKernelRidge(method='nystroem', \
+                                                 n_components=500, gamma=0.1)
+    y_train_nys = rbf_nys.fit(X_train, y_train).predict(X_train)
+    profiling.count('samples', len(y_train))
 
 
 
@@ -95,52 +107,39 @@ y_train_poly = svr_poly.fit(X_train, y_train).predict(X_train)
 ################################################################################
 
 #### Make predictions based on the models
-y_test_rbf = svr_rbf.predict(X_test)
-y_test_lin = svr_lin.predict(X_test)
-y_test_poly = svr_poly.predict(X_test)
+with profiling.timer('Predict'):
+    y_test_rbf = svr_rbf.predict(X_test)
+    y_test_lin = svr_lin.predict(X_test)
+    y_test_poly = svr_poly.predict(X_test)
+    y_test_nys = rbf_nys.predict(X_test)
+    profiling.count('samples', len(y_test))
 
 
 ################################################################################
 ##########################    TRAINING/TESTING ERROR   #########################
 ################################################################################
 
-#### Calculate training and testing error
-error_train_rbf=0
-error_train_lin=0
-error_train_poly=0
-
-for i in range(training):
-    diff_train_rbf = y_train_rbf[i] - y_train[i]
-    diff_train_lin = y_train_lin[i] - y_train[i]
-    diff_train_poly = y_train_poly[i] - y_train[i]
-    error_train_rbf = error_train_rbf + diff_train_rbf*diff_train_rbf
-    error_train_lin = error_train_lin + diff_train_lin*diff_train_lin
-    error_train_poly = error_train_poly + diff_train_poly*diff_train_poly
-
-error_train_rbf = np.sqrt(error_train_rbf/training)
-error_train_lin = np.sqrt(error_train_lin/training)
-error_train_poly = np.sqrt(error_train_poly/training)
-
-error_test_rbf=0
-error_test_lin=0
-error_test_poly=0
-
-for i in range(testing):
-    diff_test_rbf = y_test_rbf[i] - y_test[i]
-    diff_test_lin = y_test_lin[i] - y_test[i]
-    diff_test_poly = y_test_poly[i] - y_test[i]
-    error_test_rbf = error_test_rbf + diff_test_rbf*diff_test_rbf
-    error_test_lin = error_test_lin + diff_test_lin*diff_test_lin
-    error_test_poly = error_test_poly + diff_test_poly*diff_test_poly
-
-error_test_rbf = np.sqrt(error_test_rbf/testing)
-error_test_lin = np.sqrt(error_test_lin/testing)
-error_test_poly = np.sqrt(error_test_poly/testing)
+#### Calculate training and testing error for all of the models at once
+with profiling.timer('Compute errors'):
+    train_predictions = np.vstack((y_train_rbf, y_train_lin, y_train_poly, \
+                                   y_train_nys))
+    test_predictions = np.vstack((y_test_rbf, y_test_lin, y_test_poly, \
+                                  y_test_nys))
+
+    train_errors = error_metrics.compute_errors(train_predictions, y_train)
+    test_errors = error_metrics.compute_errors(test_predictions, y_test)
+
+    error_train_rbf, error_train_lin, error_train_poly, error_train_nys = \
+        train_errors['rms']
+    error_test_rbf, error_test_lin, error_test_poly, error_test_nys = \
+        test_errors['rms']
 
 print 'RBF kernel training error is %f' % (error_train_rbf)
 print 'Linear kernel training error is %f' % (error_train_lin)
 print 'Polynomial, 2nd degree, training error is %f' % (error_train_poly)
+print 'Nystroem RBF kernel training error is %f' % (error_train_nys)
 
 print 'RBF kernel testing error is %f' % (error_test_rbf)
 print 'Linear kernel testing error is %f' % (error_test_lin)
 print 'Polynomial, 2nd degree, testing error is %f' % (error_test_poly)
+print 'Nystroem RBF kernel testing error is %f' % (error_test_nys)
@@ -0,0 +1,253 @@
+'''Incrementally reads the tallies from a series of OpenMC statepoint files.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from series import StatePointSeries"
+
+   OpenMC writes a 'statepoint.<batch>.h5' file to the run directory for each
+   batch (or each statepoint interval) of a simulation. The StatePoint class
+   in statepoint.py parses all of the metadata, meshes and tallies in a file,
+   which is wasteful when the same tallies are plotted from hundreds of
+   consecutive statepoints of the same run.
+
+   The StatePointSeries class reads the tally layout (the scores and the
+   number of filter and score bins) from the first statepoint only, and then
+   reads just the number of realizations and the columns of the tally results
+   for the requested scores from each statepoint. The watch method polls the
+   run directory for new statepoints as they are written by a running
+   simulation, such that a plot can be updated as soon as each batch is
+   complete. The directory is polled (rather than watched with inotify) since
+   a directory listing every second is cheap and polling also works on the
+   network filesystems of the compute nodes.
+'''
+
+import os
+import re
+import time
+
+import numpy as np
+import scipy.stats
+import h5py as h5
+
+from statepoint import score_types
+
+
+# The filenames of the HDF5 statepoints written by OpenMC
+STATEPOINT_PATTERN = re.compile('^statepoint\.([0-9]+)\.h5$')
+
+
+class StatePointSeries:
+    '''The StatePointSeries class.
+
+       This class reads the mean and 95% confidence interval for one or more
+       scores of a tally from each statepoint of a simulation.
+    '''
+
+    def __init__(self, directory, scores, tally_id=1):
+        '''Initialize the StatePointSeries class.
+
+           Takes in the directory with the statepoint files, the score(s) to
+           read (ie, 'fission' or ['fission', 'total']) and the ID of the
+           tally (its position in the statepoint, as in
+           StatePoint.extract_results).
+        '''
+
+        if isinstance(scores, str):
+            scores = [scores]
+
+        self._directory = directory
+        self._scores = list(scores)
+        self._tally_id = tally_id
+        self._path = 'tallies/tally' + str(tally_id) + '/'
+
+        # The tally layout is read from the first statepoint
+        self._columns = None
+        self._num_score_bins = None
+        self._num_filter_bins = None
+        self._num_batches = None
+
+        # The last batch read by the watch method
+        self._last_batch = None
+
+
+    def get_filename(self, batch):
+        '''Returns the statepoint filename for a batch.'''
+
+        return os.path.join(self._directory, 'statepoint.' + str(batch) + '.h5')
+
+
+    def get_batches(self):
+        '''Returns a sorted list of the batches with a statepoint file.'''
+
+        batches = []
+
+        for filename in os.listdir(self._directory):
+            match = STATEPOINT_PATTERN.match(filename)
+
+            if match is not None:
+                batches.append(int(match.group(1)))
+
+        return sorted(batches)
+
+
+    def get_num_batches(self):
+        '''Returns the total number of batches in the simulation, or None if
+           no statepoint has been read yet.'''
+
+        return self._num_batches
+
+
+    def get_num_filter_bins(self):
+        '''Returns the number of filter bins (ie, mesh cells x energy groups)
+           in the tally, or None if no statepoint has been read yet.'''
+
+        return self._num_filter_bins
+
+
+    def _read_layout(self, sp_file):
+        '''Reads the tally's score columns from an open statepoint file.'''
+
+        score_bins = np.ravel(sp_file[self._path + 'score_bins'][...])
+        tally_scores = [score_types[score] for score in score_bins]
+
+        columns = []
+
+        for score in self._scores:
+            if score not in tally_scores:
+                raise Exception('Unable to read score ' + score + ' which ' + \
+                                'is not in tally ' + str(self._tally_id) + \
+                                ' with scores ' + str(tally_scores))
+
+            columns.append(tally_scores.index(score))
+
+        path = self._path
+        self._num_score_bins = int(sp_file[path + 'total_score_bins'][0])
+        self._num_filter_bins = int(sp_file[path + 'total_filter_bins'][0])
+        self._num_batches = int(sp_file['n_batches'][0])
+        self._columns = columns
+
+
+    def read(self, batch):
+        '''Returns the results for each score from one batch's statepoint.
+
+           The results are returned as a dictionary indexed by score with the
+           mean and the relative 95% confidence interval (as for
+           StatePoint.extract_results) for each filter bin.
+        '''
+
+        sp_file = h5.File(self.get_filename(batch), 'r')
+
+        try:
+            if self._columns is None:
+                self._read_layout(sp_file)
+
+            num_realizations = int(sp_file[self._path + 'n_realizations'][0])
+            dataset = sp_file[self._path + 'results']
+
+            # Only read the (strided) columns for the requested scores
+            columns = []
+
+            for column in self._columns:
+                if dataset.ndim == 2:
+                    columns.append(dataset[:,column])
+                else:
+                    columns.append(dataset[column::self._num_score_bins])
+        finally:
+            sp_file.close()
+
+        n = num_realizations
+        t_value = scipy.stats.t.ppf(0.975, n - 1)
+        results = {}
+
+        for score, data in zip(self._scores, columns):
+
+            if data.shape[0] != self._num_filter_bins:
+                raise Exception('Unable to read ' + score + ' from ' + \
+                                'batch ' + str(batch) + ' which has ' + \
+                                str(data.shape[0]) + ' filter bins rather ' + \
+                                'than ' + str(self._num_filter_bins))
+
+            mean = data['sum'] / n
+
+            # Bins without any scores have an undefined uncertainty
+            with np.errstate(divide='ignore', invalid='ignore'):
+                uncertainty = data['sum_sq'] / n - mean * mean
+                uncertainty = t_value * np.sqrt(uncertainty / (n-1)) / mean
+
+            results[score] = {'mean': mean, 'CI95': uncertainty}
+
+        return results
+
+
+    def _is_complete(self, batch):
+        '''Returns whether a statepoint file can be read yet.'''
+
+        try:
+            sp_file = h5.File(self.get_filename(batch), 'r')
+        except IOError:
+            return False
+
+        try:
+            return self._path + 'results' in sp_file
+        finally:
+            sp_file.close()
+
+
+    def watch(self, start=None, stop=None, interval=1, poll_interval=1.,
+              timeout=None):
+        '''Yields a list of (batch, results) for the new statepoints found
+           each time the directory is polled.
+
+           The directory is polled every poll_interval seconds for statepoints
+           newer than the last one read, from the start batch (the first
+           statepoint by default) to the stop batch (the final batch of the
+           simulation by default) at every interval batches. All of the new
+           statepoints are read at once, such that a slow consumer catches up
+           with the simulation rather than falling behind. A statepoint which
+           is still being written is retried at the next poll. The generator
+           stops after the stop batch, or if no new statepoint is written for
+           timeout seconds.
+        '''
+
+        last_time = time.time()
+
+        while True:
+
+            batches = self.get_batches()
+            new_results = []
+            done = False
+
+            if self._last_batch is not None:
+                batches = [b for b in batches if b > self._last_batch]
+
+            for batch in batches:
+
+                # Start at the first statepoint if no start batch is given
+                if start is None:
+                    start = batch
+                if batch < start or (batch-start) % interval != 0:
+                    continue
+
+                if not self._is_complete(batch):
+                    break
+
+                new_results.append((batch, self.read(batch)))
+                self._last_batch = batch
+
+                if stop is None:
+                    stop = self._num_batches
+                if batch >= stop:
+                    done = True
+                    break
+
+            if len(new_results) > 0:
+                last_time = time.time()
+                yield new_results
+
+            if done:
+                return
+
+            if timeout is not None and time.time() - last_time > timeout:
+                return
+
+            time.sleep(poll_interval)
@@ -0,0 +1,209 @@
+'''A figure of tally means and uncertainties which is updated in place.
+
+   Date: 10/19/2026
+
+   Usage: Prepend to Python script - "from tallyfigure import TallyFigure"
+
+   The TallyFigure class plots the mesh of means for two tally scores in one
+   energy group in the top row, and the maximum relative 95% confidence
+   interval of each score (along with its ideal 1/sqrt(N) convergence) versus
+   batch in the bottom row. The image and line artists are created once and
+   their data is replaced for each new batch. When drawing to an interactive
+   backend, only the artists are redrawn on top of a cached copy of each
+   axes' background (blitting). The background is only redrawn when the
+   color scale or axes limits need to change.
+'''
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+class TallyFigure:
+    '''The TallyFigure class.
+
+       This class draws the means and convergence of two tally scores and
+       updates them for each new batch.
+    '''
+
+    def __init__(self, scores, energy, mesh_shape, num_groups, batch_start,
+                 batch_stop=None, figure=None):
+        '''Initialize the TallyFigure class.
+
+           Takes in the two scores to plot, the energy group (1 or 2), the
+           (x, y) shape of the tally mesh, the number of energy groups and
+           the first batch. If the last batch is given, the batch axes span
+           all of the batches from the start, such that they never need to
+           be rescaled. A new matplotlib figure is created unless one is
+           given.
+        '''
+
+        if figure is None:
+            figure = plt.figure(dpi=160)
+            figure.set_size_inches(18,10)
+
+        self._scores = list(scores)
+        self._energy = energy
+        self._shape = tuple(mesh_shape) + (num_groups,)
+        self._batch_start = batch_start
+        self._batch_stop = batch_stop
+        self._figure = figure
+
+        self._images = []
+        self._lines = []
+        self._axes = []
+        self._backgrounds = None
+        self._redraw = True
+
+        self._batches = []
+        self._std_devs = [[] for score in self._scores]
+        self._ideals = [[] for score in self._scores]
+
+        # Plot each tally's means in the top row
+        for i, score in enumerate(self._scores):
+            axes = figure.add_subplot(2, 2, i+1)
+            image = axes.imshow(np.zeros(mesh_shape), interpolation='nearest',
+                                animated=True)
+            figure.colorbar(image, ax=axes)
+            axes.set_title(str.capitalize(score))
+            self._axes.append(axes)
+            self._images.append(image)
+
+        # Plot each tally's uncertainty in the bottom row
+        for i, score in enumerate(self._scores):
+            axes = figure.add_subplot(2, 2, i+3)
+            sample, = axes.plot([], [], animated=True, color='blue')
+            ideal, = axes.plot([], [], animated=True, color='green')
+            axes.set_xlabel('Batch #')
+            axes.set_ylabel('Std. Dev.')
+            axes.legend(['Sample', 'Ideal'])
+            axes.set_title(str.capitalize(score + ' Std. Dev.'))
+            self._axes.append(axes)
+            self._lines.append((sample, ideal))
+
+
+    def get_figure(self):
+        '''Returns the matplotlib figure.'''
+
+        return self._figure
+
+
+    def _get_artists(self):
+        '''Returns a list of the artists in each axes.'''
+
+        return [[image] for image in self._images] + \
+               [list(lines) for lines in self._lines]
+
+
+    def update(self, batch, results):
+        '''Replaces the artists' data with the results for a new batch.
+
+           The results are a dictionary of the mean and CI95 for each score
+           (as returned by StatePointSeries.read). The batches must be given
+           in increasing order.
+        '''
+
+        self._batches.append(batch)
+
+        for i, score in enumerate(self._scores):
+
+            means = np.reshape(results[score]['mean'], self._shape)
+            means = means[:,:,self._energy-1]
+            std_dev = np.nan_to_num(results[score]['CI95'])
+            std_dev = np.reshape(std_dev, self._shape)
+            std_dev = np.max(std_dev[:,:,self._energy-1])
+
+            # The ideal uncertainty decreases as 1/sqrt(N) from the first
+            if batch > self._batch_start and len(self._std_devs[i]) > 0:
+                ideal = self._std_devs[i][0] / \
+                        np.sqrt(batch - self._batch_start)
+            else:
+                ideal = std_dev
+
+            self._std_devs[i].append(std_dev)
+            self._ideals[i].append(ideal)
+
+            # Widen the color scale if the means fall outside of it
+            image = self._images[i]
+            vmin, vmax = image.get_clim()
+
+            if len(self._batches) == 1 or means.min() < vmin or \
+               means.max() > vmax:
+                image.set_clim(means.min(), means.max())
+                self._redraw = True
+
+            image.set_data(means)
+
+            sample_line, ideal_line = self._lines[i]
+            sample_line.set_data(self._batches, self._std_devs[i])
+            ideal_line.set_data(self._batches, self._ideals[i])
+
+            self._update_limits(self._axes[i+len(self._scores)],
+                                max(std_dev, ideal))
+
+
+    def _update_limits(self, axes, value):
+        '''Extends an uncertainty axes' limits to the latest batch/value.'''
+
+        batch = self._batches[-1]
+        x_min, x_max = axes.get_xlim()
+        y_min, y_max = axes.get_ylim()
+
+        if len(self._batches) == 1:
+            x_min, x_max = self._batch_start, self._batch_stop
+            if x_max is None or x_max <= x_min:
+                x_max = x_min + 1
+            y_min, y_max = 0., 1.1 * value
+            self._redraw = True
+
+        # Double the batch range rather than rescale for every batch
+        if batch > x_max:
+            x_max = x_min + 2 * (batch - x_min)
+            self._redraw = True
+
+        if value > y_max:
+            y_max = 1.1 * value
+            self._redraw = True
+
+        axes.set_xlim(x_min, x_max)
+        axes.set_ylim(y_min, y_max)
+
+
+    def draw(self, blit=True):
+        '''Draws the figure with the latest data.
+
+           If blit is True (and the canvas supports it), only the artists are
+           redrawn over each axes' cached background unless the backgrounds
+           need to change. Otherwise the whole figure is drawn, as is needed
+           for non-interactive backends which save each frame to a file.
+        '''
+
+        canvas = self._figure.canvas
+        blit = blit and getattr(canvas, 'supports_blit', True) and \
+               hasattr(canvas, 'copy_from_bbox')
+
+        if not blit:
+            for image in self._images:
+                image.set_animated(False)
+            for lines in self._lines:
+                for line in lines:
+                    line.set_animated(False)
+            canvas.draw()
+            return
+
+        # Redraw and cache the backgrounds without the animated artists
+        if self._redraw or self._backgrounds is None:
+            canvas.draw()
+            self._backgrounds = [canvas.copy_from_bbox(axes.bbox)
+                                 for axes in self._axes]
+            self._redraw = False
+
+        for axes, background, artists in zip(self._axes, self._backgrounds,
+                                             self._get_artists()):
+            canvas.restore_region(background)
+
+            for artist in artists:
+                axes.draw_artist(artist)
+
+            canvas.blit(axes.bbox)
+
+        canvas.flush_events()
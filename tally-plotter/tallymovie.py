@@ -0,0 +1,151 @@
+'''Renders a movie of tally convergence from a series of statepoints.
+
+   Date: 10/19/2026
+
+   Usage: python tallymovie.py [--start 260] [--stop 1250] [--interval 10]
+                               [--jobs -1] [--movie movie.mp4]
+
+   This script renders the same plots as tallyplotter.py (the means of two
+   scores and the convergence of their uncertainties) for each batch to PNG
+   frames without a display, such that convergence movies can be made on the
+   compute nodes. Matplotlib's non-interactive Agg backend is used, and the
+   batches are split into one contiguous range per worker process. Each
+   worker creates a single TallyFigure and updates its data for each frame
+   rather than creating a new figure for each batch. Since only the plotted
+   score columns are read from each statepoint (see series.py), each worker
+   cheaply replays the statepoints before its range to rebuild the
+   uncertainty curves up to its first frame.
+
+   The frames are written to '<frames>/frame.<index>.png' and, if a movie
+   filename is given, encoded to a video with ffmpeg.
+'''
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import time
+
+# Use a non-interactive backend before pyplot is imported
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from series import StatePointSeries
+from tallyfigure import TallyFigure
+
+
+################################################################################
+####################################  OPTIONS  #################################
+################################################################################
+
+parser = argparse.ArgumentParser(description='Render tally convergence ' + \
+                                 'frames and movies from statepoints.')
+parser.add_argument('--directory', default='../openmc-input/Fuel-1.6wo-CRD/' + \
+                    'pinwise/', help='The directory with the statepoints')
+parser.add_argument('--scores', nargs=2, default=['fission', 'total'],
+                    help='The two scores to plot')
+parser.add_argument('--energy', type=int, default=2,
+                    help='The energy group to plot (1 or 2)')
+parser.add_argument('--groups', type=int, default=2,
+                    help='The number of energy groups')
+parser.add_argument('--mesh', type=int, nargs=2, default=[17, 17],
+                    help='The x and y dimensions of the tally mesh')
+parser.add_argument('--start', type=int, default=260,
+                    help='The first batch to render')
+parser.add_argument('--stop', type=int, default=1250,
+                    help='The last batch to render')
+parser.add_argument('--interval', type=int, default=10,
+                    help='The number of batches between frames')
+parser.add_argument('--jobs', type=int, default=-1,
+                    help='The number of worker processes (-1 for all cores)')
+parser.add_argument('--frames', default='frames',
+                    help='The directory for the PNG frames')
+parser.add_argument('--dpi', type=int, default=80,
+                    help='The resolution of each frame')
+parser.add_argument('--movie', default=None,
+                    help='The video file to encode the frames to')
+parser.add_argument('--fps', type=int, default=10,
+                    help='The frames per second of the video')
+args = parser.parse_args()
+
+if args.jobs == -1:
+    args.jobs = multiprocessing.cpu_count()
+
+
+################################################################################
+##################################  RENDERING  #################################
+################################################################################
+
+def get_frame_filename(index):
+    '''Returns the PNG filename for a frame.'''
+
+    return os.path.join(args.frames, 'frame.%05d.png' % index)
+
+
+def render_frames(frames):
+    '''Renders a contiguous range of frames with one figure.
+
+       Takes in a list of (index, batch) tuples for the frames to render and
+       returns the number of frames rendered.
+    '''
+
+    series = StatePointSeries(args.directory, args.scores)
+    figure = TallyFigure(args.scores, args.energy, args.mesh, args.groups,
+                         args.start, args.stop)
+
+    # Rebuild the uncertainty curves from the batches before this range
+    first_batch = frames[0][1]
+
+    for batch in range(args.start, first_batch, args.interval):
+        figure.update(batch, series.read(batch))
+
+    for index, batch in frames:
+        figure.update(batch, series.read(batch))
+        figure.draw(blit=False)
+        figure.get_figure().savefig(get_frame_filename(index), dpi=args.dpi)
+
+    plt.close(figure.get_figure())
+
+    return len(frames)
+
+
+if __name__ == '__main__':
+
+    if not os.path.exists(args.frames):
+        os.makedirs(args.frames)
+
+    batches = range(args.start, args.stop+args.interval, args.interval)
+    frames = list(enumerate(batches))
+
+    # Split the frames into one contiguous range per worker
+    num_jobs = max(min(args.jobs, len(frames)), 1)
+    size = (len(frames) + num_jobs - 1) // num_jobs
+    ranges = [frames[i:i+size] for i in range(0, len(frames), size)]
+
+    start_time = time.time()
+
+    if num_jobs == 1:
+        num_frames = sum(map(render_frames, ranges))
+    else:
+        pool = multiprocessing.Pool(num_jobs)
+        num_frames = sum(pool.map(render_frames, ranges))
+        pool.close()
+        pool.join()
+
+    seconds = time.time() - start_time
+    print 'Rendered %d frames in %0.2f sec (%0.2f frames/sec)' % \
+        (num_frames, seconds, num_frames / seconds)
+
+    # Encode the frames to a video
+    if args.movie is not None:
+        command = ['ffmpeg', '-y', '-framerate', str(args.fps),
+                   '-i', os.path.join(args.frames, 'frame.%05d.png'),
+                   '-pix_fmt', 'yuv420p', args.movie]
+
+        try:
+            subprocess.check_call(command)
+            print 'Encoded ' + args.movie
+        except OSError:
+            print 'Unable to encode ' + args.movie + ' since ffmpeg ' + \
+                  'was not found; the frames are in ' + args.frames
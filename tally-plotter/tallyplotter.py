@@ -1,5 +1,5 @@
-from statepoint import StatePoint
-import numpy as np
+from series import StatePointSeries
+from tallyfigure import TallyFigure
 import matplotlib.pyplot as plt
 import time
 
@@ -9,6 +9,14 @@ batch_start = 260
 batch_stop = 1250
 batch_interval = 10
 
+# Set live to True to monitor a running simulation. The directory is polled
+# every poll_interval seconds for new statepoints, and the plots are updated
+# as each one is written until batch_stop (or until no new statepoint is
+# written for timeout seconds).
+live = False
+poll_interval = 1.    # seconds
+timeout = 600.        # seconds
+
 directory = '../openmc-input/Fuel-1.6wo-CRD/pinwise/'
 #directory = '../openmc-input/Fuel-2.4wo-16BA-grid-56/pinwise/'
 #directory = '../openmc-input/Fuel-3.1wo-instr-16BA-grid-17/pinwise/'
@@ -22,7 +30,7 @@ score1 = 'fission'
 score2 = 'total'
 
 # energy options are 1 or 2
-energy = 2         
+energy = 2
 num_groups = 2
 
 # Mesh is 17x17 or 51x51
@@ -31,120 +39,47 @@ mesh_y_dim = 17
 
 
 ################################################################################
-# Create plot of initial data to start animation
+# Create the figure to start animation
 ################################################################################
 
-# Instantiate statepoint for the first batch of tally data
-print directory + 'statepoint.' + str(batch_start) + '.h5'
-sp = StatePoint(directory + 'statepoint.' + str(batch_start) + '.h5')
-sp.read_results()
-tallyid = 1
-tally1_data = sp.extract_results(tallyid, score1)
-tally2_data = sp.extract_results(tallyid, score2)
-
-tally1_means = tally1_data['mean']
-tally1_std_dev = np.nan_to_num(tally1_data['CI95'])
-tally2_means = tally2_data['mean']
-tally2_std_dev = np.nan_to_num(tally2_data['CI95'])
-
-# Reshape to grid with energy as third index
-tally1_means = np.reshape(tally1_means,(mesh_x_dim, mesh_y_dim, num_groups))
-tally1_std_dev = np.reshape(tally1_std_dev,(mesh_x_dim, mesh_y_dim, num_groups))
-tally2_means = np.reshape(tally2_means,(mesh_x_dim, mesh_y_dim, num_groups))
-tally2_std_dev = np.reshape(tally2_std_dev,(mesh_x_dim, mesh_y_dim, num_groups))
-
-# Instantiate a PyPlot figure and turn on Matplotlib's interactive mode
-fig = plt.figure(num=1,dpi=160)
-fig.set_size_inches(18,10)
+# Only the two scores are read from each statepoint
+series = StatePointSeries(directory, [score1, score2], tally_id=1)
+
+# Turn on Matplotlib's interactive mode and create the subplots once. Each
+# batch only replaces the data in the images and lines, which are blitted
+# onto the figure.
 plt.ion()
+figure = TallyFigure([score1, score2], energy, (mesh_x_dim, mesh_y_dim),
+                     num_groups, batch_start, batch_stop)
+plt.show()
+
+
+################################################################################
+# Update the plots for each batch
+################################################################################
+
+if live:
+
+    # Update the plots with all new statepoints and draw once per poll
+    for new_results in series.watch(start=batch_start, stop=batch_stop,
+                                    interval=batch_interval,
+                                    poll_interval=poll_interval,
+                                    timeout=timeout):
+
+        for batch, results in new_results:
+            figure.update(batch, results)
+
+        print 'Plotted batch ' + str(batch)
+        figure.draw()
+
+else:
+
+    # Iterate over all batches
+    for batch in range(batch_start, batch_stop+batch_interval, batch_interval):
+
+        print series.get_filename(batch)
+        figure.update(batch, series.read(batch))
 
-# Plot tally1 in top left corner
-plt.subplot(121)
-img = plt.imshow(tally1_means[:,:,energy-1], interpolation='nearest', animated=True)
-plt.colorbar()
-plt.title(str.capitalize(score1))
-
-# Plot tally2 in top right corner
-plt.subplot(122)
-img = plt.imshow(tally2_means[:,:,energy-1], interpolation='nearest', animated=True)
-plt.colorbar()
-plt.title(str.capitalize(score2))
-
-# Plot tally1 std dev in lower left corner
-plt.subplot(223)
-batches = [batch_start]
-std_dev_tally1 = [np.max(tally1_std_dev[:,:,energy-1])]
-std_dev_tally1_ideal = [std_dev_tally1[0]]
-plt.plot(batches, std_dev_tally1, animated=True, color='blue')
-plt.plot(batches, std_dev_tally1_ideal, animated=True, color='green')
-plt.xlabel('Batch #')
-plt.ylabel('Std. Dev')
-plt.legend(['Sample', 'Ideal'])
-plt.title(str.capitalize(score1 + 'Std. Dev.'))
-
-# Plot tally2 std dev in lower right corner
-plt.subplot(224)
-std_dev_tally2 = [np.max(tally2_std_dev[:,:,energy-1])]
-std_dev_tally2_ideal = [std_dev_tally2[0]]
-plt.plot(batches, std_dev_tally2, animated=True, color='blue')
-plt.plot(batches, std_dev_tally2_ideal, animated=True, color='green')
-plt.xlabel('Batch #')
-plt.ylabel('Std. Dev.')
-plt.legend(['Sample', 'Ideal'])
-plt.title(str.capitalize(score1 + 'Std. Dev.'))
-
-# Draw all of the subplots and sleep
-plt.draw()
-time.sleep(sleep_interval)
-
-# Iterate over all batches
-for batch in range(batch_start+batch_interval, batch_stop+batch_interval, batch_interval):
-    
-    # Instantiate statepoint for the this batch of tally data
-    sp = StatePoint(directory+'statepoint.' + str(batch) + '.h5')
-    sp.read_results()
-    tallyid = 1
-    tally1_data = sp.extract_results(tallyid, score1)
-    tally2_data = sp.extract_results(tallyid, score2)
-
-    tally1_means = tally1_data['mean']
-    tally1_std_dev = np.nan_to_num(tally1_data['CI95'])
-    tally2_means = tally2_data['mean']
-    tally2_std_dev = np.nan_to_num(tally2_data['CI95'])
-
-    # Reshape to grid with energy as third index
-    tally1_means = np.reshape(tally1_means,(mesh_x_dim, mesh_y_dim, num_groups))
-    tally1_std_dev = np.reshape(tally1_std_dev,(mesh_x_dim, mesh_y_dim, num_groups))
-    tally2_means = np.reshape(tally2_means,(mesh_x_dim, mesh_y_dim, num_groups))
-    tally2_std_dev = np.reshape(tally2_std_dev,(mesh_x_dim, mesh_y_dim, num_groups))
-    
-    # Plot tally1 in top left corner
-    plt.subplot(221)
-    plt.imshow(tally1_means[:,:,energy-1], interpolation='nearest')
-    plt.title(str.capitalize(score1))
-
-    # Plot tally2 in top right corner
-    plt.subplot(222)
-    plt.imshow(tally2_means[:,:,energy-1], interpolation='nearest')
-    plt.title(str.capitalize(score2))
-
-    # Plot tally1 std dev in lower left corner
-    plt.subplot(223)
-    batches.append(batch)
-    std_dev_tally1.append(np.max(tally1_std_dev[:,:,energy-1]))
-    std_dev_tally1_ideal.append(std_dev_tally1[0] / np.sqrt(batch-batch_start))
-    plt.plot(batches, std_dev_tally1, color='blue')
-    plt.plot(batches, std_dev_tally1_ideal, color='green')
-    plt.title(str.capitalize(score1 + 'Std. Dev.'))
-
-    # Plot tally2 std dev in lower right corner
-    plt.subplot(224)
-    std_dev_tally2.append(np.max(tally2_std_dev[:,:,energy-1]))
-    std_dev_tally2_ideal.append(std_dev_tally2[0] / np.sqrt(batch-batch_start))
-    plt.plot(batches, std_dev_tally2, color='blue')
-    plt.plot(batches, std_dev_tally2_ideal, color='green')
-    plt.title(str.capitalize(score2 + ' Std. Dev.'))
-
-    # Update all of the subplots and sleep
-    plt.draw()
-    time.sleep(sleep_interval)
+        # Update all of the subplots and sleep
+        figure.draw()
+        time.sleep(sleep_interval)
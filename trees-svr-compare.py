@@ -18,6 +18,11 @@
    samples. The Root Mean Square (RMS) error with respect to the true target 
    values is computed and reported to the bash for each model. Plots of the RMS
    error for each model at each batch are generated and displayed.
+
+   In addition to the exact SVR models, an approximate RBF SVR (random Fourier
+   features fit by SGD) is warm-started from one batch to the next, since the
+   features change smoothly with the number of batches. The number of SGD
+   epochs needed for each batch is reported alongside its testing error.
 '''
 
 import h5py as h5
@@ -26,6 +31,9 @@ import pylab as pl
 from sklearn import tree
 from sklearn.svm import SVR
 from sklearn.cross_validation import train_test_split
+from cluster import approximate
+from cluster import error_metrics
+from cluster import profiling
 
 
 
@@ -65,17 +73,25 @@ error_test_tree2=[0 for batch in Batches]
 error_test_rbf=[0 for batch in Batches]
 error_test_lin=[0 for batch in Batches]
 error_test_poly=[0 for batch in Batches]
+error_test_warm=[0 for batch in Batches]
+epochs_warm=[0 for batch in Batches]
 count = 0
 
+# The approximate RBF SVR carries its weights from one batch to the next
+svr_warm = approximate.ApproximateSVR(C=1e3, gamma=0.1, warm_start=True)
+
 # Loop over all batches
 for batch in Batches:
 
     # Get target regression values for each sample
-    targets = sample_file[batch][energy][tally]['Targets'][...]
-    targets = [l[0] for l in targets]
+    with profiling.timer('Read samples'):
+        targets = sample_file[batch][energy][tally]['Targets'][...]
+        profiling.count('bytes read', targets.nbytes)
+        targets = [l[0] for l in targets]
 
-    # Get the feature vectors for each sample
-    features = sample_file[batch][energy][tally]['Features'][...]
+        # Get the feature vectors for each sample
+        features = sample_file[batch][energy][tally]['Features'][...]
+        profiling.count('bytes read', features.nbytes)
 
 
     ############################################################################
@@ -83,8 +99,6 @@ for batch in Batches:
     ############################################################################
 
     split = .33
-    training = int((1-split)*len(features))
-    testing = int(split*len(features))
 
     #### Split the data
     X_train, X_test, y_train, y_test = train_test_split(features, targets, 
@@ -97,18 +111,28 @@ for batch in Batches:
     ############################################################################
 
     #### Fit decision tree regression models
-    rt_1 = tree.DecisionTreeRegressor(min_samples_leaf=5)
-    rt_2 = tree.DecisionTreeRegressor(max_depth=3)
-    rt_1.fit(X_train, y_train)
-    rt_2.fit(X_train, y_train)
+    with profiling.timer('Fit trees'):
+        rt_1 = tree.DecisionTreeRegressor(min_samples_leaf=5)
+        rt_2 = tree.DecisionTreeRegressor(max_depth=3)
+        rt_1.fit(X_train, y_train)
+        rt_2.fit(X_train, y_train)
+        profiling.count('samples', len(y_train))
     
     #### Fit SVR regression models
-    svr_rbf = SVR(kernel='rbf', C=1e3, gamma=0.1)
-    svr_lin = SVR(kernel='linear', C=1e3)
-    svr_poly = SVR(kernel='poly', C=1e3, degree=2)
-    svr_rbf.fit(X_train, y_train)
-    svr_lin.fit(X_train, y_train)
-    svr_poly.fit(X_train, y_train)
+    with profiling.timer('Fit SVR models'):
+        svr_rbf = SVR(kernel='rbf', C=1e3, gamma=0.1)
+        svr_lin = SVR(kernel='linear', C=1e3)
+        svr_poly = SVR(kernel='poly', C=1e3, degree=2)
+        svr_rbf.fit(X_train, y_train)
+        svr_lin.fit(X_train, y_train)
+        svr_poly.fit(X_train, y_train)
+        profiling.count('samples', len(y_train))
+
+    #### Warm-start the approximate RBF SVR from the previous batch's fit
+    with profiling.timer('Fit approximate SVR'):
+        svr_warm.fit(X_train, y_train)
+        epochs_warm[count] = svr_warm.get_num_iterations()
+        profiling.count('samples', len(y_train))
 
 
     ############################################################################
@@ -116,44 +140,31 @@ for batch in Batches:
     ############################################################################
 
     #### Make predictions based on the models
-    y_test_predict_tree1 = rt_1.predict(X_test)
-    y_test_predict_tree2 = rt_2.predict(X_test)
-    y_test_predict_rbf = svr_rbf.predict(X_test)
-    y_test_predict_lin = svr_lin.predict(X_test)
-    y_test_predict_poly = svr_poly.predict(X_test)
+    with profiling.timer('Predict'):
+        y_test_predict_tree1 = rt_1.predict(X_test)
+        y_test_predict_tree2 = rt_2.predict(X_test)
+        y_test_predict_rbf = svr_rbf.predict(X_test)
+        y_test_predict_lin = svr_lin.predict(X_test)
+        y_test_predict_poly = svr_poly.predict(X_test)
+        y_test_predict_warm = svr_warm.predict(X_test)
+        profiling.count('samples', len(y_test))
 
 
     ############################################################################
     ########################    TRAINING/TESTING ERROR   #######################
     ############################################################################
 
-    #### Calculate testing error  
-    for i in range(testing):
-
-        # trees
-        diff_test_tree1 = y_test_predict_tree1[i] - y_test[i]
-        diff_test_tree2 = y_test_predict_tree2[i] - y_test[i]
-        error_test_tree1[count] = error_test_tree1[count] + \
-                                  diff_test_tree1*diff_test_tree1
-        error_test_tree2[count] = error_test_tree2[count] + \
-                                  diff_test_tree2*diff_test_tree2
-
-        # regression
-        diff_test_rbf = y_test_predict_rbf[i] - y_test[i]
-        diff_test_lin = y_test_predict_lin[i] - y_test[i]
-        diff_test_poly = y_test_predict_poly[i] - y_test[i]
-        error_test_rbf[count] = error_test_rbf[count] + \
-                                diff_test_rbf*diff_test_rbf
-        error_test_lin[count] = error_test_lin[count] + \
-                                diff_test_lin*diff_test_lin
-        error_test_poly[count] = error_test_poly[count] + \
-                                diff_test_poly*diff_test_poly
-
-    error_test_tree1[count] = np.sqrt(error_test_tree1[count]/testing)
-    error_test_tree2[count] = np.sqrt(error_test_tree2[count]/testing)
-    error_test_rbf[count] = np.sqrt(error_test_rbf[count]/testing)
-    error_test_lin[count] = np.sqrt(error_test_lin[count]/testing)
-    error_test_poly[count] = np.sqrt(error_test_poly[count]/testing)
+    #### Calculate testing error for all of the models at once
+    with profiling.timer('Compute errors'):
+        test_predictions = np.vstack((y_test_predict_tree1,
+                                      y_test_predict_tree2,
+                                      y_test_predict_rbf, y_test_predict_lin,
+                                      y_test_predict_poly, y_test_predict_warm))
+        test_errors = error_metrics.compute_errors(test_predictions, y_test)
+
+        error_test_tree1[count], error_test_tree2[count], \
+            error_test_rbf[count], error_test_lin[count], \
+            error_test_poly[count], error_test_warm[count] = test_errors['rms']
 
     count = count + 1
 
@@ -168,6 +179,8 @@ print 'Tree 2 uses "max depth = 3"'
 print 'SV Regression 1 uses a Radial Basis Function kernel (C=1e3, gamma=.1)'
 print 'SV Regression 2 uses a linear kernel (C=1e3)'
 print 'SV Regression 3 uses a polynomial kernel (C=1e3, gamma=2)'
+print 'Approx. SV Regression uses random Fourier features for an RBF ' + \
+      'kernel (C=1e3, gamma=.1), warm-started across batches'
 print ' '
 
 count = 0
@@ -185,6 +198,8 @@ for batch in Batches:
         (error_test_lin[count])
     print 'For ' + batch + ', Polynomial, 2nd degree, testing error is %f' % \
         (error_test_poly[count])
+    print 'For ' + batch + ', Approx. RBF testing error is %f (%d epochs)' % \
+        (error_test_warm[count], epochs_warm[count])
 
     count = count + 1
 
@@ -200,6 +215,7 @@ pl.plot(x_plot, error_test_tree2, c="b", label="Tree 2", linewidth=2)
 pl.plot(x_plot, error_test_rbf, c="y", label="RBF", linewidth=2)
 pl.plot(x_plot, error_test_lin, c="r", label="Linear", linewidth=2)
 pl.plot(x_plot, error_test_poly, c="k", label="Poly", linewidth=2)
+pl.plot(x_plot, error_test_warm, c="m", label="Approx. RBF", linewidth=2)
 pl.xlabel("Batch")
 pl.ylabel("RMS Error")
 pl.title("Decision Tree and SV Kernel Regression")
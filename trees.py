@@ -24,6 +24,8 @@ import numpy as np
 import pylab as pl
 from sklearn import tree
 from sklearn.cross_validation import train_test_split
+from cluster import error_metrics
+from cluster import profiling
 
 
 
@@ -51,11 +53,14 @@ energy = 'High Energy'
 tally = 'Tot. XS'
 
 # Get target regression values for each sample
-targets = sample_file[batch][energy][tally]['Targets'][...]
-targets = [l[0] for l in targets]
+with profiling.timer('Read samples'):
+    targets = sample_file[batch][energy][tally]['Targets'][...]
+    profiling.count('bytes read', targets.nbytes)
+    targets = [l[0] for l in targets]
 
-# Get the feature vectors for each sample
-features = sample_file[batch][energy][tally]['Features'][...]
+    # Get the feature vectors for each sample
+    features = sample_file[batch][energy][tally]['Features'][...]
+    profiling.count('bytes read', features.nbytes)
 
 
 
@@ -64,8 +69,6 @@ features = sample_file[batch][energy][tally]['Features'][...]
 ################################################################################
 
 split = .33
-training = int((1-split)*len(features))
-testing = int(split*len(features))
 
 #### Split the data
 X_train, X_test, y_train, y_test = train_test_split(features, targets, \
@@ -78,10 +81,12 @@ X_train, X_test, y_train, y_test = train_test_split(features, targets, \
 ################################################################################
 
 #### Fit regression model
-rt_1 = tree.DecisionTreeRegressor(min_samples_leaf=5)
-rt_2 = tree.DecisionTreeRegressor(max_depth=3)
-rt_1.fit(X_train, y_train)
-rt_2.fit(X_train, y_train)
+with profiling.timer('Fit models'):
+    rt_1 = tree.DecisionTreeRegressor(min_samples_leaf=5)
+    rt_2 = tree.DecisionTreeRegressor(max_depth=3)
+    rt_1.fit(X_train, y_train)
+    rt_2.fit(X_train, y_train)
+    profiling.count('samples', len(y_train))
 
 
 
@@ -90,21 +95,16 @@ rt_2.fit(X_train, y_train)
 ################################################################################
 
 #### Make predictions based on the models
-y_test_predict_1 = rt_1.predict(X_test)
-y_test_predict_2 = rt_2.predict(X_test)
-
-#### Calculate testing error
-error_test_1=0
-error_test_2=0
-
-for i in range(testing):
-    diff_test_1 = y_test_predict_1[i] - y_test[i]
-    diff_test_2 = y_test_predict_2[i] - y_test[i]
-    error_test_1 = error_test_1 + diff_test_1*diff_test_1
-    error_test_2 = error_test_2 + diff_test_2*diff_test_2
-
-error_test_1 = np.sqrt(error_test_1/testing)
-error_test_2 = np.sqrt(error_test_2/testing)
+with profiling.timer('Predict'):
+    y_test_predict_1 = rt_1.predict(X_test)
+    y_test_predict_2 = rt_2.predict(X_test)
+    profiling.count('samples', len(y_test))
+
+#### Calculate testing error for both models at once
+with profiling.timer('Compute errors'):
+    test_errors = error_metrics.compute_errors((y_test_predict_1, \
+                                                y_test_predict_2), y_test)
+    error_test_1, error_test_2 = test_errors['rms']
 
 print 'Regression tree 1 testing error is %f' % (error_test_1)
 print 'Regression tree 2 testing error is %f' % (error_test_2)